@@ -0,0 +1,228 @@
+import glob
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import estadisticas
+import main_prueba
+from main_prueba import (CALLES, INTERVALO_LLEGADA_CARROS, INTERVALO_LLEGADA_PEATONES, TIEMPO_PASO_PEATON,
+                         TIEMPO_PEATONAL, TIEMPO_ENTRE_CARROS, TIEMPO_SIMULACION, ESCENARIOS, REPETS, SEMILLA_BASE,
+                         PROCESOS, PROCESOS_GRAFICAS, semilla_replica, tareas_barrido, ejecutar_tareas, generar_txt,
+                         generar_sca, generar_graficas)
+
+# Carpeta del almacén de resultados
+RUTA_ALMACEN = "almacen_resultados"
+
+# Repeticiones por segmento: un barrido interrumpido pierde como mucho un segmento
+TAM_SEGMENTO = 64
+
+# Columnas internas del almacén (no forman parte de las filas de resultados)
+COLUMNAS_INTERNAS = ("Clave", "Version", "Tiempo", "Semilla_Base")
+
+# Archivo del almacén con la huella de los datos de cada reporte generado
+ARCHIVO_REPORTES = "reportes.json"
+
+
+# Huella del código que produce los resultados: si cambia el modelo o las
+# estadísticas, las repeticiones guardadas dejan de servir
+def version_codigo():
+    partes = [inspect.getsource(objeto) for objeto in (main_prueba.Semaforo, main_prueba.Interseccion,
+                                                        main_prueba.resumen_interseccion, main_prueba.simular_replica)]
+    partes.append(inspect.getsource(estadisticas))
+    return hashlib.sha256("".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+# Constantes del modelo que afectan los resultados
+def constantes_modelo():
+    return {
+        "CALLES": CALLES,
+        "INTERVALO_LLEGADA_CARROS": INTERVALO_LLEGADA_CARROS,
+        "INTERVALO_LLEGADA_PEATONES": INTERVALO_LLEGADA_PEATONES,
+        "TIEMPO_PASO_PEATON": TIEMPO_PASO_PEATON,
+        "TIEMPO_PEATONAL": TIEMPO_PEATONAL,
+        "TIEMPO_ENTRE_CARROS": TIEMPO_ENTRE_CARROS
+    }
+
+
+# Clave de una repetición: hash de (parámetros del escenario, constantes del
+# modelo, semilla, duración, versión del código)
+def clave_replica(escenario, rep, semilla_base=SEMILLA_BASE, tiempo=TIEMPO_SIMULACION, version=None):
+    contenido = {
+        "escenario": escenario,
+        "constantes": constantes_modelo(),
+        "semilla": semilla_replica(escenario["nombre"], rep, semilla_base),
+        "repeticion": rep,
+        "tiempo": tiempo,
+        "version": version or version_codigo()
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# Huella de un conjunto de filas (por sus claves), para saber si un reporte está al día
+def _huella(claves):
+    return hashlib.sha256("\n".join(claves).encode("utf-8")).hexdigest()
+
+
+# Almacén de solo agregar: cada lote de repeticiones se escribe en un segmento
+# nuevo (.npz con un array por columna) que nunca se modifica. Las filas se
+# buscan por su clave.
+class Almacen:
+    def __init__(self, ruta=RUTA_ALMACEN):
+        self.ruta = ruta
+        os.makedirs(ruta, exist_ok=True)
+        self._claves = None
+
+    def segmentos(self):
+        return sorted(glob.glob(os.path.join(self.ruta, "segmento_*.npz")))
+
+    # Claves guardadas (solo se lee la columna de claves de cada segmento)
+    def claves(self):
+        if self._claves is None:
+            self._claves = set()
+            for segmento in self.segmentos():
+                with np.load(segmento) as datos:
+                    self._claves.update(datos["Clave"].tolist())
+        return self._claves
+
+    # Escribe un segmento nuevo con las filas dadas. Se escribe a un archivo
+    # temporal y se renombra, así una interrupción nunca deja un segmento a medias.
+    # El nombre es la huella de las claves del lote: dos barridos que escriben a
+    # la vez nunca pisan el segmento del otro (y si guardan el mismo lote, el
+    # contenido es el mismo).
+    def agregar(self, claves, filas, version, tiempo, semilla_base):
+        if not filas:
+            return
+        columnas = {"Clave": np.array(claves), "Version": np.array([version] * len(filas)),
+                    "Tiempo": np.full(len(filas), tiempo, dtype=float),
+                    "Semilla_Base": np.full(len(filas), semilla_base, dtype=np.int64)}
+        for nombre in filas[0]:
+            columnas[nombre] = np.array([fila[nombre] for fila in filas])
+
+        destino = os.path.join(self.ruta, f"segmento_{_huella(claves)[:32]}.npz")
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as f:
+            np.savez(f, **columnas)
+        os.replace(temporal, destino)
+        self.claves().update(claves)
+
+    # Lee las filas guardadas, con la clave como índice; con "claves" devuelve
+    # solo esas y en ese orden
+    def leer(self, claves=None, internas=False):
+        partes = []
+        for segmento in self.segmentos():
+            with np.load(segmento) as datos:
+                partes.append(pd.DataFrame({nombre: datos[nombre] for nombre in datos.files}))
+        if not partes:
+            return pd.DataFrame()
+        df = pd.concat(partes, ignore_index=True).drop_duplicates("Clave").set_index("Clave")
+        if claves is not None:
+            df = df.loc[list(claves)]
+        if not internas:
+            df = df.drop(columns=[c for c in COLUMNAS_INTERNAS if c in df.columns])
+        return df
+
+    # Barrido incremental: solo simula las repeticiones que no están guardadas,
+    # en segmentos de TAM_SEGMENTO, y devuelve el DataFrame del barrido completo
+    # en el mismo orden que main_prueba.ejecutar_barrido
+    def barrido(self, escenarios=ESCENARIOS, repets=REPETS, semilla_base=SEMILLA_BASE, procesos=PROCESOS,
+                tiempo=TIEMPO_SIMULACION, tam_segmento=TAM_SEGMENTO):
+        version = version_codigo()
+        tareas = tareas_barrido(escenarios, repets, semilla_base, tiempo)
+        claves = [clave_replica(escenario, rep, semilla_base, tiempo, version) for escenario, rep, *_ in tareas]
+
+        guardadas = self.claves()
+        faltantes = [(clave, tarea) for clave, tarea in zip(claves, tareas) if clave not in guardadas]
+        if faltantes:
+            print(f"Simulando {len(faltantes)} de {len(tareas)} repeticiones (el resto ya está en el almacén)")
+        for inicio in range(0, len(faltantes), tam_segmento):
+            lote = faltantes[inicio:inicio + tam_segmento]
+            filas = ejecutar_tareas([tarea for _, tarea in lote], procesos)
+            self.agregar([clave for clave, _ in lote], filas, version, tiempo, semilla_base)
+
+        return self.leer(claves)
+
+    # Filas de un barrido ya guardado, sin simular nada
+    def leer_barrido(self, escenarios=ESCENARIOS, repets=REPETS, semilla_base=SEMILLA_BASE, tiempo=TIEMPO_SIMULACION):
+        version = version_codigo()
+        claves = [clave_replica(escenario, rep, semilla_base, tiempo, version)
+                  for escenario, rep, *_ in tareas_barrido(escenarios, repets, semilla_base, tiempo)]
+        faltan = len(set(claves) - self.claves())
+        if faltan:
+            raise LookupError(f"Faltan {faltan} repeticiones del barrido en el almacén {self.ruta}")
+        return self.leer(claves)
+
+    # Genera el CSV, los TXT y las gráficas a partir de un DataFrame leído del
+    # almacén (la clave de cada fila está en el índice). Cada reporte solo se
+    # reescribe si cambiaron las filas que usa o si el archivo no existe.
+    def renderizar(self, df, escenarios=ESCENARIOS, forzar=False, reportes=True, graficas=True,
+                   procesos=PROCESOS_GRAFICAS):
+        ruta_huellas = os.path.join(self.ruta, ARCHIVO_REPORTES)
+        huellas = {}
+        if os.path.exists(ruta_huellas):
+            with open(ruta_huellas, encoding="utf-8") as f:
+                huellas = json.load(f)
+
+        def pendiente(archivos, huella):
+            return forzar or any(not os.path.exists(a) or huellas.get(a) != huella for a in archivos)
+
+        generados = []
+        huella_total = _huella(df.index.tolist())
+        if reportes and pendiente(["resultados.csv"], huella_total):
+            df.to_csv("resultados.csv", index=False)
+            huellas["resultados.csv"] = huella_total
+            generados.append("resultados.csv")
+
+        # Un TXT, un .sca y un .vec por escenario: solo los de escenarios con filas nuevas
+        for escenario in escenarios if reportes else []:
+            archivos = [f"Resultado_{escenario['nombre']}.txt", f"{escenario['nombre']}.sca", f"{escenario['nombre']}.vec"]
+            huella = _huella(df.index[df["Escenario"] == escenario["nombre"]].tolist())
+            if pendiente(archivos, huella):
+                generar_txt(df, [escenario])
+                generar_sca(df, [escenario])
+                huellas.update({archivo: huella for archivo in archivos})
+                generados.extend(archivos)
+
+        # Las gráficas comparan escenarios entre sí: se regeneran juntas
+        figuras = [f"Grafica_TiemposEspera_{escenario['nombre']}.png" for escenario in escenarios]
+        figuras.append("Histograma_Comparacion_TiemposEspera_Vehiculos.png")
+        if graficas and pendiente(figuras, huella_total):
+            generar_graficas(df, escenarios, procesos)
+            huellas.update({archivo: huella_total for archivo in figuras})
+            generados.extend(figuras)
+
+        with open(ruta_huellas, "w", encoding="utf-8") as f:
+            json.dump(huellas, f, indent=2)
+        return generados
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else "barrido"
+    almacen = Almacen()
+
+    if comando == "barrido":
+        # Simula solo lo que falta y actualiza los reportes que cambiaron
+        df = almacen.barrido()
+        generados = almacen.renderizar(df)
+        print(f"Reportes actualizados: {', '.join(generados) if generados else 'ninguno (todo al día)'}")
+    elif comando == "reportes":
+        # Regenera todos los reportes desde el almacén sin simular
+        try:
+            df = almacen.leer_barrido()
+        except LookupError as error:
+            print(f"{error}; ejecute 'python almacen.py barrido'")
+            sys.exit(1)
+        almacen.renderizar(df, forzar=True)
+        print("Reportes generados desde el almacén.")
+    elif comando == "info":
+        df = almacen.leer(internas=True)
+        print(f"{len(almacen.segmentos())} segmentos, {len(df)} repeticiones guardadas")
+        if len(df):
+            print(df.groupby(["Version", "Tiempo", "Semilla_Base", "Escenario"]).size().to_string())
+    else:
+        print("Uso: python almacen.py [barrido|reportes|info]")
+        sys.exit(1)
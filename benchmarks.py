@@ -0,0 +1,275 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import chdir, contextmanager
+from datetime import datetime
+
+import simpy
+
+try:
+    import resource
+except ImportError:  # Windows: sin medición de memoria
+    resource = None
+
+# Modelos medidos: "prueba" = main_prueba.Interseccion, "eventos" = main_eventos.Interseccion
+MODELOS = ["prueba", "eventos"]
+
+# Multiplicadores de la tasa de llegada de carros (intervalos divididos por el factor)
+FACTORES_LLEGADA = [1, 5, 20]
+
+# Duraciones simuladas (segundos): de 1000 s a 24 horas
+HORIZONTES = [1000, 3600, 86400]
+
+# Repeticiones de cada caso (se reporta la mediana del tiempo por repetición)
+REPETICIONES = 3
+
+# Tolerancia relativa antes de marcar una regresión al comparar dos corridas
+TOLERANCIA = 0.10
+
+# Cambios de memoria menores a esto (MB) no cuentan como regresión (ruido del asignador)
+CAMBIO_MINIMO_MB = 2.0
+
+ARCHIVO_BENCHMARK = "benchmark.json"
+
+# Métricas comparadas: (nombre, True si más alto es mejor)
+METRICAS = [
+    ("eventos_por_segundo", True),
+    ("segundos_por_replica", False),
+    ("rss_pico_mb", False),
+    ("rss_simulacion_mb", False)
+]
+
+
+# Entorno SimPy que cuenta los eventos procesados
+class EntornoContado(simpy.Environment):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.eventos = 0
+
+    def step(self):
+        self.eventos += 1
+        return super().step()
+
+
+# Memoria residente máxima del proceso hasta ahora (MB)
+def _rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB, macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+# Cambia temporalmente los intervalos de llegada (y tiempos de verde) de un módulo
+# (también lo usa llegadas.py para su comparación de velocidad)
+@contextmanager
+def parametros_llegadas(modulo, factor, tiempos_verde=None):
+    originales = modulo.INTERVALO_LLEGADA_CARROS
+    modulo.INTERVALO_LLEGADA_CARROS = {calle: intervalo / factor for calle, intervalo in originales.items()}
+    verde_original = getattr(modulo, "TIEMPOS_VERDE", None)
+    if tiempos_verde is not None and verde_original is not None:
+        modulo.TIEMPOS_VERDE = {calle: tiempos_verde[calle] for calle in verde_original}
+    try:
+        yield
+    finally:
+        modulo.INTERVALO_LLEGADA_CARROS = originales
+        if verde_original is not None:
+            modulo.TIEMPOS_VERDE = verde_original
+
+
+# Construye el modelo indicado sobre un entorno nuevo
+def _crear_modelo(modelo, escenario, rep):
+    env = EntornoContado()
+    if modelo == "prueba":
+        import main_prueba
+        rng = random.Random(main_prueba.semilla_replica(escenario["nombre"], rep))
+        main_prueba.Interseccion(env, escenario, rng)
+    else:
+        import main_eventos
+        random.seed(rep)
+        main_eventos.Interseccion(env)
+    return env
+
+
+# Mide un caso en el proceso actual: todas sus repeticiones seguidas
+def medir_caso(modelo, escenario, factor, horizonte, repeticiones=REPETICIONES):
+    if modelo == "prueba":
+        import main_prueba as modulo
+    else:
+        import main_eventos as modulo
+
+    # Memoria después de importar el modelo: la diferencia con el pico es lo que usa la simulación
+    rss_base = _rss_pico_mb()
+    tiempos, eventos = [], 0
+    with parametros_llegadas(modulo, factor, escenario):
+        for rep in range(repeticiones):
+            env = _crear_modelo(modelo, escenario, rep)
+            inicio = time.perf_counter()
+            env.run(until=horizonte)
+            tiempos.append(time.perf_counter() - inicio)
+            eventos += env.eventos
+
+    rss_pico = _rss_pico_mb()
+    return {
+        "modelo": modelo,
+        "escenario": escenario["nombre"],
+        "factor_llegadas": factor,
+        "horizonte": horizonte,
+        "repeticiones": repeticiones,
+        "eventos_por_replica": eventos / repeticiones,
+        "eventos_por_segundo": eventos / sum(tiempos),
+        "segundos_por_replica": statistics.median(tiempos),
+        "rss_base_mb": rss_base,
+        "rss_pico_mb": rss_pico,
+        "rss_simulacion_mb": rss_pico - rss_base if rss_pico is not None else None
+    }
+
+
+# Mide el tiempo de la etapa de reportes: TXT y gráficas de main_prueba, y
+# conversión de la traza binaria a texto de main_eventos
+def medir_reportes():
+    import pandas as pd
+    import main_prueba
+    import main_eventos
+    from trazas import Traza, a_texto, NIVEL_EVENTOS
+
+    tiempos = {}
+    df = pd.DataFrame(main_prueba.ejecutar_barrido(procesos=1))
+    with tempfile.TemporaryDirectory() as carpeta, chdir(carpeta):
+        inicio = time.perf_counter()
+        main_prueba.generar_txt(df)
+        tiempos["prueba_txt"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        main_prueba.generar_graficas(df)
+        tiempos["prueba_graficas"] = time.perf_counter() - inicio
+
+        random.seed(0)
+        env = simpy.Environment()
+        with Traza("eventos.trz", NIVEL_EVENTOS, main_eventos.CALLES) as traza:
+            main_eventos.Interseccion(env, traza=traza)
+            env.run(until=main_eventos.TIEMPO_SIMULACION)
+        inicio = time.perf_counter()
+        a_texto("eventos.trz", "eventos.txt")
+        tiempos["eventos_texto"] = time.perf_counter() - inicio
+    return tiempos
+
+
+# Ejecuta una función en un intérprete nuevo, para que el pico de memoria sea
+# solo el del caso medido
+def _en_proceso_nuevo(funcion, *argumentos):
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+        return pool.submit(funcion, *argumentos).result()
+
+
+# Corre todos los casos y devuelve el resultado completo (listo para JSON)
+def ejecutar(modelos=MODELOS, factores=FACTORES_LLEGADA, horizontes=HORIZONTES, repeticiones=REPETICIONES,
+             escenarios=None):
+    from main_prueba import ESCENARIOS
+    escenarios = escenarios or ESCENARIOS
+
+    casos = []
+    for modelo in modelos:
+        for escenario in escenarios:
+            for factor in factores:
+                for horizonte in horizontes:
+                    # Las corridas de 24 h se repiten una sola vez
+                    reps = 1 if horizonte > 3600 else repeticiones
+                    caso = _en_proceso_nuevo(medir_caso, modelo, escenario, factor, horizonte, reps)
+                    casos.append(caso)
+                    print(f"{modelo:8s} {caso['escenario']:12s} x{factor:<3d} {horizonte:>6d} s | "
+                          f"{caso['eventos_por_segundo']:>10.0f} ev/s | {caso['segundos_por_replica']:.3f} s/rep | "
+                          f"RSS {caso['rss_pico_mb'] or 0:.0f} MB (+{caso['rss_simulacion_mb'] or 0:.1f})", flush=True)
+
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "simpy": simpy.__version__,
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+        "casos": casos,
+        "reportes": _en_proceso_nuevo(medir_reportes)
+    }
+
+
+def _clave(caso):
+    return (caso["modelo"], caso["escenario"], caso["factor_llegadas"], caso["horizonte"])
+
+
+# Compara dos corridas y devuelve la lista de regresiones: métricas que
+# empeoraron más que la tolerancia relativa
+def comparar(base, nuevo, tolerancia=TOLERANCIA):
+    regresiones = []
+    casos_base = {_clave(caso): caso for caso in base["casos"]}
+    for caso in nuevo["casos"]:
+        anterior = casos_base.get(_clave(caso))
+        if anterior is None:
+            continue
+        for metrica, mas_es_mejor in METRICAS:
+            a, b = anterior.get(metrica), caso.get(metrica)
+            if not a or b is None:
+                continue
+            if metrica.startswith("rss") and abs(b - a) < CAMBIO_MINIMO_MB:
+                continue
+            cambio = (b - a) / a
+            if (-cambio if mas_es_mejor else cambio) > tolerancia:
+                regresiones.append({"caso": " ".join(map(str, _clave(caso))), "metrica": metrica,
+                                    "antes": a, "ahora": b, "cambio": cambio})
+
+    for etapa, a in base.get("reportes", {}).items():
+        b = nuevo.get("reportes", {}).get(etapa)
+        if a and b is not None and (b - a) / a > tolerancia:
+            regresiones.append({"caso": f"reporte {etapa}", "metrica": "segundos",
+                                "antes": a, "ahora": b, "cambio": (b - a) / a})
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de la simulación de semáforos")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_ejecutar = sub.add_parser("ejecutar", help="Corre los benchmarks y guarda el JSON")
+    p_ejecutar.add_argument("--salida", default=ARCHIVO_BENCHMARK)
+    p_ejecutar.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    p_ejecutar.add_argument("--rapido", action="store_true",
+                            help="Solo el primer escenario y horizontes de hasta 1 hora")
+
+    p_comparar = sub.add_parser("comparar", help="Compara dos JSON y marca las regresiones")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("nuevo")
+    p_comparar.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+
+    args = parser.parse_args()
+
+    if args.comando == "ejecutar":
+        from main_prueba import ESCENARIOS
+        if args.rapido:
+            resultado = ejecutar(horizontes=[h for h in HORIZONTES if h <= 3600], repeticiones=args.repeticiones,
+                                 escenarios=ESCENARIOS[:1])
+        else:
+            resultado = ejecutar(repeticiones=args.repeticiones)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print("\nReportes: " + ", ".join(f"{etapa} {segundos:.3f} s" for etapa, segundos in resultado["reportes"].items()))
+        print(f"Resultados guardados en {args.salida}")
+    else:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.nuevo, encoding="utf-8") as f:
+            nuevo = json.load(f)
+        regresiones = comparar(base, nuevo, args.tolerancia)
+        if not regresiones:
+            print(f"Sin regresiones (tolerancia {args.tolerancia:.0%})")
+            sys.exit(0)
+        print(f"REGRESIONES (tolerancia {args.tolerancia:.0%}):")
+        for r in regresiones:
+            print(f"  {r['caso']:40s} {r['metrica']:22s} {r['antes']:.4g} -> {r['ahora']:.4g} ({r['cambio']:+.1%})")
+        sys.exit(1)
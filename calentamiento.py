@@ -0,0 +1,146 @@
+import random
+import sys
+
+import simpy
+
+from main_prueba import (CALLES, ESCENARIOS, REPETS, SEMILLA_BASE, PROCESOS, TIEMPO_SIMULACION, CONTROL_POR_EVENTOS,
+                         Interseccion, semilla_replica, capturar_estado, ejecutar_tareas)
+
+# Calentamiento en segundos antes de medir (None = detectarlo con MSER-5)
+CALENTAMIENTO = None
+
+# Corrida piloto para detectar el calentamiento: duración y repeticiones que se promedian
+TIEMPO_PILOTO = 2 * TIEMPO_SIMULACION
+REPETICIONES_PILOTO = 5
+
+# Cada cuántos segundos se muestrea la cola total de vehículos en la corrida piloto
+INTERVALO_MUESTREO = 10
+
+# Observaciones por lote en MSER (MSER-5)
+LOTE_MSER = 5
+
+ARCHIVO_CALENTAMIENTO = "resultados_calentamiento.csv"
+
+
+# Intersección que guarda su estado al empezar la primera fase después del
+# calentamiento (en ese instante no hay nadie cruzando) y dispara "listo"
+class InterseccionCalentamiento(Interseccion):
+    def __init__(self, env, tiempos_verde, rng, calentamiento, por_eventos=CONTROL_POR_EVENTOS):
+        self.calentamiento = calentamiento
+        self.estado = None
+        self.listo = env.event()
+        super().__init__(env, tiempos_verde, rng, por_eventos)
+
+    def al_iniciar_fase(self, fase):
+        if self.estado is None and self.env.now >= self.calentamiento:
+            self.estado = capturar_estado(self, fase)
+            self.listo.succeed()
+
+
+# Cola total de vehículos muestreada cada "intervalo" segundos en una corrida
+def serie_colas(escenario, rep, semilla_base=SEMILLA_BASE, tiempo=TIEMPO_PILOTO, intervalo=INTERVALO_MUESTREO):
+    env = simpy.Environment()
+    rng = random.Random(semilla_replica(f"{escenario['nombre']}:piloto", rep, semilla_base))
+    interseccion = Interseccion(env, escenario, rng)
+    serie = []
+
+    def muestrear():
+        while True:
+            serie.append(sum(len(semaforo.cola) for semaforo in interseccion.semaforos.values()))
+            yield env.timeout(intervalo)
+
+    env.process(muestrear())
+    env.run(until=tiempo)
+    return serie
+
+
+# MSER-m: agrupa la serie en lotes de "lote" observaciones y elige el corte d
+# (en lotes, hasta la mitad de la serie) que minimiza la varianza de la media
+# de lo que queda, sum((z - media)^2) / (n - d)^2. Devuelve el corte en
+# observaciones de la serie original.
+def mser(serie, lote=LOTE_MSER):
+    lotes = [sum(serie[i:i + lote]) / lote for i in range(0, len(serie) - lote + 1, lote)]
+    n = len(lotes)
+    if n < 2:
+        return 0
+
+    # Sumas desde el final, para evaluar todos los cortes en una pasada
+    mejor, corte = None, 0
+    suma = suma2 = 0.0
+    for d in range(n - 1, -1, -1):
+        suma += lotes[d]
+        suma2 += lotes[d] * lotes[d]
+        if d > n // 2:
+            continue
+        restantes = n - d
+        valor = (suma2 - suma * suma / restantes) / (restantes * restantes)
+        if mejor is None or valor <= mejor:
+            mejor, corte = valor, d
+    return corte * lote
+
+
+# Duración del calentamiento de un escenario con MSER-5 sobre el promedio (entre
+# repeticiones piloto) de la cola total de vehículos
+def detectar_calentamiento(escenario, semilla_base=SEMILLA_BASE, repeticiones=REPETICIONES_PILOTO,
+                           tiempo=TIEMPO_PILOTO, intervalo=INTERVALO_MUESTREO):
+    series = [serie_colas(escenario, rep, semilla_base, tiempo, intervalo) for rep in range(repeticiones)]
+    promedio = [sum(valores) / len(valores) for valores in zip(*series)]
+    return mser(promedio) * intervalo
+
+
+# Simula el calentamiento una vez y devuelve el estado al inicio de la primera
+# fase después de "calentamiento" segundos (detectado si es None)
+def calentar(escenario, calentamiento=CALENTAMIENTO, semilla_base=SEMILLA_BASE, por_eventos=CONTROL_POR_EVENTOS):
+    if calentamiento is None:
+        calentamiento = detectar_calentamiento(escenario, semilla_base)
+    env = simpy.Environment()
+    rng = random.Random(semilla_replica(f"{escenario['nombre']}:calentamiento", 0, semilla_base))
+    interseccion = InterseccionCalentamiento(env, escenario, rng, calentamiento, por_eventos)
+    env.run(until=interseccion.listo)
+    return interseccion.estado
+
+
+# Barrido con calentamiento: cada escenario se calienta una sola vez y sus
+# repeticiones arrancan de ese estado con flujos aleatorios independientes,
+# midiendo "tiempo" segundos desde ahí. Las filas tienen el mismo formato que
+# main_prueba.ejecutar_barrido más la columna "Calentamiento" (segundos).
+def barrido_calentado(escenarios=ESCENARIOS, repets=REPETS, semilla_base=SEMILLA_BASE, procesos=PROCESOS,
+                      tiempo=TIEMPO_SIMULACION, calentamiento=CALENTAMIENTO):
+    tareas, inicio = [], {}
+    for escenario in escenarios:
+        estado = calentar(escenario, calentamiento, semilla_base)
+        inicio[escenario["nombre"]] = estado["tiempo"]
+        tareas.extend((escenario, rep, semilla_base, CONTROL_POR_EVENTOS, tiempo, estado) for rep in range(repets))
+
+    filas = ejecutar_tareas(tareas, procesos)
+    for fila in filas:
+        fila["Calentamiento"] = inicio[fila["Escenario"]]
+    return filas
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from main_prueba import ejecutar_barrido
+
+    # Uso: python calentamiento.py [segundos]  (sin argumento se detecta con MSER-5)
+    calentamiento = float(sys.argv[1]) if len(sys.argv) > 1 else CALENTAMIENTO
+
+    df = pd.DataFrame(barrido_calentado(calentamiento=calentamiento))
+    df.to_csv(ARCHIVO_CALENTAMIENTO, index=False)
+    df_frio = pd.DataFrame(ejecutar_barrido())
+
+    print("===== ESPERA PROMEDIO: DESDE CERO vs DESDE EL ESTADO CALENTADO =====\n")
+    for escenario in ESCENARIOS:
+        nombre = escenario["nombre"]
+        frio = df_frio[df_frio["Escenario"] == nombre].mean(numeric_only=True)
+        caliente = df[df["Escenario"] == nombre].mean(numeric_only=True)
+        # MSER corta como mucho la mitad de la serie: un corte cerca de ese tope
+        # indica que la cola sigue creciendo (escenario saturado)
+        saturado = calentamiento is None and caliente["Calentamiento"] >= 0.9 * TIEMPO_PILOTO / 2
+        aviso = " (la cola no se estabiliza en la corrida piloto)" if saturado else ""
+        print(f"{nombre} - calentamiento {caliente['Calentamiento']:.0f} s{aviso}")
+        for calle in CALLES:
+            print(f"  {calle}: {frio[f'{calle}_Espera_Prom']:.2f} -> {caliente[f'{calle}_Espera_Prom']:.2f} seg | "
+                  f"cola {frio[f'{calle}_Cola_Prom']:.2f} -> {caliente[f'{calle}_Cola_Prom']:.2f}")
+        print(f"  Peatones: {frio['Espera_Prom_Pea']:.2f} -> {caliente['Espera_Prom_Pea']:.2f} seg\n")
+    print(f"Resultados guardados en {ARCHIVO_CALENTAMIENTO}")
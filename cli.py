@@ -0,0 +1,139 @@
+import argparse
+import sys
+
+# Punto de entrada de la simulación por línea de comandos. Solo se importa lo
+# que necesita cada subcomando: "simular" no carga numpy, pandas ni matplotlib.
+#
+#   python cli.py simular --escenario Escenario_2 --rep 3
+#   python cli.py barrido --repets 20
+#   python cli.py reportes
+#   python cli.py graficas --procesos 4
+
+
+# Escenarios elegidos por nombre (separados por coma); todos si no se indica
+def _escenarios(nombres):
+    from main_prueba import ESCENARIOS
+    if not nombres:
+        return ESCENARIOS
+    por_nombre = {escenario["nombre"]: escenario for escenario in ESCENARIOS}
+    faltan = [n for n in nombres.split(",") if n not in por_nombre]
+    if faltan:
+        sys.exit(f"Escenarios desconocidos: {', '.join(faltan)} (disponibles: {', '.join(por_nombre)})")
+    return [por_nombre[n] for n in nombres.split(",")]
+
+
+# Simula una sola repetición e imprime su resumen
+def simular(args):
+    from main_prueba import CALLES, simular_replica
+
+    escenario = dict(_escenarios(args.escenario)[0])
+    for ajuste in args.verde or []:
+        calle, _, segundos = ajuste.partition("=")
+        if calle not in CALLES and calle != "Peatonal":
+            sys.exit(f"Calle desconocida en --verde: {calle}")
+        escenario[calle] = float(segundos)
+
+    estado = None
+    if args.calentamiento is not None:
+        from calentamiento import calentar
+        estado = calentar(escenario, None if args.calentamiento == "auto" else float(args.calentamiento), args.semilla)
+    res = simular_replica(escenario, args.rep - 1, args.semilla, tiempo=args.tiempo, estado=estado, motor=args.motor)
+
+    print(f"{escenario['nombre']} - repetición {args.rep} ({args.tiempo} s)"
+          + (f", medida desde t={estado['tiempo']:.0f} s tras el calentamiento" if estado else "") + "\n")
+    print(">>> Vehículos <<<")
+    for calle in CALLES:
+        print(f"{calle} (verde {escenario[calle]} s) -> Pasaron: {res[f'{calle}_Pasados']} | En espera: {res[f'{calle}_Cola']}")
+        print(f"  Espera prom/p95/p99: {res[f'{calle}_Espera_Prom']:.2f} / {res[f'{calle}_Espera_P95']:.2f} / "
+              f"{res[f'{calle}_Espera_P99']:.2f} seg | Cola prom: {res[f'{calle}_Cola_Prom']:.2f} | "
+              f"Máx: {res[f'{calle}_Cola_Max']}")
+    print("\n>>> Peatones <<<")
+    print(f"Cruzaron: {res['Peatones_Pasados']} | En espera: {res['Peatones_Cola']}")
+    print(f"  Espera prom/p95/p99: {res['Espera_Prom_Pea']:.2f} / {res['Espera_P95_Pea']:.2f} / "
+          f"{res['Espera_P99_Pea']:.2f} seg")
+
+
+# Barrido completo por el almacén: simula lo que falta y actualiza los reportes
+def barrido(args):
+    from almacen import Almacen
+
+    almacen = Almacen(args.almacen)
+    escenarios = _escenarios(args.escenarios)
+    df = almacen.barrido(escenarios, args.repets, args.semilla, args.procesos, args.tiempo)
+    generados = almacen.renderizar(df, escenarios, reportes=not args.sin_reportes,
+                                   graficas=not args.sin_graficas, procesos=args.procesos)
+    print(f"{len(df)} repeticiones. Archivos actualizados: {', '.join(generados) if generados else 'ninguno'}")
+
+
+# Reportes (CSV y TXT) o gráficas a partir del almacén, sin simular
+def _desde_almacen(args, reportes, graficas):
+    from almacen import Almacen
+
+    almacen = Almacen(args.almacen)
+    escenarios = _escenarios(args.escenarios)
+    try:
+        df = almacen.leer_barrido(escenarios, args.repets, args.semilla, args.tiempo)
+    except LookupError as error:
+        sys.exit(f"{error}. Ejecute primero: python cli.py barrido")
+    generados = almacen.renderizar(df, escenarios, forzar=args.forzar, reportes=reportes, graficas=graficas,
+                                   procesos=getattr(args, "procesos", None))
+    print(f"Archivos actualizados: {', '.join(generados) if generados else 'ninguno (todo al día)'}")
+
+
+def reportes(args):
+    _desde_almacen(args, reportes=True, graficas=False)
+
+
+def graficas(args):
+    _desde_almacen(args, reportes=False, graficas=True)
+
+
+def crear_parser():
+    # Los valores por defecto se escriben aquí (y no importando main_prueba)
+    # para que mostrar la ayuda sea instantáneo
+    parser = argparse.ArgumentParser(prog="cli.py", description="Simulación de semáforos de una intersección")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("simular", aliases=["simulate"], help="Simula una repetición de un escenario")
+    p.add_argument("--escenario", default="Escenario_1")
+    p.add_argument("--rep", type=int, default=1, help="Número de repetición (desde 1)")
+    p.add_argument("--tiempo", type=float, default=3600, help="Duración simulada en segundos")
+    p.add_argument("--semilla", type=int, default=2024, help="Semilla base")
+    p.add_argument("--verde", action="append", metavar="CALLE=SEG",
+                   help="Cambia un tiempo de verde (o Peatonal=SEG); se puede repetir")
+    p.add_argument("--calentamiento", metavar="SEG|auto",
+                   help="Medir desde el estado tras un calentamiento ('auto' = MSER-5)")
+    p.add_argument("--motor", choices=["simpy", "calendario"], default="simpy",
+                   help="Motor de eventos (calendario: mismos resultados, más rápido)")
+    p.set_defaults(funcion=simular)
+
+    def opciones_barrido(p):
+        p.add_argument("--escenarios", help="Nombres separados por coma (por defecto todos)")
+        p.add_argument("--repets", type=int, default=5)
+        p.add_argument("--tiempo", type=float, default=3600)
+        p.add_argument("--semilla", type=int, default=2024)
+        p.add_argument("--almacen", default="almacen_resultados")
+
+    p = sub.add_parser("barrido", aliases=["sweep"], help="Simula todos los escenarios (solo lo que falta)")
+    opciones_barrido(p)
+    p.add_argument("--procesos", type=int, help="Procesos del pool (por defecto todos los núcleos)")
+    p.add_argument("--sin-reportes", action="store_true", help="No generar CSV ni TXT")
+    p.add_argument("--sin-graficas", action="store_true", help="No generar gráficas")
+    p.set_defaults(funcion=barrido)
+
+    p = sub.add_parser("reportes", aliases=["report"], help="CSV y TXT a partir del almacén")
+    opciones_barrido(p)
+    p.add_argument("--forzar", action="store_true", help="Regenerar aunque estén al día")
+    p.set_defaults(funcion=reportes)
+
+    p = sub.add_parser("graficas", aliases=["plot"], help="Gráficas a partir del almacén, en paralelo")
+    opciones_barrido(p)
+    p.add_argument("--procesos", type=int, help="Procesos para dibujar (por defecto todos los núcleos)")
+    p.add_argument("--forzar", action="store_true", help="Regenerar aunque estén al día")
+    p.set_defaults(funcion=graficas)
+    return parser
+
+
+if __name__ == "__main__":
+    args = crear_parser().parse_args()
+    args.funcion(args)
@@ -0,0 +1,184 @@
+import math
+
+# Cuantiles de espera que se reportan
+CUANTILES = (0.5, 0.95, 0.99)
+
+# Histograma de cuantiles: valores por debajo del mínimo (segundos) van al primer
+# bin y cada bin mide 0.5% de su valor (error relativo máximo de los cuantiles)
+MINIMO_HISTOGRAMA = 0.01
+RESOLUCION_HISTOGRAMA = 0.005
+
+
+# Promedio ponderado en el tiempo de una magnitud escalonada (p. ej. el tamaño
+# de una cola): se actualiza cada vez que cambia el valor, sin guardar historial.
+class PromedioTemporal:
+    __slots__ = ("inicio", "ultimo", "valor", "area", "maximo")
+
+    def __init__(self, inicio=0.0, valor=0):
+        self.inicio = inicio
+        self.ultimo = inicio  # Instante del último cambio
+        self.valor = valor    # Valor vigente desde "ultimo"
+        self.area = 0.0       # Integral del valor hasta "ultimo"
+        self.maximo = valor
+
+    def actualizar(self, t, valor):
+        self.area += self.valor * (t - self.ultimo)
+        self.ultimo = t
+        self.valor = valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    # Integral del valor entre el inicio y t (t >= último cambio)
+    def acumulado(self, t):
+        return self.area + self.valor * (t - self.ultimo)
+
+    # Promedio entre el inicio y t_fin (el valor vigente se extiende hasta t_fin)
+    def promedio(self, t_fin):
+        duracion = t_fin - self.inicio
+        if duracion <= 0:
+            return self.valor
+        return self.acumulado(t_fin) / duracion
+
+
+# Media y varianza en una pasada (algoritmo de Welford)
+class Welford:
+    __slots__ = ("n", "media", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def agregar(self, x):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (x - self.media)
+
+    # Une las observaciones de otro acumulador (fórmula de Chan et al.)
+    def combinar(self, otro):
+        n = self.n + otro.n
+        if otro.n == 0 or n == 0:
+            return
+        delta = otro.media - self.media
+        self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+        self.media += delta * otro.n / n
+        self.n = n
+
+    # Varianza muestral (n - 1)
+    @property
+    def varianza(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def desviacion(self):
+        return math.sqrt(self.varianza)
+
+
+# Histograma de bins logarítmicos para estimar cuantiles: cada bin mide una
+# fracción fija (RESOLUCION_HISTOGRAMA) de su valor, así que el error relativo
+# de los cuantiles está acotado y la cantidad de bins crece solo con el
+# logaritmo del rango de valores, no con la cantidad de observaciones.
+class HistogramaLog:
+    __slots__ = ("minimo", "resolucion", "log_base", "conteos", "n")
+
+    def __init__(self, minimo=MINIMO_HISTOGRAMA, resolucion=RESOLUCION_HISTOGRAMA):
+        self.minimo = minimo
+        self.resolucion = resolucion
+        self.log_base = math.log1p(resolucion)
+        self.conteos = {}  # Índice de bin -> cantidad (solo los bins usados)
+        self.n = 0
+
+    def agregar(self, x):
+        # El bin 0 guarda los valores menores al mínimo (incluido el 0)
+        i = int(math.log(x / self.minimo) / self.log_base) + 1 if x >= self.minimo else 0
+        self.conteos[i] = self.conteos.get(i, 0) + 1
+        self.n += 1
+
+    # Suma los conteos de otro histograma con los mismos bins
+    def combinar(self, otro):
+        for i, cantidad in otro.conteos.items():
+            self.conteos[i] = self.conteos.get(i, 0) + cantidad
+        self.n += otro.n
+
+    def copia(self):
+        copia = HistogramaLog(self.minimo, self.resolucion)
+        copia.conteos = dict(self.conteos)
+        copia.n = self.n
+        return copia
+
+    # Histograma de lo agregado desde "anterior", una copia previa de este mismo histograma
+    def desde(self, anterior):
+        nuevo = HistogramaLog(self.minimo, self.resolucion)
+        for i, cantidad in self.conteos.items():
+            diferencia = cantidad - anterior.conteos.get(i, 0)
+            if diferencia:
+                nuevo.conteos[i] = diferencia
+        nuevo.n = self.n - anterior.n
+        return nuevo
+
+    def _limites(self, i):
+        if i == 0:
+            return 0.0, self.minimo
+        abajo = self.minimo * math.exp((i - 1) * self.log_base)
+        return abajo, abajo * (1 + self.resolucion)
+
+    # Valor estimado de la observación de rango j (0 = la menor), ubicándola
+    # dentro de su bin según su posición entre las observaciones del bin
+    def _valor_rango(self, j, bins):
+        acumulado = 0
+        for i in bins:
+            cantidad = self.conteos[i]
+            if j < acumulado + cantidad:
+                abajo, arriba = self._limites(i)
+                return abajo + (arriba - abajo) * (j - acumulado + 0.5) / cantidad
+            acumulado += cantidad
+        return self._limites(bins[-1])[1]
+
+    # Cuantil p con la misma convención que numpy: interpolación lineal entre
+    # las observaciones de rango floor y ceil de (n - 1) * p
+    def cuantil(self, p):
+        if self.n == 0:
+            return 0
+        bins = sorted(self.conteos)
+        posicion = (self.n - 1) * p
+        abajo = math.floor(posicion)
+        valor = self._valor_rango(abajo, bins)
+        if posicion > abajo:
+            valor += (self._valor_rango(abajo + 1, bins) - valor) * (posicion - abajo)
+        return valor
+
+
+# Resumen en línea de tiempos de espera: media, varianza y cuantiles
+class EstadisticaEspera:
+    __slots__ = ("welford", "histograma")
+
+    def __init__(self):
+        self.welford = Welford()
+        self.histograma = HistogramaLog()
+
+    def agregar(self, espera):
+        self.welford.agregar(espera)
+        self.histograma.agregar(espera)
+
+    def combinar(self, otra):
+        self.welford.combinar(otra.welford)
+        self.histograma.combinar(otra.histograma)
+
+    @property
+    def n(self):
+        return self.welford.n
+
+    @property
+    def media(self):
+        return self.welford.media
+
+    @property
+    def desviacion(self):
+        return self.welford.desviacion
+
+    def cuantil(self, p):
+        return self.histograma.cuantil(p)
+
+    def __len__(self):
+        return self.welford.n
@@ -0,0 +1,274 @@
+import csv
+import math
+import random
+import time
+from collections import deque
+
+import numpy as np
+import simpy
+
+from main_prueba import (CALLES, INTERVALO_LLEGADA_CARROS, INTERVALO_LLEGADA_PEATONES, CONTROL_POR_EVENTOS, ESCENARIOS,
+                         SEMILLA_BASE, TIEMPO_SIMULACION, Interseccion, semilla_replica, resumen_interseccion)
+
+# Fuentes de llegadas pre-generadas. En vez de un proceso de SimPy por calle
+# que sortea y espera cada llegada, cada fuente entrega los instantes de
+# llegada en bloques de NumPy y las llegadas entran a la cola recién cuando
+# alguien la mira (con su instante exacto), sin ningún evento de SimPy. Un
+# proceso único que entregara las llegadas una a una en orden de tiempo
+# resultó más lento que un proceso por calle: cada llegada sigue siendo un
+# evento.
+
+# Nombre de la fuente de peatones (las de vehículos usan el nombre de la calle)
+PEATONES = "Peatones"
+
+# Llegadas sorteadas por bloque de NumPy
+BLOQUE_LLEGADAS = 4096
+
+# Perfil horario de ejemplo: factor sobre la tasa base de cada hora del día
+# (madrugada baja, picos a las 7-8 y a las 17-18)
+FACTORES_HORARIOS = [0.2, 0.15, 0.1, 0.1, 0.2, 0.5, 1.0, 1.6, 1.5, 1.0, 0.9, 1.0,
+                     1.1, 1.0, 0.9, 1.0, 1.3, 1.7, 1.5, 1.0, 0.7, 0.5, 0.4, 0.3]
+
+DURACION_DIA = 86400
+
+
+# Llegadas de Poisson con intervalo medio constante
+class FuentePoisson:
+    def __init__(self, intervalo, rng, bloque=BLOQUE_LLEGADAS):
+        self.intervalo = intervalo
+        self.rng = rng
+        self.bloque = bloque
+
+    def bloques(self, inicio):
+        t = inicio
+        while True:
+            tiempos = t + np.cumsum(self.rng.exponential(self.intervalo, self.bloque))
+            t = tiempos[-1]
+            yield tiempos
+
+
+# Llegadas de Poisson no homogéneas con una tasa escalonada que se repite cada
+# "periodo" segundos. "perfil" es una lista de (segundo de inicio, intervalo
+# medio) ordenada desde 0. Se sortea a la tasa máxima y cada candidata se
+# acepta con probabilidad tasa(t) / tasa_max (thinning), todo por bloques.
+class FuentePerfil:
+    def __init__(self, perfil, rng, periodo=DURACION_DIA, bloque=BLOQUE_LLEGADAS):
+        self.inicios = np.array([inicio for inicio, _ in perfil], dtype=float)
+        self.tasas = np.array([1.0 / intervalo for _, intervalo in perfil])
+        self.tasa_max = self.tasas.max()
+        self.periodo = periodo
+        self.rng = rng
+        self.bloque = bloque
+
+    def tasa(self, t):
+        return self.tasas[np.searchsorted(self.inicios, np.mod(t, self.periodo), side="right") - 1]
+
+    def bloques(self, inicio):
+        t = inicio
+        while True:
+            candidatas = t + np.cumsum(self.rng.exponential(1.0 / self.tasa_max, self.bloque))
+            t = candidatas[-1]
+            aceptadas = candidatas[self.rng.random(self.bloque) * self.tasa_max < self.tasa(candidatas)]
+            if len(aceptadas):
+                yield aceptadas
+
+
+# Llegadas grabadas: un array ordenado de instantes. Se termina al agotarse.
+class FuenteTraza:
+    def __init__(self, tiempos, bloque=BLOQUE_LLEGADAS):
+        self.tiempos = np.sort(np.asarray(tiempos, dtype=float))
+        self.bloque = bloque
+
+    def bloques(self, inicio):
+        desde = np.searchsorted(self.tiempos, inicio, side="left")
+        for i in range(desde, len(self.tiempos), self.bloque):
+            yield self.tiempos[i:i + self.bloque]
+
+
+# Perfil (segundo de inicio, intervalo medio) de un día a partir de un
+# intervalo base y un factor por hora (factor 0 = sin llegadas esa hora)
+def perfil_horario(intervalo_base, factores=FACTORES_HORARIOS):
+    horas = DURACION_DIA / len(factores)
+    return [(i * horas, intervalo_base / factor if factor > 0 else math.inf) for i, factor in enumerate(factores)]
+
+
+# Lee un CSV de marcas de tiempo con columnas "tiempo" y "calle" (o "Peatones")
+# y devuelve {nombre: array de instantes}
+def leer_marcas_csv(ruta):
+    tiempos = {}
+    with open(ruta, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            tiempos.setdefault(fila["calle"], []).append(float(fila["tiempo"]))
+    return {nombre: np.sort(np.array(valores)) for nombre, valores in tiempos.items()}
+
+
+# Lee un CSV de conteos de detector con columnas "inicio", "fin", "calle" y
+# "conteo" y reparte cada conteo uniformemente dentro de su intervalo
+def leer_conteos_csv(ruta, rng):
+    tiempos = {}
+    with open(ruta, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            marcas = rng.uniform(float(fila["inicio"]), float(fila["fin"]), int(fila["conteo"]))
+            tiempos.setdefault(fila["calle"], []).append(marcas)
+    return {nombre: np.sort(np.concatenate(partes)) for nombre, partes in tiempos.items()}
+
+
+# Fuentes de una repetición: Poisson por defecto (con los intervalos del modelo
+# o los de "intervalos"); "perfiles" ({nombre: perfil}) y "trazas" ({nombre:
+# instantes}) reemplazan las fuentes que nombran
+def crear_fuentes(semilla, perfiles=None, trazas=None, intervalos=None, bloque=BLOQUE_LLEGADAS):
+    perfiles, trazas = perfiles or {}, trazas or {}
+    nombres = CALLES + [PEATONES]
+    intervalos = dict(INTERVALO_LLEGADA_CARROS, **{PEATONES: INTERVALO_LLEGADA_PEATONES}, **(intervalos or {}))
+    generadores = [np.random.default_rng(s) for s in np.random.SeedSequence(semilla).spawn(len(nombres))]
+
+    fuentes = {}
+    for nombre, rng in zip(nombres, generadores):
+        if nombre in trazas:
+            fuentes[nombre] = FuenteTraza(trazas[nombre], bloque)
+        elif nombre in perfiles:
+            fuentes[nombre] = FuentePerfil(perfiles[nombre], rng, bloque=bloque)
+        else:
+            fuentes[nombre] = FuentePoisson(intervalos[nombre], rng, bloque)
+    return fuentes
+
+
+# Recorre los instantes de una fuente uno a uno ("proximo" = siguiente llegada,
+# infinito si la fuente se agotó)
+class Flujo:
+    def __init__(self, fuente, inicio=0.0):
+        self._bloques = fuente.bloques(inicio)
+        self._tiempos = []
+        self._i = 0
+        self.proximo = math.inf
+        self._cargar()
+
+    def _cargar(self):
+        for bloque in self._bloques:
+            if len(bloque):
+                self._tiempos, self._i = bloque.tolist(), 0
+                self.proximo = self._tiempos[0]
+                return
+        self._tiempos, self._i, self.proximo = [], 0, math.inf
+
+    def avanzar(self):
+        self._i += 1
+        if self._i < len(self._tiempos):
+            self.proximo = self._tiempos[self._i]
+        else:
+            self._cargar()
+
+    # Instantes de llegada hasta t (inclusive), en orden
+    def hasta(self, t):
+        llegadas = []
+        while self.proximo <= t:
+            llegadas.append(self.proximo)
+            self.avanzar()
+        return llegadas
+
+
+# Cola que se llena sola: antes de cualquier lectura o cambio agrega las
+# llegadas del flujo con instante <= env.now, actualizando el tamaño de la cola
+# en el tiempo con el instante de cada llegada
+class ColaDiferida(deque):
+    def __init__(self, env, flujo, tam_cola, iniciales=()):
+        super().__init__(iniciales)
+        self.env = env
+        self.flujo = flujo
+        self.tam_cola = tam_cola
+
+    def _sincronizar(self):
+        if self.flujo.proximo <= self.env.now:
+            for llegada in self.flujo.hasta(self.env.now):
+                super().append(llegada)
+                self.tam_cola.actualizar(llegada, super().__len__())
+
+    def __len__(self):
+        self._sincronizar()
+        return super().__len__()
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        self._sincronizar()
+        return super().__iter__()
+
+    def popleft(self):
+        self._sincronizar()
+        return super().popleft()
+
+    def append(self, llegada):
+        self._sincronizar()
+        super().append(llegada)
+
+    def clear(self):
+        self._sincronizar()
+        super().clear()
+
+
+# Intersección alimentada por fuentes pre-generadas ({nombre: fuente}, ver
+# crear_fuentes) en lugar de un proceso por calle
+class InterseccionFuentes(Interseccion):
+    def __init__(self, env, tiempos_verde, fuentes, rng=random, por_eventos=CONTROL_POR_EVENTOS, estado=None):
+        super().__init__(env, tiempos_verde, rng, por_eventos, estado)
+        self.flujos = {nombre: Flujo(fuente, env.now) for nombre, fuente in fuentes.items()}
+        for calle, semaforo in self.semaforos.items():
+            semaforo.cola = ColaDiferida(env, self.flujos[calle], semaforo.tam_cola, semaforo.cola)
+        self.cola_peatones = ColaDiferida(env, self.flujos[PEATONES], self.tam_cola_peatones, self.cola_peatones)
+
+    # Las llegadas las ponen las fuentes, no un proceso por calle
+    def generar_carros(self, calle):
+        return
+        yield
+
+    def generar_peatones(self):
+        return
+        yield
+
+    # Nadie avisa al llegar, así que el aviso se programa para el instante de la
+    # próxima llegada de esa cola (si cae antes del límite)
+    def dormir(self, aviso, ticks_max):
+        if aviso is self.aviso_peatones:
+            proximo = self.flujos[PEATONES].proximo
+        else:
+            proximo = next(self.flujos[calle].proximo for calle, semaforo in self.semaforos.items()
+                           if semaforo.aviso is aviso)
+        if proximo < self.env.now + ticks_max:
+            despertar = self.env.timeout(max(0, proximo - self.env.now))
+            despertar.callbacks.append(lambda _: aviso.triggered or aviso.succeed())
+        return (yield from super().dormir(aviso, ticks_max))
+
+
+# Una repetición de main_prueba con fuentes pre-generadas; devuelve la misma
+# fila que main_prueba.simular_replica (con otro flujo aleatorio)
+def simular_replica_fuentes(escenario, rep, semilla_base=SEMILLA_BASE, por_eventos=CONTROL_POR_EVENTOS,
+                            tiempo=TIEMPO_SIMULACION, perfiles=None, trazas=None, intervalos=None):
+    semilla = semilla_replica(escenario["nombre"], rep, semilla_base)
+    env = simpy.Environment()
+    fuentes = crear_fuentes(semilla, perfiles, trazas, intervalos)
+    interseccion = InterseccionFuentes(env, escenario, fuentes, random.Random(semilla), por_eventos)
+    env.run(until=tiempo)
+
+    res = {"Escenario": escenario["nombre"], "Repeticion": rep + 1}
+    res.update(resumen_interseccion(interseccion, env.now))
+    return res
+
+
+if __name__ == "__main__":
+    import main_prueba
+    from benchmarks import parametros_llegadas
+
+    # Comparación de velocidad con llegadas cada vez más densas
+    escenario = ESCENARIOS[0]
+    print(f"{'Factor':>6s} | {'procesos':>9s} | {'fuentes':>9s}   segundos por repetición de {TIEMPO_SIMULACION} s")
+    for factor in (1, 5, 20):
+        intervalos = {calle: intervalo / factor for calle, intervalo in INTERVALO_LLEGADA_CARROS.items()}
+        with parametros_llegadas(main_prueba, factor):
+            inicio = time.perf_counter()
+            main_prueba.simular_replica(escenario, 0)
+            t_procesos = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            simular_replica_fuentes(escenario, 0, intervalos=intervalos)
+            t_fuentes = time.perf_counter() - inicio
+        print(f"{factor:>6d} | {t_procesos:>9.3f} | {t_fuentes:>9.3f}   x{t_procesos / t_fuentes:.1f}")
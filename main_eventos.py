@@ -1,12 +1,16 @@
 import simpy
 import random
-
-# Crear y abrir archivo para registrar los eventos de la simulación
-log_file = open("eventos_simulacion.txt", "w")
-
-# Función para escribir eventos en el archivo de log
-def log_event(text):
-    log_file.write(text + "\n")
+import math
+from collections import deque
+from estadisticas import PromedioTemporal, EstadisticaEspera
+from trazas import (Traza, a_texto, NIVEL_APAGADO, NIVEL_FASES, NIVEL_EVENTOS, LLEGADA_CARRO, CRUCE_CARRO,
+                    VERDE, ROJO, LLEGADA_PEATON, PASO_PEATONAL, FIN_PASO_PEATONAL)
+
+# Traza de eventos (apagada por defecto; NIVEL_FASES o NIVEL_EVENTOS para activarla)
+NIVEL_TRAZA = NIVEL_APAGADO
+ARCHIVO_TRAZA = "eventos_simulacion.trz" # Traza binaria por columnas
+ARCHIVO_EVENTOS = "eventos_simulacion.txt" # Versión legible generada a partir de la traza
+TRAZA_EN_HILO = False # Escribir los bloques de la traza desde un hilo en segundo plano
 
 # Definición de tiempos de semáforo verde por calle (en segundos)
 TIEMPOS_VERDE = {
@@ -30,6 +34,7 @@ INTERVALO_LLEGADA_PEATONES = 30 # Intervalo promedio de llegada de peatones (seg
 TIEMPO_SIMULACION = 1000 # Tiempo total de simulación (en segundos)
 TIEMPO_PASO_PEATON = 6 # Tiempo que tarda un peatón en cruzar
 TIEMPO_ENTRE_CARROS = 1  # Tiempo mínimo de separación entre carros cuando cruzan
+CONTROL_POR_EVENTOS = True # Dormir hasta la próxima llegada en vez de sondear cada segundo (False = sondeo original)
 
 # Lista de las calles que forman parte de la intersección
 CALLES = ["Norte-L1", "Sur-L2", "Este-L3", "Oeste-L4"]
@@ -39,24 +44,39 @@ class Semaforo:
     def __init__(self, env, nombre):
         self.env = env # Entorno de simulación
         self.nombre = nombre # Nombre de la calle del semáforo
-        self.cola = [] # Lista de vehículos esperando
+        self.cola = deque() # Cola FIFO de vehículos esperando (tiempos de llegada)
         self.pasados = 0 # Contador de vehículos que lograron cruzar
-        self.historial_tamanos_cola = []  # Para guardar el tamaño de la cola en el tiempo
+        self.tam_cola = PromedioTemporal(env.now)  # Tamaño de la cola ponderado en el tiempo (promedio y máximo)
+        self.espera = EstadisticaEspera() # Espera de los vehículos que cruzaron (media, varianza, cuantiles)
+        self.aviso = None # Evento que despierta al controlador cuando llega un carro
 
     # Método para agregar un carro a la cola
     def agregar_carro(self, carro):
         self.cola.append(carro)
+        self.tam_cola.actualizar(self.env.now, len(self.cola))
+        if self.aviso is not None and not self.aviso.triggered:
+            self.aviso.succeed()
+
+    # Método para sacar el primer carro de la cola
+    def sacar_carro(self):
+        carro = self.cola.popleft()
+        self.tam_cola.actualizar(self.env.now, len(self.cola))
+        return carro
 
 # Clase que representa toda la intersección y su comportamiento
 class Interseccion:
-    def __init__(self, env):
+    def __init__(self, env, por_eventos=CONTROL_POR_EVENTOS, traza=None):
         self.env = env
+        self.traza = traza # Traza de eventos (None = sin traza)
+        self.nivel_traza = traza.nivel if traza is not None else NIVEL_APAGADO
+        self.por_eventos = por_eventos # Control por eventos o sondeo de 1 segundo
         # Crear un semáforo por cada calle
         self.semaforos = {nombre: Semaforo(env, nombre) for nombre in CALLES}
-        self.cola_peatones = [] # Lista de peatones esperando
+        self.cola_peatones = deque() # Cola FIFO de peatones esperando
         self.pasaron_peatones = 0 # Contador de peatones que lograron cruzar
-        self.historial_cola_peatones = []   # Para guardar tamaño de cola de peatones durante toda la simulación
-        self.espera_peatones = []           # Para guardar tiempos de espera de peatones que cruzaron
+        self.tam_cola_peatones = PromedioTemporal(env.now) # Tamaño de la cola de peatones ponderado en el tiempo
+        self.espera_peatones = EstadisticaEspera()        # Espera de los peatones que cruzaron
+        self.aviso_peatones = None          # Evento que despierta al controlador cuando llega un peatón
 
         # Crear procesos de generación de carros y peatones
         for calle in CALLES:
@@ -71,28 +91,59 @@ class Interseccion:
             yield self.env.timeout(random.expovariate(1.0 / INTERVALO_LLEGADA_CARROS[calle]))
             # Agregar el carro al semáforo correspondiente
             self.semaforos[calle].agregar_carro(self.env.now)
-            log_event(f"{self.env.now}: Llega un vehiculo a {calle} - Vehiculos en cola: {len(self.semaforos[calle].cola)}")
-            tiempo_llega_carro=self.env.now
-            # Al llegar un vehículo
-            self.semaforos[calle].historial_tamanos_cola.append(len(self.semaforos[calle].cola))
-            # Después de que un vehículo cruza
-            self.semaforos[calle].historial_tamanos_cola.append(len(self.semaforos[calle].cola))
-
-    
+            if self.nivel_traza >= NIVEL_EVENTOS:
+                self.traza.registrar(self.env.now, LLEGADA_CARRO, calle, len(self.semaforos[calle].cola))
+
     # Generador de llegada de peatones
     def generar_peatones(self):
         while True:
             yield self.env.timeout(random.expovariate(1.0 / INTERVALO_LLEGADA_PEATONES))
             self.cola_peatones.append(self.env.now)
-            self.historial_cola_peatones.append(len(self.cola_peatones))
-            log_event(f"{self.env.now}: Llega un peaton - Peatones esperando: {len(self.cola_peatones)}")
+            self.tam_cola_peatones.actualizar(self.env.now, len(self.cola_peatones))
+            if self.nivel_traza >= NIVEL_EVENTOS:
+                self.traza.registrar(self.env.now, LLEGADA_PEATON, cola=len(self.cola_peatones))
+            if self.aviso_peatones is not None and not self.aviso_peatones.triggered:
+                self.aviso_peatones.succeed()
+
+    # Saca de una vez los primeros n peatones de la cola (en orden de llegada)
+    def despachar_peatones(self, n):
+        if n >= len(self.cola_peatones):
+            llegadas = list(self.cola_peatones)
+            self.cola_peatones.clear()
+        else:
+            llegadas = [self.cola_peatones.popleft() for _ in range(n)]
+        self.tam_cola_peatones.actualizar(self.env.now, len(self.cola_peatones))
+        return llegadas
+
+    # Duerme hasta que se dispare el aviso o pasen ticks_max segundos, y devuelve
+    # cuántos ticks de 1 segundo habría consumido el sondeo (alineado al siguiente tick)
+    def dormir(self, aviso, ticks_max):
+        inicio = self.env.now
+        fin = self.env.timeout(ticks_max)
+        yield aviso | fin
+        if not aviso.triggered:
+            return ticks_max
+
+        ticks = max(1, math.ceil(self.env.now - inicio))
+        if ticks >= ticks_max:
+            yield fin
+            return ticks_max
+        yield self.env.timeout(inicio + ticks - self.env.now)
+        return ticks
+
+    # Espera de 1 segundo del modo sondeo con la cola vacía (perfil.py la
+    # redefine para contar los ticks ociosos)
+    def esperar_tick(self):
+        return self.env.timeout(1)
 
     # Controlador de las fases del semáforo
     def controlar_semaforos(self):
         while True:
             # Secuencia de semáforos
-            for calle in CALLES:
-                log_event(f"\n{self.env.now}: Semaforo VERDE en {calle}")
+            for fase, calle in enumerate(CALLES):
+                self.al_iniciar_fase(fase)
+                if self.nivel_traza >= NIVEL_FASES:
+                    self.traza.registrar(self.env.now, VERDE, calle)
                 carros_iniciales = len(self.semaforos[calle].cola)
 
                 tiempo_verde = TIEMPOS_VERDE[calle] # Tiempo que estará en verde
@@ -104,7 +155,7 @@ class Interseccion:
                 # Mientras el semáforo esté en verde
                 while (self.env.now - tiempo_inicio) < tiempo_verde:
                     if self.semaforos[calle].cola:
-                        tiempo_llega_carro = self.semaforos[calle].cola.pop(0)
+                        tiempo_llega_carro = self.semaforos[calle].sacar_carro()
                         carros_que_pasan += 1
                         tiempo_paso = random.uniform(2, 3) # Tiempo aleatorio que tarda en cruzar
 
@@ -114,21 +165,32 @@ class Interseccion:
                         yield self.env.timeout(tiempo_inicio_cruce - self.env.now)
                         yield self.env.timeout(tiempo_paso)
 
-                        log_event(f"{tiempo_inicio_cruce+tiempo_paso}: Vehiculo en {calle} - Llego en: {tiempo_llega_carro} - Tiempo de cruce: {round(tiempo_paso,2)} segundos - Termina en: {round(tiempo_inicio_cruce + tiempo_paso,2)} - Vehiculos restantes en cola: {len(self.semaforos[calle].cola)}")
+                        if self.nivel_traza >= NIVEL_EVENTOS:
+                            self.traza.registrar(tiempo_inicio_cruce + tiempo_paso, CRUCE_CARRO, calle, len(self.semaforos[calle].cola),
+                                                 tiempo_llega_carro, tiempo_paso)
 
+                        self.semaforos[calle].espera.agregar(tiempo_inicio_cruce - tiempo_llega_carro)
                         ultimo_tiempo_cruce = tiempo_inicio_cruce  # Actualizo el último cruce
+                    elif self.por_eventos:
+                        # Cola vacía: dormir hasta el próximo carro o el fin del verde
+                        semaforo = self.semaforos[calle]
+                        semaforo.aviso = self.env.event()
+                        yield from self.dormir(semaforo.aviso, math.ceil(tiempo_verde - (self.env.now - tiempo_inicio)))
+                        semaforo.aviso = None
                     else:
-                        yield self.env.timeout(1)
+                        yield self.esperar_tick()
 
 
                 self.semaforos[calle].pasados += carros_que_pasan
 
                 carros_restantes = len(self.semaforos[calle].cola)
-                log_event(f"{self.env.now}: Semaforo ROJO en {calle}")
-                log_event(f"Resumen {calle} -> Carros que pasaron: {carros_que_pasan}, Carros en cola: {carros_restantes}")
+                if self.nivel_traza >= NIVEL_FASES:
+                    self.traza.registrar(self.env.now, ROJO, calle, carros_restantes, valor=carros_que_pasan)
 
             # Paso peatonal
-            log_event(f"\n{self.env.now}: Paso peatonal activado - Todos en ROJO")
+            self.al_iniciar_peatonal()
+            if self.nivel_traza >= NIVEL_FASES:
+                self.traza.registrar(self.env.now, PASO_PEATONAL)
             peatones_que_pasan = 0
             tiempo_disponible = TIEMPO_PEATONAL
 
@@ -136,83 +198,127 @@ class Interseccion:
                 # Contar cuántos peatones estaban esperando antes del cruce
                 peatones_listos = len(self.cola_peatones)
 
-                if peatones_listos == 0:
-                    yield self.env.timeout(1)
+                if peatones_listos == 0 and self.por_eventos:
+                    # Dormir hasta el próximo peatón o hasta que no alcance para otro cruce
+                    self.aviso_peatones = self.env.event()
+                    ticks_max = math.floor(tiempo_disponible - TIEMPO_PASO_PEATON) + 1
+                    tiempo_disponible -= yield from self.dormir(self.aviso_peatones, ticks_max)
+                    self.aviso_peatones = None
+                elif peatones_listos == 0:
+                    yield self.esperar_tick()
                     tiempo_disponible -= 1
                 else:
                     # TODOS LOS QUE ESTABAN ANTES DE EMPEZAR EL PASO CRUZAN JUNTOS
-                    for _ in range(peatones_listos):
-                        llegada = self.cola_peatones.pop(0)
+                    for llegada in self.despachar_peatones(peatones_listos):
                         # Calcular y guardar tiempo de espera
-                        self.espera_peatones.append(self.env.now - llegada)
-                        # Cruzan todos los peatones que ya estaban en espera
-                        peatones_que_pasan += peatones_listos
-                        self.pasaron_peatones += peatones_listos
-                        #self.cola_peatones.clear()
-                        #self.historial_cola_peatones.append(0)
+                        self.espera_peatones.agregar(self.env.now - llegada)
+                    # Cruzan todos los peatones que ya estaban en espera
+                    peatones_que_pasan += peatones_listos
+                    self.pasaron_peatones += peatones_listos
 
                     yield self.env.timeout(TIEMPO_PASO_PEATON)
                     tiempo_disponible -= TIEMPO_PASO_PEATON
 
-            log_event(f"{self.env.now}: Peatones que pasaron: {peatones_que_pasan}, Peatones que quedaron: {len(self.cola_peatones)}")
+            if self.nivel_traza >= NIVEL_FASES:
+                self.traza.registrar(self.env.now, FIN_PASO_PEATONAL, cola=len(self.cola_peatones), valor=peatones_que_pasan)
             yield self.env.timeout(1)
 
-# Crear entorno de simulación
-env = simpy.Environment()
-interseccion = Interseccion(env)
-
-# Ejecutar simulación
-env.run(until=TIEMPO_SIMULACION)
-
-# Reporte Final
-log_event("\n===== RESULTADOS FINALES DE LA SIMULACION =====\n")
-
-log_event(">>> VEHICULOS <<<")
-for nombre, semaforo in interseccion.semaforos.items():
-    # Cálculo del tiempo promedio de espera de vehículos en cada calle
-    tiempo_prom_espera = sum([max(0, interseccion.env.now - llegada) for llegada in semaforo.cola]) / len(semaforo.cola) if semaforo.cola else 0
-    promedio_cola = sum(semaforo.historial_tamanos_cola) / len(semaforo.historial_tamanos_cola) if semaforo.historial_tamanos_cola else 0
-
-    log_event(f"{nombre}:")
-    log_event(f"  Total de vehiculos que pasaron: {semaforo.pasados}")
-    log_event(f"  Vehiculos que quedaron en espera: {len(semaforo.cola)}")
-    log_event(f"  Tiempo promedio de espera: {round(tiempo_prom_espera,2)} seg")
-    log_event(f"  Tamano promedio de cola: {round(promedio_cola, 2)}")
-
-log_event("\n>>> PEATONES <<<")
-
-# Tiempo promedio de espera de peatones
-tiempo_prom_peatones = sum([interseccion.env.now - llegada for llegada in interseccion.cola_peatones]) / len(interseccion.cola_peatones) if interseccion.cola_peatones else 0
-tamaño_prom_cola_peatones = len(interseccion.cola_peatones)
-promedio_tam_cola_peatones = sum(interseccion.historial_cola_peatones) / len(interseccion.historial_cola_peatones) if interseccion.historial_cola_peatones else 0
-promedio_espera_peatones = sum(interseccion.espera_peatones) / len(interseccion.espera_peatones) if interseccion.espera_peatones else 0
-
-log_event(f"Total de peatones que lograron cruzar: {interseccion.pasaron_peatones}")
-log_event(f"Total de peatones que quedaron esperando: {len(interseccion.cola_peatones)}")
-
-
-log_event(f"Tiempo promedio de espera de peatones: {round(promedio_espera_peatones,2)} seg")
-log_event(f"Tamano promedio de cola de peatones: {round(promedio_tam_cola_peatones,2)}")
-
-log_event("\n===== FIN DE LOS RESULTADOS =====")
-
-print("\n===== RESULTADOS FINALES DE LA SIMULACION =====\n")
-
-print(">>> VEHÍCULOS <<<")
-for nombre, semaforo in interseccion.semaforos.items():
-    tiempo_prom_espera = sum([max(0, interseccion.env.now - llegada) for llegada in semaforo.cola]) / len(semaforo.cola) if semaforo.cola else 0
-    promedio_cola = sum(semaforo.historial_tamanos_cola) / len(semaforo.historial_tamanos_cola) if semaforo.historial_tamanos_cola else 0
-
-    print(f"{nombre}:")
-    print(f"  Total de vehiculos que pasaron: {semaforo.pasados}")
-    print(f"  Vehiculos que quedaron en espera: {len(semaforo.cola)}")
-    print(f"  Tiempo promedio de espera: {round(tiempo_prom_espera,2)} seg")
-    print(f"  Tamaño promedio de cola: {round(promedio_cola, 2)}")
-
-print("\n>>> PEATONES <<<")
-print(f"Total de peatones que lograron cruzar: {interseccion.pasaron_peatones}")
-print(f"Total de peatones que quedaron esperando: {len(interseccion.cola_peatones)}")
-print(f"Tiempo promedio de espera de peatones: {round(promedio_espera_peatones,2)} seg")
-print(f"Tamaño promedio de cola de peatones: {round(promedio_tam_cola_peatones,2)}")
-
-print("\n===== FIN DE LOS RESULTADOS =====")
\ No newline at end of file
+    # Se llama al empezar el verde de CALLES[fase] (transmision.py lo usa para los resúmenes por ciclo)
+    def al_iniciar_fase(self, fase):
+        pass
+
+    # Se llama al empezar el paso peatonal (perfil.py lo usa para medir las fases)
+    def al_iniciar_peatonal(self):
+        pass
+
+    # Resúmenes en vivo mientras avanza la simulación (ver transmision.resumenes)
+    def transmitir(self, **opciones):
+        from transmision import resumenes
+        return resumenes(self, **opciones)
+
+    def transmitir_async(self, **opciones):
+        from transmision import resumenes_async
+        return resumenes_async(self, **opciones)
+
+if __name__ == "__main__":
+    # Crear la traza (si está activada) y el entorno de simulación
+    traza = Traza(ARCHIVO_TRAZA, NIVEL_TRAZA, CALLES, hilo=TRAZA_EN_HILO) if NIVEL_TRAZA > NIVEL_APAGADO else None
+    env = simpy.Environment()
+    interseccion = Interseccion(env, traza=traza)
+
+    # Ejecutar simulación
+    env.run(until=TIEMPO_SIMULACION)
+
+    # Reporte Final (se agrega al final del texto de la traza)
+    reporte = []
+    reporte.append("\n===== RESULTADOS FINALES DE LA SIMULACION =====\n")
+
+    reporte.append(">>> VEHICULOS <<<")
+    for nombre, semaforo in interseccion.semaforos.items():
+        # Cálculo del tiempo promedio de espera de vehículos en cada calle
+        tiempo_prom_espera = sum([max(0, interseccion.env.now - llegada) for llegada in semaforo.cola]) / len(semaforo.cola) if semaforo.cola else 0
+        promedio_cola = semaforo.tam_cola.promedio(interseccion.env.now)
+        espera = semaforo.espera
+
+        reporte.append(f"{nombre}:")
+        reporte.append(f"  Total de vehiculos que pasaron: {semaforo.pasados}")
+        reporte.append(f"  Vehiculos que quedaron en espera: {len(semaforo.cola)}")
+        reporte.append(f"  Tiempo promedio de espera: {round(tiempo_prom_espera,2)} seg")
+        reporte.append(f"  Tamano promedio de cola: {round(promedio_cola, 2)}")
+        reporte.append(f"  Tamano maximo de cola: {semaforo.tam_cola.maximo}")
+        reporte.append(f"  Espera de los que cruzaron: prom {round(espera.media,2)} | desv {round(espera.desviacion,2)} | "
+                       f"p50 {round(espera.cuantil(0.5),2)} | p95 {round(espera.cuantil(0.95),2)} | p99 {round(espera.cuantil(0.99),2)} seg")
+
+    reporte.append("\n>>> PEATONES <<<")
+
+    # Tiempo promedio de espera de peatones
+    tiempo_prom_peatones = sum([interseccion.env.now - llegada for llegada in interseccion.cola_peatones]) / len(interseccion.cola_peatones) if interseccion.cola_peatones else 0
+    tamaño_prom_cola_peatones = len(interseccion.cola_peatones)
+    promedio_tam_cola_peatones = interseccion.tam_cola_peatones.promedio(interseccion.env.now)
+    espera_peatones = interseccion.espera_peatones
+    promedio_espera_peatones = espera_peatones.media
+
+    reporte.append(f"Total de peatones que lograron cruzar: {interseccion.pasaron_peatones}")
+    reporte.append(f"Total de peatones que quedaron esperando: {len(interseccion.cola_peatones)}")
+
+
+    reporte.append(f"Tiempo promedio de espera de peatones: {round(promedio_espera_peatones,2)} seg")
+    reporte.append(f"Tamano promedio de cola de peatones: {round(promedio_tam_cola_peatones,2)}")
+    reporte.append(f"Tamano maximo de cola de peatones: {interseccion.tam_cola_peatones.maximo}")
+    reporte.append(f"Espera de peatones p50/p95/p99: {round(espera_peatones.cuantil(0.5),2)} / "
+                   f"{round(espera_peatones.cuantil(0.95),2)} / {round(espera_peatones.cuantil(0.99),2)} seg")
+
+    reporte.append("\n===== FIN DE LOS RESULTADOS =====")
+
+    # Cerrar la traza binaria y generar su versión legible
+    if traza is not None:
+        traza.cerrar()
+        a_texto(ARCHIVO_TRAZA, ARCHIVO_EVENTOS, pie=reporte)
+
+    print("\n===== RESULTADOS FINALES DE LA SIMULACION =====\n")
+
+    print(">>> VEHÍCULOS <<<")
+    for nombre, semaforo in interseccion.semaforos.items():
+        tiempo_prom_espera = sum([max(0, interseccion.env.now - llegada) for llegada in semaforo.cola]) / len(semaforo.cola) if semaforo.cola else 0
+        promedio_cola = semaforo.tam_cola.promedio(interseccion.env.now)
+        espera = semaforo.espera
+
+        print(f"{nombre}:")
+        print(f"  Total de vehiculos que pasaron: {semaforo.pasados}")
+        print(f"  Vehiculos que quedaron en espera: {len(semaforo.cola)}")
+        print(f"  Tiempo promedio de espera: {round(tiempo_prom_espera,2)} seg")
+        print(f"  Tamaño promedio de cola: {round(promedio_cola, 2)}")
+        print(f"  Tamaño máximo de cola: {semaforo.tam_cola.maximo}")
+        print(f"  Espera de los que cruzaron: prom {round(espera.media,2)} | desv {round(espera.desviacion,2)} | "
+              f"p50 {round(espera.cuantil(0.5),2)} | p95 {round(espera.cuantil(0.95),2)} | p99 {round(espera.cuantil(0.99),2)} seg")
+
+    print("\n>>> PEATONES <<<")
+    print(f"Total de peatones que lograron cruzar: {interseccion.pasaron_peatones}")
+    print(f"Total de peatones que quedaron esperando: {len(interseccion.cola_peatones)}")
+    print(f"Tiempo promedio de espera de peatones: {round(promedio_espera_peatones,2)} seg")
+    print(f"Tamaño promedio de cola de peatones: {round(promedio_tam_cola_peatones,2)}")
+    print(f"Tamaño máximo de cola de peatones: {interseccion.tam_cola_peatones.maximo}")
+    print(f"Espera de peatones p50/p95/p99: {round(espera_peatones.cuantil(0.5),2)} / "
+          f"{round(espera_peatones.cuantil(0.95),2)} / {round(espera_peatones.cuantil(0.99),2)} seg")
+
+    print("\n===== FIN DE LOS RESULTADOS =====")
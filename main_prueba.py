@@ -1,9 +1,11 @@
 import simpy
 import random
-import pandas as pd
-import numpy as np
-import scipy.stats as stats
-import matplotlib.pyplot as plt
+from collections import deque
+import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from estadisticas import PromedioTemporal, EstadisticaEspera
 
 # Parámetros Globales
 CALLES = ["Norte-L1", "Sur-L2", "Este-L3", "Oeste-L4"]
@@ -25,12 +27,44 @@ TIEMPO_SIMULACION = 3600
 # Tiempo de cruce de peatón
 TIEMPO_PASO_PEATON = 6
 
+# Duración del paso peatonal después de cada fase (todos en rojo). Un escenario
+# puede cambiarla con la clave "Peatonal"
+TIEMPO_PEATONAL = 20
+
 # Tiempo entre cruce de autos
 TIEMPO_ENTRE_CARROS = 1
 
+# Control por eventos: con la cola vacía el controlador duerme hasta la próxima
+# llegada o el fin de la ventana (False = sondeo de 1 segundo, comportamiento original)
+CONTROL_POR_EVENTOS = True
+
+# Motor de simular_replica: "simpy" (procesos de SimPy) o "calendario" (calendario
+# de eventos propio de motor_calendario.py, mismos resultados y más rápido). red.py,
+# perfil.py y transmision.py crean su Interseccion de SimPy directamente.
+MOTOR = "simpy"
+
 # Cantidad de repeticiones por escenario
 REPETS = 5
 
+# Semilla base para las repeticiones (cada (escenario, repetición) deriva su propio flujo)
+SEMILLA_BASE = 2024
+
+# Flujos aleatorios dedicados (uno por calle y propósito) para números
+# aleatorios comunes entre escenarios y variables antitéticas
+FLUJOS_ALEATORIOS = [f"llegadas:{calle}" for calle in CALLES] + ["peatones"] + [f"cruce:{calle}" for calle in CALLES]
+
+# Flujos que se invierten (u -> 1 - u) en la repetición antitética de cada par
+FLUJOS_ANTITETICOS = [f"llegadas:{calle}" for calle in CALLES] + ["peatones"]
+
+# Nivel de confianza de los intervalos que se reportan
+CONFIANZA = 0.95
+
+# Procesos para el barrido en paralelo (None = todos los núcleos, 1 = en serie)
+PROCESOS = None
+
+# Procesos para dibujar las gráficas (None = todos los núcleos, 1 = en serie)
+PROCESOS_GRAFICAS = None
+
 # Definición de escenarios (cada uno con tiempos de verde diferentes)
 ESCENARIOS = [
     {"nombre": "Escenario_1", "Norte-L1": 30, "Sur-L2": 30, "Este-L3": 180, "Oeste-L4": 180},
@@ -39,26 +73,60 @@ ESCENARIOS = [
     {"nombre": "Escenario_4", "Norte-L1": 30, "Sur-L2": 30, "Este-L3": 120, "Oeste-L4": 120}
 ]
 
+# Generador que devuelve 1 - u en lugar de u: las exponenciales y uniformes
+# sorteadas con él quedan en el extremo opuesto a las del generador normal
+# con la misma semilla
+class RandomAntitetico(random.Random):
+    def random(self):
+        u = super().random()
+        # 1 - 0 daría log(0) en expovariate; ese caso (probabilidad 2^-53) queda en 0
+        return 1.0 - u if u > 0.0 else 0.0
+
 # Clase que representa cada semáforo
 class Semaforo:
-    def __init__(self, env, nombre):
+    def __init__(self, env, nombre, cola=()):
         self.env = env
         self.nombre = nombre
-        self.cola = []  # Carros esperando
+        self.cola = deque(cola)  # Carros esperando (cola FIFO de tiempos de llegada)
         self.pasados = 0  # Carros que lograron cruzar
-        self.tiempos_espera = []  # Tiempo de espera de cada carro
+        self.espera = EstadisticaEspera()  # Tiempos de espera (media, varianza y cuantiles)
+        self.tam_cola = PromedioTemporal(env.now, len(self.cola))  # Tamaño de la cola ponderado en el tiempo
+        self.aviso = None  # Evento que despierta al controlador cuando llega un carro
 
     def agregar_carro(self, llegada):
         self.cola.append(llegada)
+        self.tam_cola.actualizar(self.env.now, len(self.cola))
+        if self.aviso is not None and not self.aviso.triggered:
+            self.aviso.succeed()
+
+    def sacar_carro(self):
+        llegada = self.cola.popleft()
+        self.tam_cola.actualizar(self.env.now, len(self.cola))
+        return llegada
 
 # Clase que representa toda la intersección
 class Interseccion:
-    def __init__(self, env, tiempos_verde):
+    # "estado" (de capturar_estado) continúa la simulación desde un instante
+    # guardado: colas llenas y controlador al inicio de esa fase. Las
+    # estadísticas empiezan de cero en env.now. "flujos" ({propósito: Random},
+    # ver crear_flujos) reemplaza a "rng" en los sorteos que nombra.
+    def __init__(self, env, tiempos_verde, rng=random, por_eventos=CONTROL_POR_EVENTOS, estado=None, flujos=None):
         self.env = env
         self.tiempos_verde = tiempos_verde  # Tiempo verde de cada calle
-        self.semaforos = {nombre: Semaforo(env, nombre) for nombre in CALLES}
-        self.cola_peatones = []  # Lista de peatones esperando
-        self.espera_peatones = []  # Tiempo de espera de peatones
+        self.tiempo_peatonal = tiempos_verde.get("Peatonal", TIEMPO_PEATONAL)  # Duración del paso peatonal
+        self.rng = rng  # Generador aleatorio propio de la repetición
+        flujos = flujos or {}
+        self.rng_llegadas = {calle: flujos.get(f"llegadas:{calle}", rng) for calle in CALLES}
+        self.rng_peatones = flujos.get("peatones", rng)
+        self.rng_cruce = {calle: flujos.get(f"cruce:{calle}", rng) for calle in CALLES}
+        self.por_eventos = por_eventos  # Dormir hasta la próxima llegada en vez de sondear
+        estado = estado or {}
+        self.fase_inicial = estado.get("fase", 0)  # Índice de la calle con la que arranca el controlador
+        self.semaforos = {nombre: Semaforo(env, nombre, estado.get("colas", {}).get(nombre, ())) for nombre in CALLES}
+        self.cola_peatones = deque(estado.get("peatones", ()))  # Lista de peatones esperando
+        self.espera_peatones = EstadisticaEspera()  # Tiempo de espera de peatones
+        self.tam_cola_peatones = PromedioTemporal(env.now, len(self.cola_peatones))  # Tamaño de la cola de peatones en el tiempo
+        self.aviso_peatones = None  # Evento que despierta al controlador cuando llega un peatón
 
         for calle in CALLES:
             self.env.process(self.generar_carros(calle))
@@ -69,169 +137,440 @@ class Interseccion:
     # Genera los carros en cada calle con base en su intervalo de llegada
     def generar_carros(self, calle):
         while True:
-            yield self.env.timeout(random.expovariate(1.0 / INTERVALO_LLEGADA_CARROS[calle]))
+            yield self.env.timeout(self.rng_llegadas[calle].expovariate(1.0 / INTERVALO_LLEGADA_CARROS[calle]))
             self.semaforos[calle].agregar_carro(self.env.now)
 
     # Genera peatones con base en su intervalo de llegada
     def generar_peatones(self):
         while True:
-            yield self.env.timeout(random.expovariate(1.0 / INTERVALO_LLEGADA_PEATONES))
+            yield self.env.timeout(self.rng_peatones.expovariate(1.0 / INTERVALO_LLEGADA_PEATONES))
             self.cola_peatones.append(self.env.now)
+            self.tam_cola_peatones.actualizar(self.env.now, len(self.cola_peatones))
+            if self.aviso_peatones is not None and not self.aviso_peatones.triggered:
+                self.aviso_peatones.succeed()
+
+    # Duerme hasta que se dispare el aviso o pasen ticks_max segundos, y devuelve
+    # cuántos ticks de 1 segundo habría consumido el sondeo. Al despertar por una
+    # llegada se alinea al siguiente tick, igual que el sondeo original.
+    def dormir(self, aviso, ticks_max):
+        inicio = self.env.now
+        fin = self.env.timeout(ticks_max)
+        yield aviso | fin
+        if not aviso.triggered:
+            return ticks_max
+
+        ticks = max(1, math.ceil(self.env.now - inicio))
+        if ticks >= ticks_max:
+            yield fin
+            return ticks_max
+        yield self.env.timeout(inicio + ticks - self.env.now)
+        return ticks
+
+    # Espera de 1 segundo del modo sondeo con la cola vacía (perfil.py la
+    # redefine para contar los ticks ociosos)
+    def esperar_tick(self):
+        return self.env.timeout(1)
 
     # Controla las fases de los semáforos y permite cruce de peatones
     def controlar_semaforos(self):
+        primera = self.fase_inicial
         while True:
-            for calle in CALLES:
+            for fase in range(primera, len(CALLES)):
+                calle = CALLES[fase]
+                self.al_iniciar_fase(fase)
                 inicio_fase = self.env.now
                 ultimo_cruce = self.env.now  # Último carro que cruzó
 
                 # Mientras el semáforo esté en verde
                 while (self.env.now - inicio_fase) < self.tiempos_verde[calle]:
                     if self.semaforos[calle].cola:
-                        llegada = self.semaforos[calle].cola.pop(0)
-                        paso = random.uniform(2, 3)  # Tiempo aleatorio de cruce
+                        llegada = self.semaforos[calle].sacar_carro()
+                        paso = self.rng_cruce[calle].uniform(2, 3)  # Tiempo aleatorio de cruce
                         # El carro empieza a cruzar según el momento correcto
                         inicio_cruce = max(self.env.now, llegada, ultimo_cruce + TIEMPO_ENTRE_CARROS)
                         yield self.env.timeout(max(0, inicio_cruce - self.env.now))
                         yield self.env.timeout(paso)
-                        self.semaforos[calle].tiempos_espera.append(inicio_cruce - llegada)
+                        self.semaforos[calle].espera.agregar(inicio_cruce - llegada)
                         self.semaforos[calle].pasados += 1
                         ultimo_cruce = inicio_cruce
+                        self.al_cruzar(calle, llegada)
+                    elif self.por_eventos:
+                        semaforo = self.semaforos[calle]
+                        semaforo.aviso = self.env.event()
+                        restante = self.tiempos_verde[calle] - (self.env.now - inicio_fase)
+                        yield from self.dormir(semaforo.aviso, math.ceil(restante))
+                        semaforo.aviso = None
                     else:
-                        yield self.env.timeout(1)
+                        yield self.esperar_tick()
 
                 # Luego paso peatonal (todos los semáforos en rojo)
-                tiempo_disponible = 20
+                self.al_iniciar_peatonal()
+                tiempo_disponible = self.tiempo_peatonal
                 while tiempo_disponible >= TIEMPO_PASO_PEATON:
-                    if not self.cola_peatones:
-                        yield self.env.timeout(1)
+                    if not self.cola_peatones and self.por_eventos:
+                        # Ticks hasta que ya no alcance el tiempo para otro cruce
+                        self.aviso_peatones = self.env.event()
+                        ticks_max = math.floor(tiempo_disponible - TIEMPO_PASO_PEATON) + 1
+                        tiempo_disponible -= yield from self.dormir(self.aviso_peatones, ticks_max)
+                        self.aviso_peatones = None
+                    elif not self.cola_peatones:
+                        yield self.esperar_tick()
                         tiempo_disponible -= 1
                     else:
-                        llegada = self.cola_peatones.pop(0)
-                        espera = self.env.now - llegada
-                        self.espera_peatones.append(espera)
+                        llegada = self.cola_peatones.popleft()
+                        self.tam_cola_peatones.actualizar(self.env.now, len(self.cola_peatones))
+                        self.espera_peatones.agregar(self.env.now - llegada)
                         yield self.env.timeout(TIEMPO_PASO_PEATON)
                         tiempo_disponible -= TIEMPO_PASO_PEATON
-
-
-# Lista para almacenar todos los resultados
-resultados = []
-
-# Ejecución de todas las simulaciones por escenario y repeticiones
-for escenario in ESCENARIOS:
-    for rep in range(REPETS):
-        env = simpy.Environment()
-        interseccion = Interseccion(env, escenario)
-        env.run(until=TIEMPO_SIMULACION)
-
-        # Diccionario para guardar los resultados de esta repetición
-        res = {
-            "Escenario": escenario["nombre"],
-            "Repeticion": rep+1,
-            "Peatones_Pasados": len(interseccion.espera_peatones),
-            "Peatones_Cola": len(interseccion.cola_peatones),
-            "Espera_Prom_Pea": np.mean(interseccion.espera_peatones) if interseccion.espera_peatones else 0,
-            "Tamaño_Cola_Pea": len(interseccion.cola_peatones)
-        }
-
-        # Guardar los resultados por cada calle individualmente
-        for calle in CALLES:
-            semaforo = interseccion.semaforos[calle]
-            res[f"{calle}_Pasados"] = semaforo.pasados
-            res[f"{calle}_Cola"] = len(semaforo.cola)
-            res[f"{calle}_Espera_Prom"] = np.mean(semaforo.tiempos_espera) if semaforo.tiempos_espera else 0
-            res[f"{calle}_Tam_Cola"] = len(semaforo.cola)
-
-        resultados.append(res)
-
-# Crear DataFrame con todos los resultados
-df = pd.DataFrame(resultados)
-
-# Guardar todos los resultados en .csv
-df.to_csv("resultados.csv", index=False)
-
-# Generar TXT por escenario
-for escenario in ESCENARIOS:
-    df_esc = df[df["Escenario"] == escenario["nombre"]]
-
-    with open(f"Resultado_{escenario['nombre']}.txt", "w", encoding="utf-8") as f:
-        f.write(f"RESULTADOS DEL {escenario['nombre']}\n\n")
-        f.write(">>> Tiempos de Semáforo <<<\n")
-        for calle in CALLES:
-            f.write(f"{calle}: {escenario[calle]} segundos\n")
-        f.write("\n")
-
-        # Resultados por cada repetición
-        for idx, row in df_esc.iterrows():
-            f.write(f"Repetición {int(row['Repeticion'])}:\n\n")
-
-            f.write(">>> Vehículos <<<\n")
+            primera = 0
+
+    # Se llama al empezar el verde de CALLES[fase], antes de atender su cola.
+    # En ese instante no hay carros ni peatones cruzando: el estado completo son
+    # las colas (ver capturar_estado). calentamiento.py lo usa para el snapshot.
+    def al_iniciar_fase(self, fase):
+        pass
+
+    # Se llama al empezar cada paso peatonal (perfil.py lo usa para medir las fases)
+    def al_iniciar_peatonal(self):
+        pass
+
+    # Resúmenes en vivo mientras avanza la simulación (ver transmision.resumenes)
+    def transmitir(self, **opciones):
+        from transmision import resumenes
+        return resumenes(self, **opciones)
+
+    def transmitir_async(self, **opciones):
+        from transmision import resumenes_async
+        return resumenes_async(self, **opciones)
+
+    # Se llama cuando un carro termina de cruzar (en env.now). Aquí el carro
+    # simplemente sale; red.py lo redefine para pasarlo a la siguiente intersección.
+    def al_cruzar(self, calle, llegada):
+        pass
+
+
+# Semilla reproducible de una repetición a partir de (escenario, repetición, semilla base)
+def semilla_replica(nombre, rep, semilla_base=SEMILLA_BASE):
+    clave = f"{semilla_base}:{nombre}:{rep}".encode("utf-8")
+    return int.from_bytes(hashlib.sha256(clave).digest()[:8], "big")
+
+
+# Flujos aleatorios dedicados de una repetición. Con crn=True las semillas no
+# dependen del escenario (números aleatorios comunes: todos los escenarios ven
+# las mismas llegadas y cruces). Con antitetica=True las repeticiones van de a
+# pares que comparten semilla, y la segunda de cada par invierte las llegadas.
+def crear_flujos(nombre, rep, semilla_base=SEMILLA_BASE, crn=False, antitetica=False):
+    base = "crn" if crn else nombre
+    numero = rep // 2 if antitetica else rep
+    invertir = antitetica and rep % 2 == 1
+    return {proposito: (RandomAntitetico if invertir and proposito in FLUJOS_ANTITETICOS else random.Random)(
+                semilla_replica(f"{base}:{proposito}", numero, semilla_base))
+            for proposito in FLUJOS_ALEATORIOS}
+
+
+# Estado de una intersección al inicio de una fase, para continuar desde ahí
+# con Interseccion(..., estado=...). Incluye el estado del generador aleatorio
+# por si se quiere seguir la misma trayectoria (random.Random().setstate).
+def capturar_estado(interseccion, fase):
+    return {
+        "tiempo": interseccion.env.now,
+        "fase": fase,
+        "colas": {calle: list(interseccion.semaforos[calle].cola) for calle in CALLES},
+        "peatones": list(interseccion.cola_peatones),
+        "rng": interseccion.rng.getstate()
+    }
+
+
+# Métricas de una intersección al terminar la simulación en el instante "tiempo"
+def resumen_interseccion(interseccion, tiempo):
+    espera_pea = interseccion.espera_peatones
+    cola_pea = interseccion.tam_cola_peatones
+
+    res = {
+        "Peatones_Pasados": espera_pea.n,
+        "Peatones_Cola": len(interseccion.cola_peatones),
+        "Espera_Prom_Pea": espera_pea.media,
+        "Tamaño_Cola_Pea": len(interseccion.cola_peatones),
+        "Espera_Desv_Pea": espera_pea.desviacion,
+        "Espera_P50_Pea": espera_pea.cuantil(0.5),
+        "Espera_P95_Pea": espera_pea.cuantil(0.95),
+        "Espera_P99_Pea": espera_pea.cuantil(0.99),
+        "Cola_Prom_Pea": cola_pea.promedio(tiempo),
+        "Cola_Max_Pea": cola_pea.maximo
+    }
+
+    # Guardar los resultados por cada calle individualmente
+    for calle in CALLES:
+        semaforo = interseccion.semaforos[calle]
+        res[f"{calle}_Pasados"] = semaforo.pasados
+        res[f"{calle}_Cola"] = len(semaforo.cola)
+        res[f"{calle}_Espera_Prom"] = semaforo.espera.media
+        res[f"{calle}_Tam_Cola"] = len(semaforo.cola)
+        res[f"{calle}_Espera_Desv"] = semaforo.espera.desviacion
+        res[f"{calle}_Espera_P50"] = semaforo.espera.cuantil(0.5)
+        res[f"{calle}_Espera_P95"] = semaforo.espera.cuantil(0.95)
+        res[f"{calle}_Espera_P99"] = semaforo.espera.cuantil(0.99)
+        res[f"{calle}_Cola_Prom"] = semaforo.tam_cola.promedio(tiempo)
+        res[f"{calle}_Cola_Max"] = semaforo.tam_cola.maximo
+
+    return res
+
+
+# Ejecuta una repetición independiente y devuelve su fila de resultados. Con
+# "estado" la repetición parte de ese snapshot y mide "tiempo" segundos desde
+# ahí, con su propio flujo aleatorio. "crn" y "antitetica": ver crear_flujos.
+def simular_replica(escenario, rep, semilla_base=SEMILLA_BASE, por_eventos=CONTROL_POR_EVENTOS, tiempo=TIEMPO_SIMULACION,
+                    estado=None, crn=False, antitetica=False, motor=MOTOR):
+    inicio = estado["tiempo"] if estado else 0
+    rng = random.Random(semilla_replica(escenario["nombre"], rep, semilla_base))
+    flujos = crear_flujos(escenario["nombre"], rep, semilla_base, crn, antitetica) if crn or antitetica else None
+    if motor == "calendario":
+        from motor_calendario import Calendario, InterseccionCalendario
+        env = Calendario(initial_time=inicio)
+        interseccion = InterseccionCalendario(env, escenario, rng, por_eventos, estado, flujos)
+    else:
+        env = simpy.Environment(initial_time=inicio)
+        interseccion = Interseccion(env, escenario, rng, por_eventos, estado, flujos)
+    env.run(until=env.now + tiempo)
+
+    # Diccionario para guardar los resultados de esta repetición
+    res = {"Escenario": escenario["nombre"], "Repeticion": rep+1}
+    res.update(resumen_interseccion(interseccion, env.now))
+    return res
+
+
+# Adaptador para el pool de procesos (recibe una tupla de argumentos)
+def _simular_tarea(tarea):
+    return simular_replica(*tarea)
+
+
+# Tareas (argumentos de simular_replica) de un barrido, en orden escenario por escenario
+def tareas_barrido(escenarios=ESCENARIOS, repets=REPETS, semilla_base=SEMILLA_BASE, tiempo=TIEMPO_SIMULACION):
+    return [(escenario, rep, semilla_base, CONTROL_POR_EVENTOS, tiempo) for escenario in escenarios for rep in range(repets)]
+
+
+# Ejecuta todas las (escenario, repetición) repartidas en un pool de procesos.
+# Las filas salen en el mismo orden que en la ejecución en serie.
+def ejecutar_barrido(escenarios=ESCENARIOS, repets=REPETS, semilla_base=SEMILLA_BASE, procesos=PROCESOS,
+                     tiempo=TIEMPO_SIMULACION):
+    return ejecutar_tareas(tareas_barrido(escenarios, repets, semilla_base, tiempo), procesos)
+
+
+# Ejecuta una lista de tareas en un pool de procesos; las filas salen en el orden de las tareas
+def ejecutar_tareas(tareas, procesos=PROCESOS):
+    procesos = procesos or os.cpu_count() or 1
+
+    if procesos == 1 or len(tareas) == 1:
+        return [_simular_tarea(tarea) for tarea in tareas]
+
+    # Bloques grandes para que el costo de comunicación no domine en barridos grandes
+    bloque = max(1, len(tareas) // (procesos * 4))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(_simular_tarea, tareas, chunksize=bloque))
+
+
+# Métricas clave de una repetición (las de los archivos .sca)
+def metricas_clave(fila):
+    return {
+        "TiempoEsperaVehiculos": sum(fila[f"{calle}_Espera_Prom"] for calle in CALLES) / len(CALLES),
+        "TiempoEsperaPeatones": fila["Espera_Prom_Pea"],
+        "TamanoColaVehiculos": sum(fila[f"{calle}_Tam_Cola"] for calle in CALLES) / len(CALLES),
+        "TamanoColaPeatones": fila["Tamaño_Cola_Pea"]
+    }
+
+
+# Media, semiancho del intervalo t de Student y observaciones de cada métrica
+# clave. Si las filas tienen la columna "Grupo" (pares antitéticos), cada grupo
+# cuenta como una sola observación: el promedio de sus repeticiones.
+def intervalos_metricas(filas, confianza=CONFIANZA):
+    from scipy.stats import t as t_student
+
+    grupos = {}
+    for i, fila in enumerate(filas):
+        grupos.setdefault(fila.get("Grupo", i), []).append(metricas_clave(fila))
+
+    intervalos = {}
+    for metrica in metricas_clave(filas[0]):
+        valores = [sum(m[metrica] for m in miembros) / len(miembros) for miembros in grupos.values()]
+        n = len(valores)
+        media = sum(valores) / n
+        semiancho = 0.0
+        if n > 1:
+            varianza = sum((v - media) ** 2 for v in valores) / (n - 1)
+            semiancho = t_student.ppf((1 + confianza) / 2, n - 1) * math.sqrt(varianza / n)
+        intervalos[metrica] = (media, semiancho, n)
+    return intervalos
+
+
+# Escribe el .sca (escalares: promedios, semianchos y repeticiones) y el .vec
+# (valor de cada repetición) de cada escenario
+def generar_sca(df, escenarios=ESCENARIOS, confianza=CONFIANZA):
+    for escenario in escenarios:
+        nombre = escenario["nombre"]
+        filas = df[df["Escenario"] == nombre].to_dict("records")
+        intervalos = intervalos_metricas(filas, confianza)
+
+        with open(f"{nombre}.sca", "w", encoding="utf-8") as f:
+            for metrica, (media, _, _) in intervalos.items():
+                f.write(f"scalar {nombre} {metrica} {round(media, 4)}\n")
+            for metrica, (media, semiancho, _) in intervalos.items():
+                f.write(f"scalar {nombre} {metrica}_Semiancho{int(confianza * 100)} {round(semiancho, 4)}\n")
+            f.write(f"scalar {nombre} Repeticiones {len(filas)}\n")
+
+        # Un vector por métrica con la repetición como "tiempo" (se lee con vectores.LectorVec)
+        from vectores import EscritorVec
+        with EscritorVec(f"{nombre}.vec") as escritor:
+            for sufijo, metrica in (("Vehiculos", "TiempoEsperaVehiculos"), ("Peatones", "TiempoEsperaPeatones")):
+                vector = escritor.registrar(f"{nombre}_{sufijo}", metrica)
+                for fila in filas:
+                    escritor.agregar(vector, int(fila["Repeticion"]), round(metricas_clave(fila)[metrica], 4))
+
+
+# Genera un TXT por escenario con cada repetición y el resumen general
+def generar_txt(df, escenarios=ESCENARIOS):
+    for escenario in escenarios:
+        df_esc = df[df["Escenario"] == escenario["nombre"]]
+
+        with open(f"Resultado_{escenario['nombre']}.txt", "w", encoding="utf-8") as f:
+            f.write(f"RESULTADOS DEL {escenario['nombre']}\n\n")
+            f.write(">>> Tiempos de Semáforo <<<\n")
             for calle in CALLES:
-                f.write(f"{calle} -> Pasaron: {int(row[f'{calle}_Pasados'])} | En espera: {int(row[f'{calle}_Cola'])}\n")
-                f.write(f"Tiempo Promedio de Espera: {round(row[f'{calle}_Espera_Prom'], 2)} seg\n")
-
-            f.write("\n>>> Peatones <<<\n")
-            f.write(f"Cruzaron: {int(row['Peatones_Pasados'])}\n")
-            f.write(f"En espera: {int(row['Peatones_Cola'])}\n")
-            f.write(f"Tiempo Promedio Espera Peatones: {round(row['Espera_Prom_Pea'], 2)} seg\n")
-            f.write("\n-------------------------------------\n\n")
-
-        # Resumen general del escenario (promedio de las 5 repeticiones)
-        resumen = df_esc.mean(numeric_only=True)
-
-        f.write("===== RESUMEN GENERAL DEL ESCENARIO =====\n\n")
-
-        for calle in CALLES:
-            f.write(f"{calle}:\n")
-            f.write(f"Promedio Tiempo Espera Vehículos: {round(resumen[f'{calle}_Espera_Prom'], 2)} seg\n")
-            f.write(f"Tamaño Promedio Cola Vehículos: {round(resumen[f'{calle}_Tam_Cola'], 2)}\n\n")
-
-        f.write(">>> Peatones <<<\n")
-        f.write(f"Promedio Tiempo Espera Peatones: {round(resumen['Espera_Prom_Pea'], 2)} seg\n")
-        f.write(f"Tamaño Promedio Cola Peatones: {round(resumen['Tamaño_Cola_Pea'], 2)}\n")
-
-print("Simulación completada correctamente y archivos TXT generados.")
-
-# Crear gráficas de tiempos de espera por cada calle y escenario
-for escenario in ESCENARIOS:
-    df_esc = df[df["Escenario"] == escenario["nombre"]]
+                f.write(f"{calle}: {escenario[calle]} segundos\n")
+            f.write("\n")
+
+            # Resultados por cada repetición
+            for row in df_esc.to_dict("records"):
+                f.write(f"Repetición {int(row['Repeticion'])}:\n\n")
+
+                f.write(">>> Vehículos <<<\n")
+                for calle in CALLES:
+                    f.write(f"{calle} -> Pasaron: {int(row[f'{calle}_Pasados'])} | En espera: {int(row[f'{calle}_Cola'])}\n")
+                    f.write(f"Tiempo Promedio de Espera: {round(row[f'{calle}_Espera_Prom'], 2)} seg\n")
+                    f.write(f"Espera p50/p95/p99: {round(row[f'{calle}_Espera_P50'], 2)} / "
+                            f"{round(row[f'{calle}_Espera_P95'], 2)} / {round(row[f'{calle}_Espera_P99'], 2)} seg\n")
+                    f.write(f"Cola Promedio en el Tiempo: {round(row[f'{calle}_Cola_Prom'], 2)} | Máxima: {int(row[f'{calle}_Cola_Max'])}\n")
+
+                f.write("\n>>> Peatones <<<\n")
+                f.write(f"Cruzaron: {int(row['Peatones_Pasados'])}\n")
+                f.write(f"En espera: {int(row['Peatones_Cola'])}\n")
+                f.write(f"Tiempo Promedio Espera Peatones: {round(row['Espera_Prom_Pea'], 2)} seg\n")
+                f.write(f"Espera p50/p95/p99: {round(row['Espera_P50_Pea'], 2)} / "
+                        f"{round(row['Espera_P95_Pea'], 2)} / {round(row['Espera_P99_Pea'], 2)} seg\n")
+                f.write("\n-------------------------------------\n\n")
+
+            # Resumen general del escenario (promedio de las 5 repeticiones)
+            resumen = df_esc.mean(numeric_only=True)
+
+            f.write("===== RESUMEN GENERAL DEL ESCENARIO =====\n\n")
 
+            for calle in CALLES:
+                f.write(f"{calle}:\n")
+                f.write(f"Promedio Tiempo Espera Vehículos: {round(resumen[f'{calle}_Espera_Prom'], 2)} seg\n")
+                f.write(f"Tamaño Promedio Cola Vehículos: {round(resumen[f'{calle}_Tam_Cola'], 2)}\n")
+                f.write(f"Espera p95 Promedio: {round(resumen[f'{calle}_Espera_P95'], 2)} seg | "
+                        f"p99 Promedio: {round(resumen[f'{calle}_Espera_P99'], 2)} seg\n")
+                f.write(f"Cola Promedio en el Tiempo: {round(resumen[f'{calle}_Cola_Prom'], 2)} | "
+                        f"Cola Máxima Promedio: {round(resumen[f'{calle}_Cola_Max'], 2)}\n\n")
+
+            f.write(">>> Peatones <<<\n")
+            f.write(f"Promedio Tiempo Espera Peatones: {round(resumen['Espera_Prom_Pea'], 2)} seg\n")
+            f.write(f"Tamaño Promedio Cola Peatones: {round(resumen['Tamaño_Cola_Pea'], 2)}\n")
+            f.write(f"Espera p95 Promedio Peatones: {round(resumen['Espera_P95_Pea'], 2)} seg | "
+                    f"p99 Promedio: {round(resumen['Espera_P99_Pea'], 2)} seg\n")
+            f.write(f"Cola Promedio en el Tiempo Peatones: {round(resumen['Cola_Prom_Pea'], 2)} | "
+                    f"Cola Máxima Promedio: {round(resumen['Cola_Max_Pea'], 2)}\n")
+
+            # Precisión alcanzada: intervalo de confianza de las métricas clave
+            intervalos = intervalos_metricas(df_esc.to_dict("records"))
+            observaciones = next(iter(intervalos.values()))[2]
+            f.write(f"\n>>> Precisión (IC {int(CONFIANZA * 100)}%) <<<\n")
+            f.write(f"Repeticiones usadas: {len(df_esc)}"
+                    + (f" ({observaciones} pares antitéticos)" if observaciones != len(df_esc) else "") + "\n")
+            for metrica, (media, semiancho, _) in intervalos.items():
+                relativo = f" ({semiancho / abs(media):.1%})" if media else ""
+                f.write(f"{metrica}: {round(media, 2)} ± {round(semiancho, 2)}{relativo}\n")
+
+
+# matplotlib se importa solo al dibujar, con un backend sin ventanas
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# Gráfica de tiempos de espera promedio por calle de un escenario.
+# "esperas" es {calle: lista de esperas promedio, una por repetición}
+def grafica_escenario(nombre, repeticiones, esperas):
+    plt = _pyplot()
     plt.figure(figsize=(10, 6))
 
     # Graficar tiempo promedio de espera por calle
     for calle in CALLES:
-        plt.plot(df_esc["Repeticion"], df_esc[f"{calle}_Espera_Prom"], label=f"{calle}")
+        plt.plot(repeticiones, esperas[calle], label=f"{calle}")
 
     plt.xlabel("Repetición")
     plt.ylabel("Tiempo Promedio de Espera (segundos)")
-    plt.title(f"Tiempos de Espera Promedio por Fase - {escenario['nombre']}")
+    plt.title(f"Tiempos de Espera Promedio por Fase - {nombre}")
     plt.legend()
     plt.grid(True)
     plt.ylim(0,1000)
     plt.xticks([1, 2, 3, 4, 5])
     plt.tight_layout()
-    plt.savefig(f"Grafica_TiemposEspera_{escenario['nombre']}.png")
+    plt.savefig(f"Grafica_TiemposEspera_{nombre}.png")
     plt.close()
 
-# Crear histograma comparativo entre escenarios (tiempos espera vehiculos promedio global)
-plt.figure(figsize=(10, 6))
-
-promedios = []
-nombres_escenarios = []
 
-# Calcular promedio global de todos los tiempos de espera de vehículos en cada escenario
-for escenario in ESCENARIOS:
-    df_esc = df[df["Escenario"] == escenario["nombre"]]
-    prom_total = df_esc[[f"{c}_Espera_Prom" for c in CALLES]].mean(axis=1).mean()
-    promedios.append(prom_total)
-    nombres_escenarios.append(escenario["nombre"])
+# Histograma comparativo entre escenarios (tiempos espera vehiculos promedio global)
+def histograma_comparacion(nombres_escenarios, promedios):
+    plt = _pyplot()
+    plt.figure(figsize=(10, 6))
+    plt.bar(nombres_escenarios, promedios, color='skyblue')
+    plt.xlabel("Escenario")
+    plt.ylabel("Tiempo Promedio de Espera Vehículos (segundos)")
+    plt.title("Comparación Tiempos Promedio de Espera Vehículos entre Escenarios")
+    plt.tight_layout()
+    plt.savefig("Histograma_Comparacion_TiemposEspera_Vehiculos.png")
+    plt.close()
 
-plt.bar(nombres_escenarios, promedios, color='skyblue')
-plt.xlabel("Escenario")
-plt.ylabel("Tiempo Promedio de Espera Vehículos (segundos)")
-plt.title("Comparación Tiempos Promedio de Espera Vehículos entre Escenarios")
-plt.tight_layout()
-plt.savefig("Histograma_Comparacion_TiemposEspera_Vehiculos.png")
-plt.close()
 
-print("Gráficas generadas y guardadas exitosamente.")
\ No newline at end of file
+# Crea las gráficas por escenario y el histograma comparativo, cada figura en
+# un proceso del pool (a los procesos solo se les pasan listas, no el DataFrame)
+def generar_graficas(df, escenarios=ESCENARIOS, procesos=PROCESOS_GRAFICAS):
+    trabajos = []
+    promedios = []
+    nombres_escenarios = []
+
+    for escenario in escenarios:
+        df_esc = df[df["Escenario"] == escenario["nombre"]]
+        esperas = {calle: df_esc[f"{calle}_Espera_Prom"].tolist() for calle in CALLES}
+        trabajos.append((grafica_escenario, escenario["nombre"], df_esc["Repeticion"].tolist(), esperas))
+
+        # Calcular promedio global de todos los tiempos de espera de vehículos en cada escenario
+        promedios.append(df_esc[[f"{c}_Espera_Prom" for c in CALLES]].mean(axis=1).mean())
+        nombres_escenarios.append(escenario["nombre"])
+    trabajos.append((histograma_comparacion, nombres_escenarios, promedios))
+
+    procesos = min(procesos or os.cpu_count() or 1, len(trabajos))
+    if procesos == 1:
+        for funcion, *argumentos in trabajos:
+            funcion(*argumentos)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for futuro in [pool.submit(*trabajo) for trabajo in trabajos]:
+            futuro.result()
+
+
+if __name__ == "__main__":
+    # Los resultados se guardan en el almacén: solo se simulan las repeticiones
+    # que faltan y solo se reescriben los reportes cuyos datos cambiaron
+    from almacen import Almacen
+    almacen = Almacen()
+
+    # Ejecución de las simulaciones por escenario y repeticiones (las que falten)
+    df = almacen.barrido()
+
+    # CSV, TXT y gráficas generados a partir del almacén
+    generados = almacen.renderizar(df)
+    print("Simulación completada correctamente.")
+    print(f"Reportes actualizados: {', '.join(generados) if generados else 'ninguno (todo al día)'}")
@@ -0,0 +1,319 @@
+import argparse
+import heapq
+import math
+import random
+import sys
+import time
+from collections import deque
+
+import main_prueba
+from estadisticas import PromedioTemporal, EstadisticaEspera
+from main_prueba import (CALLES, INTERVALO_LLEGADA_PEATONES, TIEMPO_PASO_PEATON, TIEMPO_PEATONAL, TIEMPO_ENTRE_CARROS,
+                         CONTROL_POR_EVENTOS, ESCENARIOS, SEMILLA_BASE)
+
+# Motor alternativo de main_prueba.Interseccion: un calendario de eventos propio
+# (heap de tuplas (t, secuencia, acción)) en lugar de procesos, eventos y
+# condiciones de SimPy. Las llegadas son acciones sueltas del calendario y el
+# controlador es un solo generador que el calendario reanuda directamente.
+# Con los mismos sorteos da exactamente los mismos resultados que SimPy (ver
+# comparar_con_simpy); se elige con main_prueba.simular_replica(..., motor="calendario").
+#
+# Solo reemplaza a Interseccion dentro de simular_replica: no tiene dormir,
+# esperar_tick, transmitir ni transmitir_async, y sus semáforos no tienen
+# agregar_carro ni aviso. Lo que hereda de Interseccion o usa esa interfaz
+# (red.Nodo, perfil.clase_perfilada, transmision) sigue necesitando SimPy.
+
+# Horizonte de la comparación de velocidad del __main__ (corrida larga, 1 día)
+HORIZONTE_VELOCIDAD = 86400
+
+
+# Calendario de eventos con la misma interfaz mínima que simpy.Environment
+# (now y run(until)). A igual tiempo los eventos salen en el orden en que se
+# programaron, como en SimPy.
+class Calendario:
+    __slots__ = ("now", "eventos", "acciones", "cancelados", "secuencia", "procesados", "limite")
+
+    def __init__(self, initial_time=0):
+        self.now = initial_time
+        self.eventos = []      # Heap de (t, secuencia, índice de la acción)
+        self.acciones = []     # Funciones sin argumentos, por índice
+        self.cancelados = set()
+        self.secuencia = 0
+        self.procesados = 0
+        self.limite = math.inf  # until de la corrida en curso
+
+    # Registra una acción y devuelve su índice para programarla
+    def registrar(self, accion):
+        self.acciones.append(accion)
+        return len(self.acciones) - 1
+
+    # Programa la acción para el instante t y devuelve su secuencia (para cancelarla)
+    def programar(self, t, accion):
+        self.secuencia += 1
+        heapq.heappush(self.eventos, (t, self.secuencia, accion))
+        return self.secuencia
+
+    def cancelar(self, secuencia):
+        self.cancelados.add(secuencia)
+
+    # Procesa los eventos anteriores a until (los de until quedan, como en SimPy)
+    def run(self, until=None):
+        eventos, acciones, cancelados = self.eventos, self.acciones, self.cancelados
+        limite = self.limite = math.inf if until is None else until
+        heappop = heapq.heappop
+        procesados = 0
+        while eventos and eventos[0][0] < limite:
+            t, secuencia, accion = heappop(eventos)
+            if cancelados and secuencia in cancelados:
+                cancelados.discard(secuencia)
+                continue
+            self.now = t
+            procesados += 1
+            acciones[accion]()
+        self.procesados += procesados
+        if until is not None:
+            self.now = until
+
+
+# Estado de un semáforo: mismos atributos de estadísticas y cola que
+# main_prueba.Semaforo (las llegadas las encola InterseccionCalendario)
+class SemaforoCalendario:
+    __slots__ = ("env", "nombre", "cola", "pasados", "espera", "tam_cola")
+
+    def __init__(self, env, nombre, cola=()):
+        self.env = env
+        self.nombre = nombre
+        self.cola = deque(cola)
+        self.pasados = 0
+        self.espera = EstadisticaEspera()
+        self.tam_cola = PromedioTemporal(env.now, len(self.cola))
+
+    def sacar_carro(self):
+        llegada = self.cola.popleft()
+        self.tam_cola.actualizar(self.env.now, len(self.cola))
+        return llegada
+
+
+# Misma intersección que main_prueba.Interseccion (mismos argumentos, atributos
+# de estado y hooks al_iniciar_fase, al_iniciar_peatonal y al_cruzar) sobre un
+# Calendario. Los sorteos se hacen en el mismo orden que en
+# SimPy: al arrancar, las primeras llegadas de cada calle y de peatones; después
+# cada llegada sortea la siguiente y cada carro que sale de la cola su cruce.
+class InterseccionCalendario:
+    def __init__(self, env, tiempos_verde, rng=random, por_eventos=CONTROL_POR_EVENTOS, estado=None, flujos=None):
+        self.env = env
+        self.tiempos_verde = tiempos_verde
+        self.tiempo_peatonal = tiempos_verde.get("Peatonal", TIEMPO_PEATONAL)
+        self.rng = rng
+        flujos = flujos or {}
+        self.rng_llegadas = {calle: flujos.get(f"llegadas:{calle}", rng) for calle in CALLES}
+        self.rng_peatones = flujos.get("peatones", rng)
+        self.rng_cruce = {calle: flujos.get(f"cruce:{calle}", rng) for calle in CALLES}
+        self.por_eventos = por_eventos
+        estado = estado or {}
+        self.fase_inicial = estado.get("fase", 0)
+        self.semaforos = {nombre: SemaforoCalendario(env, nombre, estado.get("colas", {}).get(nombre, ())) for nombre in CALLES}
+        self.cola_peatones = deque(estado.get("peatones", ()))
+        self.espera_peatones = EstadisticaEspera()
+        self.tam_cola_peatones = PromedioTemporal(env.now, len(self.cola_peatones))
+
+        # Cola que espera el controlador dormido (None = no espera llegadas) y
+        # secuencia de su evento pendiente, para cancelarlo si lo despierta una llegada
+        self._vigilada = None
+        self._pendiente = None
+        self._controlador = None
+        self._accion_control = env.registrar(self._reanudar)
+        # Los intervalos se leen del módulo al crear la intersección (benchmarks.py los cambia ahí)
+        self._tasas = {calle: 1.0 / main_prueba.INTERVALO_LLEGADA_CARROS[calle] for calle in CALLES}
+        self._llegadas = [self._registrar_llegada(calle) for calle in CALLES]
+        self._llegada_pea = env.registrar(self._llegada_peaton)
+        env.programar(env.now, env.registrar(self._iniciar))
+
+    # Primeras llegadas y arranque del controlador (en el orden en que SimPy inicia los procesos)
+    def _iniciar(self):
+        env = self.env
+        for calle, accion in zip(CALLES, self._llegadas):
+            env.programar(env.now + self.rng_llegadas[calle].expovariate(self._tasas[calle]), accion)
+        env.programar(env.now + self.rng_peatones.expovariate(1.0 / INTERVALO_LLEGADA_PEATONES), self._llegada_pea)
+        self._controlador = self._controlar()
+        self._seguir(None)
+
+    # Acción de llegada de un carro a una calle: lo encola, programa el siguiente
+    # y despierta al controlador si dormía esperando esa cola. Las estadísticas
+    # se buscan en cada llegada por si se reemplazaron (ver vectores.instrumentar).
+    def _registrar_llegada(self, calle):
+        env = self.env
+        semaforo = self.semaforos[calle]
+        cola, rng, tasa = semaforo.cola, self.rng_llegadas[calle], self._tasas[calle]
+
+        def llegada():
+            ahora = env.now
+            cola.append(ahora)
+            semaforo.tam_cola.actualizar(ahora, len(cola))
+            env.programar(ahora + rng.expovariate(tasa), accion)
+            if self._vigilada is cola:
+                self._despertar()
+
+        accion = env.registrar(llegada)
+        return accion
+
+    def _llegada_peaton(self):
+        env = self.env
+        self.cola_peatones.append(env.now)
+        self.tam_cola_peatones.actualizar(env.now, len(self.cola_peatones))
+        env.programar(env.now + self.rng_peatones.expovariate(1.0 / INTERVALO_LLEGADA_PEATONES), self._llegada_pea)
+        if self._vigilada is self.cola_peatones:
+            self._despertar()
+
+    # Avanza el controlador hasta su próxima espera y la programa. El generador
+    # entrega el instante en que sigue (y deja en _vigilada la cola que lo
+    # despierta antes, si duerme). Mientras ese instante sea anterior a todo lo
+    # que hay en el calendario, nada puede pasar en el medio: el controlador
+    # sigue directamente, sin pasar por el heap.
+    def _seguir(self, despierto):
+        env = self.env
+        eventos, controlador = env.eventos, self._controlador
+        t = controlador.send(despierto)
+        while t < env.limite and (not eventos or t < eventos[0][0]):
+            env.now = t
+            env.procesados += 1
+            self._vigilada = None
+            t = controlador.send(False)
+        self._pendiente = env.programar(t, self._accion_control)
+
+    def _reanudar(self):
+        self._vigilada = None
+        self._seguir(False)
+
+    def _despertar(self):
+        self._vigilada = None
+        self.env.cancelar(self._pendiente)
+        self._seguir(True)
+
+    # Equivalente de Interseccion.dormir: espera hasta "ticks_max" segundos o
+    # hasta una llegada a "cola", y devuelve los ticks de 1 segundo consumidos.
+    # Los instantes se calculan con las mismas operaciones que los timeouts de SimPy.
+    def _dormir(self, cola, ticks_max):
+        env = self.env
+        inicio = env.now
+        fin = inicio + ticks_max
+        self._vigilada = cola
+        if not (yield fin):
+            return ticks_max
+
+        ticks = max(1, math.ceil(env.now - inicio))
+        if ticks >= ticks_max:
+            yield fin
+            return ticks_max
+        yield env.now + (inicio + ticks - env.now)
+        return ticks
+
+    # Mismo ciclo que Interseccion.controlar_semaforos
+    def _controlar(self):
+        env = self.env
+        primera = self.fase_inicial
+        while True:
+            for fase in range(primera, len(CALLES)):
+                calle = CALLES[fase]
+                semaforo, verde, rng = self.semaforos[calle], self.tiempos_verde[calle], self.rng_cruce[calle]
+                cola = semaforo.cola
+                self.al_iniciar_fase(fase)
+                inicio_fase = env.now
+                ultimo_cruce = env.now
+
+                while (env.now - inicio_fase) < verde:
+                    if cola:
+                        llegada = semaforo.sacar_carro()
+                        paso = rng.uniform(2, 3)
+                        inicio_cruce = max(env.now, llegada, ultimo_cruce + TIEMPO_ENTRE_CARROS)
+                        yield env.now + max(0, inicio_cruce - env.now) + paso
+                        semaforo.espera.agregar(inicio_cruce - llegada)
+                        semaforo.pasados += 1
+                        ultimo_cruce = inicio_cruce
+                        self.al_cruzar(calle, llegada)
+                    elif self.por_eventos:
+                        restante = verde - (env.now - inicio_fase)
+                        yield from self._dormir(cola, math.ceil(restante))
+                    else:
+                        yield env.now + 1
+
+                self.al_iniciar_peatonal()
+                tiempo_disponible = self.tiempo_peatonal
+                while tiempo_disponible >= TIEMPO_PASO_PEATON:
+                    if not self.cola_peatones and self.por_eventos:
+                        ticks_max = math.floor(tiempo_disponible - TIEMPO_PASO_PEATON) + 1
+                        tiempo_disponible -= yield from self._dormir(self.cola_peatones, ticks_max)
+                    elif not self.cola_peatones:
+                        yield env.now + 1
+                        tiempo_disponible -= 1
+                    else:
+                        llegada = self.cola_peatones.popleft()
+                        self.tam_cola_peatones.actualizar(env.now, len(self.cola_peatones))
+                        self.espera_peatones.agregar(env.now - llegada)
+                        yield env.now + TIEMPO_PASO_PEATON
+                        tiempo_disponible -= TIEMPO_PASO_PEATON
+            primera = 0
+
+    # Hooks: mismos que main_prueba.Interseccion
+    def al_iniciar_fase(self, fase):
+        pass
+
+    def al_iniciar_peatonal(self):
+        pass
+
+    def al_cruzar(self, calle, llegada):
+        pass
+
+
+# Filas iguales, contando NaN == NaN (métricas sin cruces)
+def _filas_iguales(a, b):
+    return a.keys() == b.keys() and all(
+        a[k] == b[k] or (isinstance(a[k], float) and math.isnan(a[k]) and math.isnan(b[k])) for k in a)
+
+
+# Verificación cruzada: cada (escenario, repetición) con los dos motores y los
+# mismos sorteos (misma semilla, y también con CRN / antitéticas y en modo
+# sondeo). Devuelve la lista de casos con alguna métrica distinta (vacía = idénticos).
+def comparar_con_simpy(escenarios=ESCENARIOS, repets=5, semilla_base=SEMILLA_BASE, tiempo=main_prueba.TIEMPO_SIMULACION):
+    distintos = []
+    for escenario in escenarios:
+        for rep in range(repets):
+            for opciones in ({}, {"por_eventos": False}, {"crn": True}, {"antitetica": True}):
+                simpy_ = main_prueba.simular_replica(escenario, rep, semilla_base, tiempo=tiempo, **opciones)
+                calendario = main_prueba.simular_replica(escenario, rep, semilla_base, tiempo=tiempo,
+                                                         motor="calendario", **opciones)
+                if not _filas_iguales(simpy_, calendario):
+                    distintos.append((escenario["nombre"], rep, opciones))
+    return distintos
+
+
+# Tiempo de reloj de una corrida larga con cada motor
+def medir_velocidad(escenario=ESCENARIOS[0], tiempo=HORIZONTE_VELOCIDAD, rep=0):
+    resultado = {}
+    for motor in ("simpy", "calendario"):
+        inicio = time.perf_counter()
+        main_prueba.simular_replica(escenario, rep, tiempo=tiempo, motor=motor)
+        resultado[motor] = time.perf_counter() - inicio
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Motor de calendario: verificación contra SimPy y velocidad")
+    parser.add_argument("--repets", type=int, default=5, help="Repeticiones por escenario en la verificación")
+    parser.add_argument("--horizonte", type=float, default=HORIZONTE_VELOCIDAD, help="Segundos de la corrida larga")
+    args = parser.parse_args()
+
+    distintos = comparar_con_simpy(repets=args.repets)
+    casos = len(ESCENARIOS) * args.repets * 4
+    print(f"Verificación: {casos - len(distintos)}/{casos} repeticiones idénticas a SimPy")
+    for caso in distintos:
+        print(f"  Distinta: {caso}")
+
+    for escenario in ESCENARIOS:
+        tiempos = medir_velocidad(escenario, args.horizonte)
+        print(f"{escenario['nombre']} ({args.horizonte:.0f} s): SimPy {tiempos['simpy']:.2f} s, "
+              f"calendario {tiempos['calendario']:.2f} s ({tiempos['simpy'] / tiempos['calendario']:.1f}x)")
+
+    # Sale con error si algún caso difiere, para poder usarlo como control
+    if distintos:
+        sys.exit(f"El motor de calendario difiere de SimPy en {len(distintos)} de {casos} repeticiones")
@@ -0,0 +1,414 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from estadisticas import CUANTILES
+from main_prueba import (CALLES, INTERVALO_LLEGADA_CARROS, INTERVALO_LLEGADA_PEATONES, TIEMPO_SIMULACION,
+                         TIEMPO_PASO_PEATON, TIEMPO_ENTRE_CARROS, TIEMPO_PEATONAL, ESCENARIOS, REPETS,
+                         SEMILLA_BASE, semilla_replica, simular_replica)
+
+# Repeticiones que se simulan juntas en cada bloque de arrays (limita la memoria)
+TAM_LOTE = 2048
+
+# Filas que se resumen a la vez al final del bloque: con pocas filas los arrays
+# temporales de las estadísticas caben en la caché
+FILAS_ESTADISTICAS = 256
+
+
+# Para cada byte de 8 eventos de una cola (bit 1 = llegada, 0 = salida; el
+# primero en el bit más significativo): cambio total del tamaño de la cola y
+# máximo cambio parcial dentro del byte
+def _tabla_bytes():
+    cambios = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).astype(np.int32) * 2 - 1
+    parcial = np.cumsum(cambios, axis=1)
+    return parcial[:, -1].copy(), parcial.max(axis=1)
+
+
+CAMBIO_BYTE, MAXIMO_BYTE = _tabla_bytes()
+
+
+# Tiempos de llegada de un proceso de Poisson, una fila por repetición. Se
+# agregan "relleno" columnas centinela en infinito para poder leer una ventana
+# adelante sin salirse. Las llegadas desde el fin de la simulación quedan como
+# salieron: ningún cliente llega a salir de la cola después de ese instante.
+def _llegadas(gen, filas, media, tiempo, relleno):
+    n = int(tiempo / media + 4.5 * np.sqrt(tiempo / media) + 5)
+    llegadas = np.empty((filas, n + relleno))
+    llegadas[:, n:] = np.inf
+    # Intervalos -log(u) con u uniforme en (0, 1] de precisión simple (más
+    # baratos que standard_exponential), acumulados en doble precisión
+    intervalos = gen.random(size=(filas, n), dtype=np.float32)
+    np.subtract(1, intervalos, out=intervalos)
+    np.log(intervalos, out=intervalos)
+    np.cumsum(intervalos, axis=1, dtype=float, out=llegadas[:, :n])
+    llegadas[:, :n] *= -media
+    # Caso muy improbable: alguna fila no alcanzó el fin de la simulación
+    while (llegadas[:, n - 1] < tiempo).any():
+        extra = np.cumsum(gen.exponential(media, size=(filas, n)), axis=1) + llegadas[:, n - 1:n]
+        llegadas = np.concatenate([llegadas[:, :n], extra, llegadas[:, n:]], axis=1)
+        n *= 2
+    return llegadas
+
+
+# Estadísticas de una cola FIFO a partir de los instantes de cada cliente (una
+# fila por repetición): llegada (desde "tiempo" = no llegó), inicio del cruce y
+# salida de la cola ("tiempo" si no salió; salida puede tener menos columnas que
+# llegadas si en las demás nadie salió). Los primeros "cruzaron" clientes de
+# cada fila cruzaron. Devuelve las mismas métricas que estadisticas.py calcula
+# en línea en el motor SimPy: media, desviación y cuantiles de la espera, y
+# tamaño de la cola promedio en el tiempo y máximo.
+def _estadisticas(llegadas, inicio, salida, cruzaron, tiempo):
+    # Al ordenar, las esperas de los que cruzaron quedan al principio de la fila
+    ancho = max(1, cruzaron.max())
+    no_cruzo = np.arange(ancho) >= cruzaron[:, None]
+    espera = inicio[:, :ancho] - llegadas[:, :ancho]
+    np.copyto(espera, np.inf, where=no_cruzo)
+    espera.sort(axis=1)
+    np.copyto(espera, 0.0, where=no_cruzo)
+
+    n = cruzaron.astype(float)
+    suma = espera.sum(axis=1)
+    media = np.divide(suma, n, out=np.zeros_like(n), where=n > 0)
+    cuadrados = np.einsum("ij,ij->i", espera, espera)
+    varianza = np.divide(cuadrados - suma * media, n - 1, out=np.zeros_like(n), where=n > 1)
+
+    # Cuantiles con interpolación lineal sobre las esperas ordenadas
+    cuantiles = {}
+    for p in CUANTILES:
+        posicion_p = np.maximum(n - 1, 0) * p
+        abajo = np.floor(posicion_p).astype(np.intp)
+        arriba = np.minimum(abajo + 1, np.maximum(cruzaron - 1, 0))
+        v_abajo = np.take_along_axis(espera, abajo[:, None], axis=1)[:, 0]
+        v_arriba = np.take_along_axis(espera, arriba[:, None], axis=1)[:, 0]
+        cuantiles[p] = v_abajo + (v_arriba - v_abajo) * (posicion_p - abajo)
+
+    # Cola promedio: integral del tamaño de la cola = tiempo que cada cliente
+    # pasó en ella (las columnas sin llegada dan tiempo - tiempo = 0)
+    m, m_salida = llegadas.shape[1], salida.shape[1]
+    llegada = np.minimum(llegadas, tiempo)
+    cola_prom = (salida.sum(axis=1) + tiempo * (m - m_salida) - llegada.sum(axis=1)) / tiempo
+
+    # Cola máxima: se ordenan juntas llegadas (+1) y salidas (-1) de cada fila y
+    # se toma el máximo de la suma acumulada. Cada evento es un entero de 32 bits
+    # con el instante en unidades de 2^-18 segundos (para una hora) y el tipo en
+    # el bit menos significativo; solo una llegada y una salida a menos de 4
+    # microsegundos podrían quedar en otro orden. Las llegadas desde el fin y las
+    # salidas que no ocurrieron cuentan como salidas en "tiempo": quedan al final,
+    # después de todos los demás, y no pueden subir el máximo. La suma acumulada
+    # se hace de a 8 eventos con las tablas de bytes.
+    escala = 2.0 ** np.floor(np.log2(2 ** 30 / (tiempo + 1)))
+    claves = np.empty((len(llegadas), m + m_salida), dtype=np.int32)
+    np.multiply(llegada, escala, out=claves[:, :m], casting="unsafe")
+    np.multiply(salida, escala, out=claves[:, m:], casting="unsafe")
+    claves <<= 1
+    claves[:, :m] |= llegadas < tiempo
+    claves.sort(axis=1)
+    octetos = np.packbits(claves.view(np.uint8)[:, ::4] & 1, axis=1)
+    cambio = CAMBIO_BYTE[octetos]
+    previo = np.cumsum(cambio, axis=1) - cambio
+    cola_max = np.maximum((previo + MAXIMO_BYTE[octetos]).max(axis=1), 0)
+
+    return {"Prom": media, "Desv": np.sqrt(np.maximum(varianza, 0.0)), "P50": cuantiles[0.5],
+            "P95": cuantiles[0.95], "P99": cuantiles[0.99], "Cola_Prom": cola_prom, "Cola_Max": cola_max}
+
+
+# _estadisticas de a FILAS_ESTADISTICAS filas, unidas por métrica. La salida de
+# la cola de cada parte se arma ahí mismo, solo hasta la columna del último que
+# salió: los primeros "salieron" clientes de cada fila salieron al iniciar su
+# cruce, salvo los de "primeros" (filas, posiciones e instantes en que salieron)
+def _estadisticas_por_partes(llegadas, inicio, salieron, cruzaron, tiempo, primeros=None):
+    m = max(1, salieron.max())
+    partes = []
+    for d in range(0, len(llegadas), FILAS_ESTADISTICAS):
+        parte = slice(d, d + FILAS_ESTADISTICAS)
+        salida = np.where(np.arange(m) < salieron[parte, None], inicio[parte, :m], tiempo)
+        if primeros is not None:
+            filas_primero, posicion, sale = primeros
+            elegidos = (filas_primero >= d) & (filas_primero < d + FILAS_ESTADISTICAS)
+            salida[filas_primero[elegidos] - d, posicion[elegidos]] = sale[elegidos]
+        partes.append(_estadisticas(llegadas[parte], inicio[parte], salida, cruzaron[parte], tiempo))
+    return {nombre: np.concatenate([p[nombre] for p in partes]) for nombre in partes[0]}
+
+
+# Simula "filas" repeticiones de un escenario a la vez con el mismo controlador
+# de ciclo fijo que Interseccion.controlar_semaforos: verde de cada calle
+# seguido de su paso peatonal. Cada iteración resuelve una fase completa de
+# todas las repeticiones a la vez, sobre una ventana con los carros (o
+# peatones) que todavía podrían alcanzar a cruzar en ella.
+#
+# En verde, con t0 el inicio de la fase y g[j] = t0 + suma de los tiempos de
+# cruce de los carros anteriores de la ventana, el carro j empieza a cruzar en
+#   g[j] + n[j],  n[j] = max(1, ceil(a[0] - g[0]), ..., ceil(a[j] - g[j]))
+# (el primero sale de la cola en t0 + max(0, ceil(a[0] - t0)) y espera la
+# separación de TIEMPO_ENTRE_CARROS = 1 segundo): cada carro sale al terminar
+# el anterior o, si la cola estaba vacía, en el tick del sondeo que ve su
+# llegada. Salen mientras siga el verde. En el paso peatonal pasa lo mismo con
+# cruces fijos de TIEMPO_PASO_PEATON.
+#
+# Las ventanas se leen de los arrays por fila (cada una es un tramo contiguo)
+# y se operan transpuestas, con la posición en el primer eje: cada paso del
+# máximo acumulado es una operación sobre una fila de todas las repeticiones.
+#
+# Con "extendidas" se guardan los instantes de cada cliente para calcular al
+# final todas las métricas de simular_replica; sin ellas solo se acumula la
+# suma de las esperas, que alcanza para las columnas de resultados.csv.
+def _simular_bloque(gen, escenario, filas, tiempo, extendidas=True):
+    verde = [escenario[calle] for calle in CALLES]
+    tiempo_peatonal = escenario.get("Peatonal", TIEMPO_PEATONAL)
+
+    # Llegadas de cada calle, generadas en bloque. Cada carro cruza en 2 segundos
+    # o más, así que en un verde caben a lo sumo verde // 2 + 1 carros. Las
+    # ventanas son vistas deslizantes: ventana[fila, cabeza] son los carros
+    # desde la cabeza de la cola de esa fila, sin copiar índices.
+    ventana = [int(v // 2) + 1 for v in verde]
+    sorteo = [np.empty((w, filas)) for w in ventana]
+    dos = [2.0 * np.arange(w + 1)[:, None] for w in ventana]
+    llegadas, inicio, ventanas_llegada, ventanas_inicio = [], [], [], []
+    for calle, w in zip(CALLES, ventana):
+        a = _llegadas(gen, filas, INTERVALO_LLEGADA_CARROS[calle], tiempo, w)
+        i = np.empty_like(a)
+        llegadas.append(a)
+        inicio.append(i)
+        ventanas_llegada.append(sliding_window_view(a, w, axis=1))
+        ventanas_inicio.append(sliding_window_view(i, w, axis=1, writeable=True))
+
+    # En cada paso peatonal cruzan menos de ventana_p peatones, así que los de
+    # un ciclo entran en una ventana de len(CALLES) * ventana_p. Se copian a un
+    # array chico una vez por ciclo y cada paso toma su ventana de ahí.
+    ventana_p = int(tiempo_peatonal // TIEMPO_PASO_PEATON) + 1
+    ventana_ciclo = len(CALLES) * ventana_p
+    peatones = _llegadas(gen, filas, INTERVALO_LLEGADA_PEATONES, tiempo, ventana_ciclo)
+    salida_p = np.empty_like(peatones)
+    ventanas_peatones = sliding_window_view(peatones, ventana_ciclo, axis=1)
+    ventanas_salida_p = sliding_window_view(salida_p, ventana_ciclo, axis=1, writeable=True)
+    salida_ciclo = np.empty((ventana_ciclo, filas))
+    # Índice plano en el array del ciclo de la ventana de cada fila, sin contar
+    # los peatones que ya cruzaron en el ciclo
+    desfase_p = np.arange(ventana_p)[:, None] * filas + np.arange(filas)
+    pasos = TIEMPO_PASO_PEATON * np.arange(ventana_p)[:, None]
+
+    # Estado del controlador de cada repetición
+    ahora = np.zeros(filas)
+    cabeza = np.zeros((len(CALLES), filas), dtype=np.intp)
+    cabeza_p = np.zeros(filas, dtype=np.intp)
+    pasados = np.zeros((len(CALLES), filas), dtype=np.intp)
+    suma_espera = np.zeros((len(CALLES), filas))
+    suma_espera_p = np.zeros(filas)
+    fila = np.arange(filas)
+    # (fila, posición, instante) del primer carro de cada verde de cada calle,
+    # que sale de la cola antes de empezar a cruzar
+    primeros = [[] for _ in CALLES]
+
+    with np.errstate(invalid="ignore"):
+        while ahora.min() < tiempo:
+            peatones_ciclo = np.ascontiguousarray(ventanas_peatones[fila, cabeza_p].T)
+            atendidos_p = np.zeros(filas, dtype=np.intp)
+            for i in range(len(CALLES)):
+                # Verde de la calle i. Los tiempos de cruce (2 + u) se sortean
+                # para toda la ventana sobre un array ya reservado (el de un
+                # carro no influye en si alcanza a salir, así que los de los
+                # que no salen se descartan sin sesgo). relativo[j] = g[j] y el
+                # cruce del carro j termina en relativo[j + 1] + n[j]
+                c = cabeza[i]
+                w = ventana[i]
+                cruce = gen.random(out=sorteo[i])
+                relativo = np.empty((w + 1, filas))
+                relativo[0] = ahora
+                for j in range(w):
+                    np.add(relativo[j], cruce[j], out=relativo[j + 1])
+                relativo += dos[i]
+                llegada = np.ascontiguousarray(ventanas_llegada[i][fila, c].T)
+                n = llegada - relativo[:-1]
+                np.ceil(n, out=n)
+                sale = ahora + np.maximum(n[0], 0)
+                np.maximum(n[0], TIEMPO_ENTRE_CARROS, out=n[0])
+                for j in range(1, w):
+                    np.maximum(n[j - 1], n[j], out=n[j])
+                n += relativo[:-1]
+
+                # n ya es el inicio del cruce de cada carro. Salen de la cola
+                # mientras siga el verde; lo que se escribe más allá de los
+                # atendidos se reescribe en el próximo verde o se descarta al final.
+                limite = np.minimum(ahora + verde[i], tiempo)
+                atendido = n < limite
+                atendido[0] = sale < limite
+                k = atendido.sum(axis=0)
+                hubo = k > 0
+                if extendidas:
+                    ventanas_inicio[i][fila, c] = n.T
+                    primeros[i].append((fila[hubo], c[hubo], sale[hubo]))
+                else:
+                    espera = np.where(atendido, n - llegada, 0.0)
+                    suma_espera[i] += espera.sum(axis=0)
+                c += k
+
+                # El verde termina al cruzar el último carro o, si sobra verde
+                # con la cola vacía, al agotar los ticks del sueño. Solo el
+                # último carro atendido puede terminar de cruzar después del fin.
+                ultimo = np.where(hubo, relativo[k, fila] + n[k - 1, fila] - relativo[k - 1, fila], ahora)
+                sin_terminar = hubo & (ultimo >= tiempo)
+                pasados[i] += k - sin_terminar
+                if not extendidas:
+                    suma_espera[i] -= np.where(sin_terminar, espera[k - 1, fila], 0.0)
+                restante = verde[i] - (ultimo - ahora)
+                ahora = np.where(restante > 0, ultimo + np.ceil(restante), ultimo)
+
+                # Paso peatonal: el peatón j cruza pasos[j] + max(0, ...) después
+                # del inicio, mientras queden TIEMPO_PASO_PEATON segundos
+                indice = desfase_p + atendidos_p * filas
+                llegada = peatones_ciclo.take(indice)
+                n = llegada - ahora
+                np.ceil(n, out=n)
+                n -= pasos
+                np.maximum(n[0], 0, out=n[0])
+                for j in range(1, ventana_p):
+                    np.maximum(n[j - 1], n[j], out=n[j])
+                n += pasos
+                atendido = (n <= tiempo_peatonal - TIEMPO_PASO_PEATON) & (n < tiempo - ahora)
+                k = atendido.sum(axis=0)
+                n += ahora
+                if extendidas:
+                    salida_ciclo.put(indice, n)
+                else:
+                    suma_espera_p += np.where(atendido, n - llegada, 0.0).sum(axis=0)
+                atendidos_p += k
+
+                # Sin más peatones a tiempo el controlador duerme hasta que ya no
+                # alcance para otro cruce
+                usado = np.where(k > 0, n[k - 1, fila] - ahora + TIEMPO_PASO_PEATON, 0.0)
+                disponible = tiempo_peatonal - usado
+                ahora = ahora + usado + np.where(disponible >= TIEMPO_PASO_PEATON,
+                                                 np.floor(disponible - TIEMPO_PASO_PEATON) + 1, 0.0)
+
+            if extendidas:
+                ventanas_salida_p[fila, cabeza_p] = salida_ciclo.T
+            cabeza_p += atendidos_p
+
+    # Cada cola se resume solo hasta su último cliente (las columnas restantes
+    # son llegadas posteriores al fin o centinelas)
+    llegaron = np.array([(a < tiempo).sum(axis=1) for a in llegadas])
+    llegaron_p = (peatones < tiempo).sum(axis=1)
+    if not extendidas:
+        estad = {"Prom": np.divide(suma_espera, pasados, out=np.zeros_like(suma_espera), where=pasados > 0).T}
+        estad_p = {"Prom": np.divide(suma_espera_p, cabeza_p, out=np.zeros_like(suma_espera_p), where=cabeza_p > 0)}
+        return pasados.T, (llegaron - cabeza).T, estad, cabeza_p, llegaron_p - cabeza_p, estad_p
+
+    por_calle = []
+    with np.errstate(invalid="ignore"):
+        for i in range(len(CALLES)):
+            m = max(1, llegaron[i].max())
+            por_calle.append(_estadisticas_por_partes(llegadas[i][:, :m], inicio[i], cabeza[i], pasados[i], tiempo,
+                                                      [np.concatenate(x) for x in zip(*primeros[i])]))
+        m = max(1, llegaron_p.max())
+        estad_p = _estadisticas_por_partes(peatones[:, :m], salida_p, cabeza_p, cabeza_p, tiempo)
+    estad = {nombre: np.stack([e[nombre] for e in por_calle], axis=1) for nombre in por_calle[0]}
+    return pasados.T, (llegaron - cabeza).T, estad, cabeza_p, llegaron_p - cabeza_p, estad_p
+
+
+# Simula "repets" repeticiones de un escenario y devuelve las mismas filas que
+# main_prueba.simular_replica (una por repetición). Sin "extendidas" solo van
+# las columnas de resultados.csv (cantidades, colas y espera promedio).
+def simular_lote(escenario, repets=REPETS, semilla_base=SEMILLA_BASE, tiempo=TIEMPO_SIMULACION, tam_lote=TAM_LOTE,
+                 extendidas=True):
+    resultados = []
+    for k, desde in enumerate(range(0, repets, tam_lote)):
+        filas = min(tam_lote, repets - desde)
+        gen = np.random.default_rng(semilla_replica(escenario["nombre"], f"numpy-{k}", semilla_base))
+        pasados, cola, estad, pasados_p, cola_p, estad_p = _simular_bloque(gen, escenario, filas, tiempo, extendidas)
+
+        # Columnas en el mismo orden que las filas de simular_replica
+        columnas = {
+            "Escenario": [escenario["nombre"]] * filas,
+            "Repeticion": range(desde + 1, desde + filas + 1),
+            "Peatones_Pasados": pasados_p.tolist(),
+            "Peatones_Cola": cola_p.tolist(),
+            "Espera_Prom_Pea": estad_p["Prom"].tolist(),
+            "Tamaño_Cola_Pea": cola_p.tolist()
+        }
+        if extendidas:
+            columnas["Espera_Desv_Pea"] = estad_p["Desv"].tolist()
+            for nombre in ("P50", "P95", "P99"):
+                columnas[f"Espera_{nombre}_Pea"] = estad_p[nombre].tolist()
+            columnas["Cola_Prom_Pea"] = estad_p["Cola_Prom"].tolist()
+            columnas["Cola_Max_Pea"] = estad_p["Cola_Max"].tolist()
+        for i, calle in enumerate(CALLES):
+            columnas[f"{calle}_Pasados"] = pasados[:, i].tolist()
+            columnas[f"{calle}_Cola"] = cola[:, i].tolist()
+            columnas[f"{calle}_Espera_Prom"] = estad["Prom"][:, i].tolist()
+            columnas[f"{calle}_Tam_Cola"] = cola[:, i].tolist()
+            if not extendidas:
+                continue
+            for nombre in ("Desv", "P50", "P95", "P99"):
+                columnas[f"{calle}_Espera_{nombre}"] = estad[nombre][:, i].tolist()
+            columnas[f"{calle}_Cola_Prom"] = estad["Cola_Prom"][:, i].tolist()
+            columnas[f"{calle}_Cola_Max"] = estad["Cola_Max"][:, i].tolist()
+
+        claves = list(columnas)
+        resultados.extend(dict(zip(claves, fila)) for fila in zip(*columnas.values()))
+    return resultados
+
+
+# Equivalente vectorizado de main_prueba.ejecutar_barrido
+def ejecutar_barrido(escenarios=ESCENARIOS, repets=REPETS, semilla_base=SEMILLA_BASE, tiempo=TIEMPO_SIMULACION,
+                     extendidas=True):
+    resultados = []
+    for escenario in escenarios:
+        resultados.extend(simular_lote(escenario, repets, semilla_base, tiempo, extendidas=extendidas))
+    return resultados
+
+
+# Prueba de equivalencia estadística contra el motor SimPy: para cada métrica
+# compara las medias de ambos motores con un estadístico z de Welch.
+# Devuelve un DataFrame con las medias, el z y si la diferencia es significativa.
+def comparar_con_simpy(escenario, repets_simpy=200, repets_numpy=4000, semilla_base=SEMILLA_BASE, z_max=4.0):
+    df_simpy = pd.DataFrame([simular_replica(escenario, rep, semilla_base) for rep in range(repets_simpy)])
+    df_numpy = pd.DataFrame(simular_lote(escenario, repets_numpy, semilla_base))
+
+    filas = []
+    for columna in df_simpy.columns:
+        if columna in ("Escenario", "Repeticion"):
+            continue
+        a, b = df_simpy[columna], df_numpy[columna]
+        error = np.sqrt(a.var() / len(a) + b.var() / len(b))
+        z = (a.mean() - b.mean()) / error if error > 0 else 0.0
+        filas.append({"Metrica": columna, "SimPy": a.mean(), "NumPy": b.mean(), "z": z, "Difiere": abs(z) > z_max})
+    return pd.DataFrame(filas)
+
+
+if __name__ == "__main__":
+    difieren = []
+    for escenario in ESCENARIOS:
+        comparacion = comparar_con_simpy(escenario)
+        print(f"\n===== {escenario['nombre']} =====")
+        print(comparacion.round(3).to_string(index=False))
+        if comparacion["Difiere"].any():
+            metricas = comparacion.loc[comparacion["Difiere"], "Metrica"]
+            print("ATENCIÓN: los motores difieren en", ", ".join(metricas))
+            difieren.extend(f"{escenario['nombre']}:{m}" for m in metricas)
+
+    # Velocidad: tiempo por repetición de cada motor en cada escenario, con las
+    # columnas de resultados.csv y con todas las de simular_replica
+    print()
+    for escenario in ESCENARIOS:
+        inicio = time.perf_counter()
+        for rep in range(30):
+            simular_replica(escenario, rep)
+        por_rep_simpy = (time.perf_counter() - inicio) / 30
+
+        por_rep_numpy = {}
+        for extendidas in (False, True):
+            inicio = time.perf_counter()
+            simular_lote(escenario, 5000, extendidas=extendidas)
+            por_rep_numpy[extendidas] = (time.perf_counter() - inicio) / 5000
+
+        print(f"{escenario['nombre']}: SimPy {por_rep_simpy * 1000:.3f} ms por repetición; NumPy "
+              f"{por_rep_numpy[False] * 1000:.3f} ms ({por_rep_simpy / por_rep_numpy[False]:.0f}x) con las "
+              f"columnas de resultados.csv, {por_rep_numpy[True] * 1000:.3f} ms "
+              f"({por_rep_simpy / por_rep_numpy[True]:.0f}x) con las extendidas")
+
+    # Sale con error si algún escenario difiere, para poder usarlo como control
+    if difieren:
+        sys.exit(f"Los motores difieren en {len(difieren)} métricas: {', '.join(difieren)}")
@@ -0,0 +1,170 @@
+import math
+import random
+
+import pandas as pd
+import scipy.stats as stats
+
+from main_prueba import (CALLES, ESCENARIOS, INTERVALO_LLEGADA_CARROS, INTERVALO_LLEGADA_PEATONES, TIEMPO_PEATONAL,
+                         TIEMPO_SIMULACION, SEMILLA_BASE, PROCESOS, ejecutar_barrido)
+
+# Límites (mínimo, máximo) en segundos del verde de cada calle y del paso peatonal
+LIMITES = {
+    "Norte-L1": (15, 60),
+    "Sur-L2": (15, 60),
+    "Este-L3": (20, 180),
+    "Oeste-L4": (20, 180),
+    "Peatonal": (12, 40)
+}
+
+# Los tiempos de cada plan se redondean a múltiplos de este paso (segundos)
+PASO_TIEMPO = 5
+
+# Pesos de la espera de vehículos y de peatones en el objetivo
+PESO_VEHICULOS = 1.0
+PESO_PEATONES = 1.0
+
+# Restricción: la cola máxima promedio de cada calle (vehículos) no puede superar este valor
+COLA_MAXIMA = 100
+
+# Planes candidatos que se generan al inicio (además de los ESCENARIOS)
+CANDIDATOS = 60
+
+# Rondas de la búsqueda: (duración de la simulación, repeticiones por plan).
+# Las primeras son corridas cortas y baratas para descartar planes malos; solo
+# los mejores llegan a la última ronda con la duración completa.
+RONDAS = [(600, 2), (1800, 4), (TIEMPO_SIMULACION, 10)]
+
+# Fracción de planes que pasa de una ronda a la siguiente
+FRACCION_CONSERVADA = 1 / 3
+
+# Nivel de confianza de los intervalos
+CONFIANZA = 0.95
+
+# Semilla para generar los planes candidatos
+SEMILLA_PLANES = 7
+
+ARCHIVO_OPTIMIZACION = "optimizacion.csv"
+
+
+# Redondea un tiempo al paso y lo deja dentro de sus límites
+def _ajustar(valor, minimo, maximo, paso=PASO_TIEMPO):
+    return int(min(maximo, max(minimo, round(valor / paso) * paso)))
+
+
+# Genera planes con muestreo de hipercubo latino: cada tiempo recorre todos
+# sus estratos una vez, así los planes cubren el espacio de forma pareja.
+# Se incluyen los ESCENARIOS fijos como referencia.
+def generar_planes(cantidad=CANDIDATOS, limites=LIMITES, semilla=SEMILLA_PLANES):
+    rng = random.Random(semilla)
+    columnas = {}
+    for clave, (minimo, maximo) in limites.items():
+        estratos = list(range(cantidad))
+        rng.shuffle(estratos)
+        columnas[clave] = [_ajustar(minimo + (e + rng.random()) / cantidad * (maximo - minimo), minimo, maximo)
+                           for e in estratos]
+
+    planes = [dict(escenario, Peatonal=escenario.get("Peatonal", TIEMPO_PEATONAL)) for escenario in ESCENARIOS]
+    vistos = {tuple(plan[clave] for clave in limites) for plan in planes}
+    for i in range(cantidad):
+        tiempos = tuple(columnas[clave][i] for clave in limites)
+        if tiempos in vistos:
+            continue
+        vistos.add(tiempos)
+        planes.append({"nombre": f"Plan_{i + 1:03d}", **dict(zip(limites, tiempos))})
+    return planes
+
+
+# Espera por vehículo y por peatón de una repetición. Se usa la ley de Little
+# (cola promedio / tasa de llegada) para que cuenten también los que se quedaron
+# esperando al final: un plan que deja una calle sin servir no sale barato.
+def esperas_little(fila):
+    tasa_carros = sum(1.0 / INTERVALO_LLEGADA_CARROS[calle] for calle in CALLES)
+    espera_vehiculos = sum(fila[f"{calle}_Cola_Prom"] for calle in CALLES) / tasa_carros
+    espera_peatones = fila["Cola_Prom_Pea"] * INTERVALO_LLEGADA_PEATONES
+    return espera_vehiculos, espera_peatones
+
+
+# Media e intervalo de confianza t de Student de una serie
+def intervalo_confianza(valores, confianza=CONFIANZA):
+    n = len(valores)
+    media = valores.mean()
+    if n < 2:
+        return media, media, media
+    semiancho = stats.t.ppf((1 + confianza) / 2, n - 1) * valores.std(ddof=1) / math.sqrt(n)
+    return media, media - semiancho, media + semiancho
+
+
+# Resume las repeticiones de cada plan de una ronda (una columna por cada clave de "limites")
+def resumir_ronda(planes, resultados, ronda, tiempo, cola_maxima=COLA_MAXIMA, confianza=CONFIANZA, limites=LIMITES):
+    df = pd.DataFrame(resultados)
+    esperas = df.apply(esperas_little, axis=1, result_type="expand")
+    df["Espera_Vehiculos"] = esperas[0]
+    df["Espera_Peatones"] = esperas[1]
+    # Objetivo de cada repetición: espera ponderada de vehículos y peatones
+    df["Objetivo"] = PESO_VEHICULOS * df["Espera_Vehiculos"] + PESO_PEATONES * df["Espera_Peatones"]
+
+    filas = []
+    for plan in planes:
+        df_plan = df[df["Escenario"] == plan["nombre"]]
+        media, inferior, superior = intervalo_confianza(df_plan["Objetivo"], confianza)
+        cola = df_plan[[f"{calle}_Cola_Max" for calle in CALLES]].mean().max()
+        filas.append({
+            "Plan": plan["nombre"],
+            **{clave: plan[clave] for clave in limites},
+            "Ronda": ronda,
+            "Tiempo": tiempo,
+            "Repeticiones": len(df_plan),
+            "Objetivo": media,
+            "IC_Inferior": inferior,
+            "IC_Superior": superior,
+            "Espera_Vehiculos": df_plan["Espera_Vehiculos"].mean(),
+            "Espera_Peatones": df_plan["Espera_Peatones"].mean(),
+            "Cola_Max": cola,
+            "Factible": cola <= cola_maxima
+        })
+    return filas
+
+
+# Busca el mejor plan por reducción sucesiva: cada ronda simula los planes vivos
+# y conserva solo la mejor fracción (factibles primero, luego menor objetivo)
+# para la ronda siguiente, más larga y con más repeticiones. Devuelve la tabla
+# de todos los planes ordenada, con el resumen de la última ronda que alcanzó cada uno.
+# "limites" define los tiempos que se sortean y las columnas de la tabla.
+def optimizar(planes=None, rondas=RONDAS, fraccion=FRACCION_CONSERVADA, cola_maxima=COLA_MAXIMA,
+              semilla_base=SEMILLA_BASE, procesos=PROCESOS, confianza=CONFIANZA, limites=LIMITES):
+    vivos = planes if planes is not None else generar_planes(limites=limites)
+    tabla = {}
+
+    for ronda, (tiempo, repets) in enumerate(rondas, start=1):
+        # Repeticiones nuevas en cada ronda (otra semilla base)
+        resultados = ejecutar_barrido(vivos, repets, semilla_base + ronda, procesos, tiempo)
+        resumen = resumir_ronda(vivos, resultados, ronda, tiempo, cola_maxima, confianza, limites)
+        for fila in resumen:
+            tabla[fila["Plan"]] = fila
+
+        if ronda < len(rondas):
+            resumen.sort(key=lambda fila: (not fila["Factible"], fila["Objetivo"]))
+            conservar = {fila["Plan"] for fila in resumen[:max(1, math.ceil(len(resumen) * fraccion))]}
+            vivos = [plan for plan in vivos if plan["nombre"] in conservar]
+
+    df = pd.DataFrame(tabla.values())
+    df["Orden_Factible"] = ~df["Factible"]
+    df = df.sort_values(["Ronda", "Orden_Factible", "Objetivo"], ascending=[False, True, True])
+    df = df.drop(columns="Orden_Factible").reset_index(drop=True)
+    df.insert(0, "Puesto", range(1, len(df) + 1))
+    return df
+
+
+if __name__ == "__main__":
+    tabla = optimizar()
+    tabla.to_csv(ARCHIVO_OPTIMIZACION, index=False)
+
+    print(f"===== PLANES EVALUADOS CON LA DURACIÓN COMPLETA ({int(CONFIANZA * 100)}% de confianza) =====\n")
+    finales = tabla[tabla["Ronda"] == len(RONDAS)]
+    print(finales.round(2).to_string(index=False))
+
+    mejor = finales.iloc[0]
+    print(f"\nMejor plan: {mejor['Plan']} -> " + ", ".join(f"{clave}: {mejor[clave]} s" for clave in LIMITES))
+    print(f"Objetivo: {mejor['Objetivo']:.2f} seg [{mejor['IC_Inferior']:.2f}, {mejor['IC_Superior']:.2f}]"
+          f" | Factible: {'sí' if mejor['Factible'] else 'no'}")
+    print(f"\nTabla completa ({len(tabla)} planes) guardada en {ARCHIVO_OPTIMIZACION}")
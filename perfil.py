@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import chdir
+from concurrent.futures import ProcessPoolExecutor
+
+import simpy
+
+# Instrumentación de la simulación. Nada de esto se usa en las corridas
+# normales: las clases perfiladas son subclases de las del modelo y solo se
+# crean desde aquí, así que con el perfil apagado el costo es cero (salvo
+# los hooks vacíos al_iniciar_fase / al_iniciar_peatonal, una llamada por fase).
+
+# Intervalo del muestreador de pilas (segundos); None = sin muestreo
+INTERVALO_MUESTREO = None
+
+# Funciones y pilas que se exportan del muestreo (las más frecuentes)
+MAX_FUNCIONES = 30
+MAX_PILAS = 200
+
+ARCHIVO_PERFIL_JSON = "perfil.json"
+ARCHIVO_PERFIL_PROM = "perfil.prom"
+
+# Prefijo de las métricas en el formato de texto de Prometheus
+PREFIJO_METRICAS = "semaforos"
+
+
+# Entorno que cuenta los eventos procesados y los programados por cada proceso
+# (por el nombre de su generador)
+class EntornoPerfilado(simpy.Environment):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.procesados = 0
+        self.por_proceso = Counter()
+
+    def schedule(self, event, priority=simpy.core.NORMAL, delay=0):
+        proceso = self.active_process
+        nombre = proceso._generator.__name__ if proceso is not None else "(entorno)"
+        self.por_proceso[nombre] += 1
+        super().schedule(event, priority, delay)
+
+    def step(self):
+        self.procesados += 1
+        return super().step()
+
+
+# Crea una subclase perfilada de la Interseccion de un modelo: cuenta
+# llegadas, cambios de fase y ticks ociosos, y reparte el tiempo de pared
+# entre las fases (verde de cada calle y paso peatonal)
+def clase_perfilada(base):
+    class InterseccionPerfilada(base):
+        def __init__(self, env, *args, **kwargs):
+            self.contadores = Counter()
+            self.segundos_fase = Counter()
+            self._fase_actual = "Inicio"
+            self._marca = time.perf_counter()
+            super().__init__(env, *args, **kwargs)
+            for semaforo in self.semaforos.values():
+                semaforo.agregar_carro = self._contar_llegada(semaforo.agregar_carro)
+
+        def _contar_llegada(self, agregar_carro):
+            def agregar(llegada):
+                self.contadores["llegadas_carros"] += 1
+                agregar_carro(llegada)
+            return agregar
+
+        def _cambiar_fase(self, fase):
+            ahora = time.perf_counter()
+            self.segundos_fase[self._fase_actual] += ahora - self._marca
+            self._fase_actual, self._marca = fase, ahora
+
+        def al_iniciar_fase(self, fase):
+            self.contadores["cambios_fase"] += 1
+            self._cambiar_fase(f"Verde {list(self.semaforos)[fase]}")
+            super().al_iniciar_fase(fase)
+
+        def al_iniciar_peatonal(self):
+            self.contadores["pasos_peatonales"] += 1
+            self._cambiar_fase("Peatonal")
+            super().al_iniciar_peatonal()
+
+        def dormir(self, aviso, ticks_max):
+            ticks = yield from super().dormir(aviso, ticks_max)
+            self.contadores["esperas_ociosas"] += 1
+            self.contadores["ticks_ociosos"] += ticks
+            return ticks
+
+        # Tick del modo sondeo con la cola vacía
+        def esperar_tick(self):
+            self.contadores["ticks_ociosos"] += 1
+            return super().esperar_tick()
+
+        # Contadores finales (los cruces se leen de las estadísticas de espera)
+        def perfil(self):
+            self._cambiar_fase(self._fase_actual)
+            contadores = Counter(self.contadores)
+            contadores["cruces_carros"] = sum(semaforo.espera.n for semaforo in self.semaforos.values())
+            contadores["llegadas_peatones"] = self.espera_peatones.n + len(self.cola_peatones)
+            contadores["cruces_peatones"] = self.espera_peatones.n
+            return contadores, self.segundos_fase
+
+    InterseccionPerfilada.__name__ = f"{base.__name__}Perfilada"
+    return InterseccionPerfilada
+
+
+# Muestreador de pilas: un hilo toma cada "intervalo" segundos la pila del
+# hilo que lo creó (sys._current_frames) y cuenta las pilas vistas. Las pilas
+# empiezan debajo de la función que abrió el "with".
+class Muestreador:
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.objetivo = threading.get_ident()
+        self.pilas = Counter()
+        self.raiz = None
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self):
+        while not self._parar.wait(self.intervalo):
+            marco = sys._current_frames().get(self.objetivo)
+            # Al terminar, el hilo objetivo está esperando a este en join: no es una muestra útil
+            if self._parar.is_set():
+                break
+            pila = []
+            while marco is not None and marco is not self.raiz:
+                codigo = marco.f_code
+                pila.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                marco = marco.f_back
+            if pila:
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def __enter__(self):
+        self.raiz = sys._getframe(1)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        self._parar.set()
+        self._hilo.join()
+
+
+# Perfil vacío, con la misma forma que el de una repetición
+def _perfil_vacio():
+    return {"replicas": 0, "tiempo_simulado": 0.0, "segundos_pared": 0.0, "eventos": 0,
+            "contadores": Counter(), "eventos_por_proceso": Counter(), "segundos_por_fase": Counter(),
+            "pilas": Counter(), "muestras": 0}
+
+
+# Suma el perfil "otro" sobre "total"
+def combinar(total, otro):
+    for clave, valor in otro.items():
+        total[clave] = total[clave] + valor if not isinstance(valor, dict) else total[clave] + Counter(valor)
+    return total
+
+
+# Simula una repetición de main_prueba con instrumentación y devuelve (fila, perfil)
+def perfilar_replica(escenario, rep, semilla_base=None, tiempo=None, intervalo_muestreo=INTERVALO_MUESTREO):
+    import main_prueba
+    semilla_base = main_prueba.SEMILLA_BASE if semilla_base is None else semilla_base
+    tiempo = main_prueba.TIEMPO_SIMULACION if tiempo is None else tiempo
+
+    env = EntornoPerfilado()
+    rng = random.Random(main_prueba.semilla_replica(escenario["nombre"], rep, semilla_base))
+    interseccion = clase_perfilada(main_prueba.Interseccion)(env, escenario, rng)
+
+    muestreador = Muestreador(intervalo_muestreo) if intervalo_muestreo else None
+    inicio = time.perf_counter()
+    if muestreador:
+        with muestreador:
+            env.run(until=tiempo)
+    else:
+        env.run(until=tiempo)
+    segundos = time.perf_counter() - inicio
+
+    fila = {"Escenario": escenario["nombre"], "Repeticion": rep + 1}
+    fila.update(main_prueba.resumen_interseccion(interseccion, env.now))
+    contadores, segundos_fase = interseccion.perfil()
+    perfil = {"replicas": 1, "tiempo_simulado": env.now, "segundos_pared": segundos, "eventos": env.procesados,
+              "contadores": contadores, "eventos_por_proceso": env.por_proceso, "segundos_por_fase": segundos_fase,
+              "pilas": muestreador.pilas if muestreador else Counter(),
+              "muestras": sum(muestreador.pilas.values()) if muestreador else 0}
+    return fila, perfil
+
+
+def _perfilar_tarea(tarea):
+    return perfilar_replica(*tarea)
+
+
+# Barrido perfilado: simula todas las repeticiones (en el pool si procesos != 1),
+# genera el CSV, los TXT y las gráficas midiendo cada etapa, y devuelve las filas
+# y el perfil combinado. Los reportes se escriben en una carpeta temporal para
+# no pisar los del barrido normal (ni desincronizar el almacén).
+def perfilar_barrido(escenarios=None, repets=None, semilla_base=None, procesos=None, tiempo=None,
+                     intervalo_muestreo=INTERVALO_MUESTREO, graficas=True):
+    import pandas as pd
+    import main_prueba
+    escenarios = escenarios or main_prueba.ESCENARIOS
+    repets = repets or main_prueba.REPETS
+    tareas = [(escenario, rep, semilla_base, tiempo, intervalo_muestreo)
+              for escenario in escenarios for rep in range(repets)]
+
+    procesos = procesos or os.cpu_count() or 1
+    inicio = time.perf_counter()
+    if procesos == 1:
+        salidas = [_perfilar_tarea(tarea) for tarea in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            salidas = list(pool.map(_perfilar_tarea, tareas))
+    reportes = {"simulacion": time.perf_counter() - inicio}
+
+    perfil = _perfil_vacio()
+    for _, perfil_replica in salidas:
+        combinar(perfil, perfil_replica)
+
+    df = pd.DataFrame([fila for fila, _ in salidas])
+    etapas = [("csv", lambda: df.to_csv("resultados.csv", index=False)),
+              ("txt", lambda: main_prueba.generar_txt(df, escenarios))]
+    if graficas:
+        etapas.append(("graficas", lambda: main_prueba.generar_graficas(df, escenarios)))
+    with tempfile.TemporaryDirectory() as carpeta, chdir(carpeta):
+        for etapa, funcion in etapas:
+            inicio = time.perf_counter()
+            funcion()
+            reportes[etapa] = time.perf_counter() - inicio
+    perfil["segundos_reportes"] = reportes
+    return df, perfil
+
+
+# Perfil listo para JSON: derivados (eventos por segundo simulado y de pared)
+# y, del muestreo, las funciones más vistas (propias = en la punta de la pila)
+def exportable(perfil, max_funciones=MAX_FUNCIONES, max_pilas=MAX_PILAS):
+    propias, incluidas = Counter(), Counter()
+    for pila, cantidad in perfil["pilas"].items():
+        marcos = pila.split(";")
+        propias[marcos[-1]] += cantidad
+        for marco in set(marcos):
+            incluidas[marco] += cantidad
+
+    salida = {clave: (dict(valor) if isinstance(valor, Counter) else valor)
+              for clave, valor in perfil.items() if clave != "pilas"}
+    salida["eventos_por_segundo_simulado"] = perfil["eventos"] / perfil["tiempo_simulado"] if perfil["tiempo_simulado"] else 0
+    salida["eventos_por_segundo_pared"] = perfil["eventos"] / perfil["segundos_pared"] if perfil["segundos_pared"] else 0
+    if perfil["muestras"]:
+        salida["funciones_propias"] = dict(propias.most_common(max_funciones))
+        salida["funciones_incluidas"] = dict(incluidas.most_common(max_funciones))
+        # Formato "pila plegada" (una pila por línea con su cuenta), para flamegraph
+        salida["pilas"] = dict(perfil["pilas"].most_common(max_pilas))
+    return salida
+
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+
+# Métricas en el formato de texto de Prometheus (para el textfile collector)
+def a_prometheus(salida, prefijo=PREFIJO_METRICAS):
+    lineas = []
+
+    def metrica(nombre, tipo, ayuda, valores):
+        lineas.append(f"# HELP {prefijo}_{nombre} {ayuda}")
+        lineas.append(f"# TYPE {prefijo}_{nombre} {tipo}")
+        for etiquetas, valor in valores:
+            texto = ",".join(f'{clave}="{_etiqueta(v)}"' for clave, v in etiquetas.items())
+            lineas.append(f"{prefijo}_{nombre}{{{texto}}} {valor}" if texto else f"{prefijo}_{nombre} {valor}")
+
+    metrica("replicas_total", "counter", "Repeticiones simuladas", [({}, salida["replicas"])])
+    metrica("tiempo_simulado_segundos_total", "counter", "Tiempo simulado", [({}, salida["tiempo_simulado"])])
+    metrica("simulacion_segundos_total", "counter", "Tiempo de pared dentro de env.run", [({}, salida["segundos_pared"])])
+    metrica("eventos_total", "counter", "Eventos procesados por SimPy", [({}, salida["eventos"])])
+    metrica("eventos_por_segundo_simulado", "gauge", "Eventos por segundo simulado",
+            [({}, salida["eventos_por_segundo_simulado"])])
+    metrica("contador_total", "counter", "Llegadas, cruces, cambios de fase y ticks ociosos",
+            [({"nombre": nombre}, valor) for nombre, valor in sorted(salida["contadores"].items())])
+    metrica("eventos_proceso_total", "counter", "Eventos programados por cada proceso",
+            [({"proceso": nombre}, valor) for nombre, valor in sorted(salida["eventos_por_proceso"].items())])
+    metrica("fase_segundos_total", "counter", "Tiempo de pared por fase del semáforo",
+            [({"fase": nombre}, valor) for nombre, valor in sorted(salida["segundos_por_fase"].items())])
+    if "segundos_reportes" in salida:
+        metrica("etapa_segundos", "gauge", "Tiempo de pared de cada etapa del barrido",
+                [({"etapa": nombre}, valor) for nombre, valor in salida["segundos_reportes"].items()])
+    if salida.get("funciones_propias"):
+        metrica("muestras_funcion_total", "counter", "Muestras con la función en la punta de la pila",
+                [({"funcion": nombre}, valor) for nombre, valor in salida["funciones_propias"].items()])
+    return "\n".join(lineas) + "\n"
+
+
+# Escribe el perfil en JSON y en texto de Prometheus
+def guardar(perfil, ruta_json=ARCHIVO_PERFIL_JSON, ruta_prom=ARCHIVO_PERFIL_PROM):
+    salida = exportable(perfil)
+    with open(ruta_json, "w", encoding="utf-8") as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    with open(ruta_prom, "w", encoding="utf-8") as f:
+        f.write(a_prometheus(salida))
+    return salida
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de main_prueba con contadores y muestreo de pilas")
+    parser.add_argument("--repets", type=int)
+    parser.add_argument("--tiempo", type=float)
+    parser.add_argument("--procesos", type=int)
+    parser.add_argument("--muestreo", type=float, default=INTERVALO_MUESTREO, metavar="SEG",
+                        help="Activa el muestreador de pilas con este intervalo (p. ej. 0.005)")
+    parser.add_argument("--sin-graficas", action="store_true")
+    args = parser.parse_args()
+
+    _, perfil = perfilar_barrido(repets=args.repets, procesos=args.procesos, tiempo=args.tiempo,
+                                 intervalo_muestreo=args.muestreo, graficas=not args.sin_graficas)
+    salida = guardar(perfil)
+
+    print(f"{salida['replicas']} repeticiones, {salida['eventos']} eventos "
+          f"({salida['eventos_por_segundo_simulado']:.2f} por segundo simulado, "
+          f"{salida['eventos_por_segundo_pared']:.0f} por segundo de pared)")
+    print("Contadores: " + ", ".join(f"{nombre} {valor}" for nombre, valor in sorted(salida["contadores"].items())))
+    print("Eventos por proceso: " + ", ".join(f"{nombre} {valor}" for nombre, valor in salida["eventos_por_proceso"].items()))
+    print("Tiempo por fase: " + ", ".join(f"{nombre} {valor:.3f} s" for nombre, valor in salida["segundos_por_fase"].items()))
+    print("Etapas: " + ", ".join(f"{nombre} {valor:.3f} s" for nombre, valor in salida["segundos_reportes"].items()))
+    for funcion, muestras in list(salida.get("funciones_propias", {}).items())[:10]:
+        print(f"  {muestras:6d}  {funcion}")
+    print(f"Perfil guardado en {ARCHIVO_PERFIL_JSON} y {ARCHIVO_PERFIL_PROM}")
@@ -0,0 +1,323 @@
+import multiprocessing as mp
+import random
+import time
+from collections import deque
+
+import pandas as pd
+import simpy
+
+from estadisticas import EstadisticaEspera
+from main_prueba import (CALLES, ESCENARIOS, INTERVALO_LLEGADA_CARROS, TIEMPO_PEATONAL, TIEMPO_SIMULACION,
+                         SEMILLA_BASE, CONTROL_POR_EVENTOS, Interseccion, semilla_replica, resumen_interseccion)
+
+# Tamaño de la red: FILAS x COLUMNAS intersecciones (1 fila = corredor arterial Este-Oeste)
+FILAS = 1
+COLUMNAS = 20
+
+# Plan de semáforos de todas las intersecciones
+PLAN_RED = ESCENARIOS[0]
+
+# Tiempo de viaje (segundos) por el enlace entre dos intersecciones vecinas
+TIEMPO_ENLACE = 30
+
+# Desfasar el inicio del ciclo de cada columna para formar una onda verde hacia el Este
+ONDA_VERDE = True
+
+# Regiones en que se divide la red (bloques de columnas)
+REGIONES = 4
+
+# Procesos para simular las regiones, como mucho uno por región (1 = todas en
+# este proceso; None = uno por CPU)
+PROCESOS = None
+
+# Hacia dónde sigue un carro que cruza desde cada calle: (fila, columna) de la
+# intersección vecina. Los carros siguen derecho, sin giros.
+DIRECCION = {
+    "Norte-L1": (1, 0),   # Viene del Norte, va hacia el Sur
+    "Sur-L2": (-1, 0),    # Viene del Sur, va hacia el Norte
+    "Este-L3": (0, -1),   # Viene del Este, va hacia el Oeste
+    "Oeste-L4": (0, 1)    # Viene del Oeste, va hacia el Este
+}
+
+ARCHIVO_NODOS = "red_nodos.csv"
+ARCHIVO_VIAJES = "red_viajes.csv"
+
+
+# Nombre de la intersección en (fila, columna)
+def nombre_nodo(fila, columna):
+    return f"N{fila}_{columna}"
+
+
+# Calles de una intersección que reciben carros desde fuera de la red
+def entradas_externas(fila, columna, filas, columnas):
+    entradas = []
+    for calle, (df, dc) in DIRECCION.items():
+        origen = (fila - df, columna - dc)
+        if not (0 <= origen[0] < filas and 0 <= origen[1] < columnas):
+            entradas.append(calle)
+    return entradas
+
+
+# Duración aproximada del ciclo de un plan: verdes más un paso peatonal por fase
+def duracion_ciclo(plan):
+    return sum(plan[calle] for calle in CALLES) + len(CALLES) * plan.get("Peatonal", TIEMPO_PEATONAL)
+
+
+# Desfase de cada columna para una onda verde hacia el Este: el ciclo de la
+# columna c empieza c enlaces después que el de la columna 0
+def desfases_onda_verde(filas, columnas, plan=PLAN_RED, tiempo_enlace=TIEMPO_ENLACE):
+    ciclo = duracion_ciclo(plan)
+    return {(f, c): (c * tiempo_enlace) % ciclo for f in range(filas) for c in range(columnas)}
+
+
+# Divide la red en bloques de columnas contiguas
+def dividir_regiones(filas, columnas, regiones):
+    regiones = max(1, min(regiones, columnas))
+    bloques = []
+    for r in range(regiones):
+        desde, hasta = r * columnas // regiones, (r + 1) * columnas // regiones
+        bloques.append([(f, c) for f in range(filas) for c in range(desde, hasta)])
+    return bloques
+
+
+# Intersección dentro de la red: solo las calles del borde generan llegadas,
+# las demás reciben los carros que cruzan la intersección anterior. Cada carro
+# lleva (instante de entrada a la red, intersecciones cruzadas).
+class Nodo(Interseccion):
+    def __init__(self, env, posicion, tiempos_verde, rng, entradas, region, desfase=0, por_eventos=CONTROL_POR_EVENTOS):
+        self.posicion = posicion
+        self.nombre = nombre_nodo(*posicion)
+        self.entradas = set(entradas)  # Calles con llegadas desde fuera de la red
+        self.region = region
+        self.desfase = desfase
+        self.viajes = {calle: deque() for calle in CALLES}  # Datos de viaje de los carros en cada cola
+        super().__init__(env, tiempos_verde, rng, por_eventos)
+
+    def generar_carros(self, calle):
+        if calle not in self.entradas:
+            return
+        while True:
+            yield self.env.timeout(self.rng.expovariate(1.0 / INTERVALO_LLEGADA_CARROS[calle]))
+            self.recibir_carro(calle, (self.env.now, 0))
+
+    def recibir_carro(self, calle, viaje):
+        self.viajes[calle].append(viaje)
+        self.semaforos[calle].agregar_carro(self.env.now)
+
+    def controlar_semaforos(self):
+        # Todo en rojo hasta el desfase, luego el ciclo normal
+        if self.desfase:
+            yield self.env.timeout(self.desfase)
+        yield from super().controlar_semaforos()
+
+    def al_cruzar(self, calle, llegada):
+        entrada, cruces = self.viajes[calle].popleft()
+        self.region.despachar(self, calle, (entrada, cruces + 1))
+
+
+# Grupo de intersecciones simuladas en un mismo entorno. Los carros que van a
+# otra región se guardan en "salientes" para que el coordinador los entregue.
+class Region:
+    def __init__(self, posiciones, config, rep=0, semilla_base=SEMILLA_BASE):
+        self.env = simpy.Environment()
+        self.config = config
+        self.salientes = []  # (llegada al destino, posición destino, calle, viaje)
+        self.viajes = {calle: EstadisticaEspera() for calle in CALLES}  # Tiempo total en la red de los que salieron
+        self.cruces = {calle: 0 for calle in CALLES}  # Intersecciones cruzadas por los que salieron
+
+        filas, columnas = config["filas"], config["columnas"]
+        self.nodos = {}
+        for posicion in posiciones:
+            # Cada intersección tiene su propio generador, independiente de la partición
+            rng = random.Random(semilla_replica(f"{config['nombre']}:{nombre_nodo(*posicion)}", rep, semilla_base))
+            self.nodos[posicion] = Nodo(self.env, posicion, config["plan"], rng,
+                                        entradas_externas(*posicion, filas, columnas), self,
+                                        config["desfases"].get(posicion, 0))
+
+    # Manda un carro que acaba de cruzar a la siguiente intersección o lo saca de la red
+    def despachar(self, nodo, calle, viaje):
+        df, dc = DIRECCION[calle]
+        destino = (nodo.posicion[0] + df, nodo.posicion[1] + dc)
+        if not (0 <= destino[0] < self.config["filas"] and 0 <= destino[1] < self.config["columnas"]):
+            entrada, cruces = viaje
+            self.viajes[calle].agregar(self.env.now - entrada)
+            self.cruces[calle] += cruces
+            return
+
+        llegada = self.env.now + self.config["tiempo_enlace"]
+        if destino in self.nodos:
+            self.env.process(self._viajar(destino, calle, viaje, llegada))
+        else:
+            self.salientes.append((llegada, destino, calle, viaje))
+
+    def _viajar(self, destino, calle, viaje, llegada):
+        yield self.env.timeout(llegada - self.env.now)
+        self.nodos[destino].recibir_carro(calle, viaje)
+
+    # Recibe los carros de otras regiones, simula hasta "hasta" y devuelve los que salen
+    def avanzar(self, hasta, entrantes):
+        for llegada, destino, calle, viaje in entrantes:
+            self.env.process(self._viajar(destino, calle, viaje, llegada))
+        self.env.run(until=hasta)
+        salientes, self.salientes = self.salientes, []
+        return salientes
+
+    def resultados(self):
+        nodos = []
+        for (f, c), nodo in self.nodos.items():
+            fila = {"Nodo": nodo.nombre, "Fila": f, "Columna": c}
+            fila.update(resumen_interseccion(nodo, self.env.now))
+            nodos.append(fila)
+        return nodos, self.viajes, self.cruces
+
+
+# Proceso trabajador: simula un grupo de regiones y atiende las órdenes del
+# coordinador por su conexión (una respuesta por región, en el orden del grupo)
+def _trabajador_regiones(conexion, bloques, config, rep, semilla_base):
+    regiones = [Region(posiciones, config, rep, semilla_base) for posiciones in bloques]
+    while True:
+        orden, *argumentos = conexion.recv()
+        if orden == "avanzar":
+            hasta, buzones = argumentos
+            conexion.send([region.avanzar(hasta, buzon) for region, buzon in zip(regiones, buzones)])
+        else:
+            conexion.send([region.resultados() for region in regiones])
+            conexion.close()
+            return
+
+
+# Simula la red repartida en regiones con sincronización conservadora: todas
+# las regiones avanzan en ventanas de "lookahead" segundos (el tiempo mínimo de
+# enlace) y al final de cada ventana intercambian los carros que cruzan de una
+# región a otra. Como ningún carro tarda menos que el lookahead en llegar a la
+# siguiente intersección, ninguno llega dentro de la ventana en que salió.
+# Devuelve (DataFrame por intersección, DataFrame de viajes por sentido).
+def simular_red(filas=FILAS, columnas=COLUMNAS, plan=PLAN_RED, tiempo_enlace=TIEMPO_ENLACE, onda_verde=ONDA_VERDE,
+                regiones=REGIONES, procesos=PROCESOS, tiempo=TIEMPO_SIMULACION, rep=0, semilla_base=SEMILLA_BASE):
+    config = {
+        "nombre": f"Red_{filas}x{columnas}",
+        "filas": filas,
+        "columnas": columnas,
+        "plan": plan,
+        "tiempo_enlace": tiempo_enlace,
+        "desfases": desfases_onda_verde(filas, columnas, plan, tiempo_enlace) if onda_verde else {}
+    }
+    bloques = dividir_regiones(filas, columnas, regiones)
+    region_de = {posicion: i for i, bloque in enumerate(bloques) for posicion in bloque}
+    lookahead = tiempo_enlace
+
+    # En serie las regiones son objetos locales; en paralelo, hasta "procesos"
+    # trabajadores, cada uno con las regiones i, i + procesos, i + 2 * procesos...
+    procesos = min(procesos or mp.cpu_count(), len(bloques))
+    locales, conexiones, trabajadores = None, [], []
+    if procesos == 1:
+        locales = [Region(bloque, config, rep, semilla_base) for bloque in bloques]
+        grupos = []
+    else:
+        grupos = [list(range(i, len(bloques), procesos)) for i in range(procesos)]
+
+    # Envía a cada trabajador la orden mensaje(grupo) y ordena las respuestas por región
+    def ordenar(mensaje):
+        for conexion, grupo in zip(conexiones, grupos):
+            conexion.send(mensaje(grupo))
+        respuestas = [None] * len(bloques)
+        for conexion, grupo in zip(conexiones, grupos):
+            for i, respuesta in zip(grupo, conexion.recv()):
+                respuestas[i] = respuesta
+        return respuestas
+
+    try:
+        for grupo in grupos:
+            propia, remota = mp.Pipe()
+            trabajador = mp.Process(target=_trabajador_regiones,
+                                    args=(remota, [bloques[i] for i in grupo], config, rep, semilla_base))
+            trabajador.start()
+            # Sin la copia del coordinador, recv() da EOFError si el trabajador muere
+            remota.close()
+            conexiones.append(propia)
+            trabajadores.append(trabajador)
+
+        buzones = [[] for _ in bloques]
+        ahora = 0
+        while ahora < tiempo:
+            hasta = min(ahora + lookahead, tiempo)
+            if locales is not None:
+                salidas = [region.avanzar(hasta, buzon) for region, buzon in zip(locales, buzones)]
+            else:
+                salidas = ordenar(lambda grupo: ("avanzar", hasta, [buzones[i] for i in grupo]))
+
+            buzones = [[] for _ in bloques]
+            for salientes in salidas:
+                for carro in salientes:
+                    buzones[region_de[carro[1]]].append(carro)
+            ahora = hasta
+
+        if locales is not None:
+            resultados = [region.resultados() for region in locales]
+        else:
+            resultados = ordenar(lambda grupo: ("resultados",))
+    except BaseException:
+        # Un trabajador falló o se interrumpió la simulación: no dejar procesos colgados
+        for trabajador in trabajadores:
+            trabajador.terminate()
+        raise
+    finally:
+        for conexion in conexiones:
+            conexion.close()
+        for trabajador in trabajadores:
+            trabajador.join()
+
+    # Resultados por intersección y viajes completos por sentido (uniendo regiones)
+    nodos = [fila for filas_region, _, _ in resultados for fila in filas_region]
+    df_nodos = pd.DataFrame(nodos).sort_values(["Fila", "Columna"]).reset_index(drop=True)
+
+    viajes = {calle: EstadisticaEspera() for calle in CALLES}
+    cruces = {calle: 0 for calle in CALLES}
+    for _, viajes_region, cruces_region in resultados:
+        for calle in CALLES:
+            viajes[calle].combinar(viajes_region[calle])
+            cruces[calle] += cruces_region[calle]
+    df_viajes = pd.DataFrame([{
+        "Entrada": calle,
+        "Viajes": viajes[calle].n,
+        "Tiempo_Viaje_Prom": viajes[calle].media,
+        "Tiempo_Viaje_Desv": viajes[calle].desviacion,
+        "Tiempo_Viaje_P50": viajes[calle].cuantil(0.5),
+        "Tiempo_Viaje_P95": viajes[calle].cuantil(0.95),
+        "Tiempo_Viaje_P99": viajes[calle].cuantil(0.99),
+        "Intersecciones_Prom": cruces[calle] / viajes[calle].n if viajes[calle].n else 0
+    } for calle in CALLES])
+    return df_nodos, df_viajes
+
+
+# Resumen compacto por intersección: vehículos que cruzaron, espera promedio
+# ponderada por carros y la peor cola máxima entre sus calles
+def resumen_nodos(df_nodos):
+    pasados = df_nodos[[f"{calle}_Pasados" for calle in CALLES]]
+    esperas = df_nodos[[f"{calle}_Espera_Prom" for calle in CALLES]].values
+    total = pasados.sum(axis=1)
+    return pd.DataFrame({
+        "Nodo": df_nodos["Nodo"],
+        "Pasados": total,
+        "Espera_Prom": (pasados.values * esperas).sum(axis=1) / total.where(total > 0, 1),
+        "Espera_P95_Max": df_nodos[[f"{calle}_Espera_P95" for calle in CALLES]].max(axis=1),
+        "Cola_Max": df_nodos[[f"{calle}_Cola_Max" for calle in CALLES]].max(axis=1),
+        "Peatones_Pasados": df_nodos["Peatones_Pasados"]
+    })
+
+
+if __name__ == "__main__":
+    inicio = time.perf_counter()
+    df_nodos, df_viajes = simular_red()
+    duracion = time.perf_counter() - inicio
+
+    df_nodos.to_csv(ARCHIVO_NODOS, index=False)
+    df_viajes.to_csv(ARCHIVO_VIAJES, index=False)
+
+    print(f"===== RED {FILAS}x{COLUMNAS} - {PLAN_RED['nombre']} - enlace {TIEMPO_ENLACE} s"
+          f" - onda verde: {'sí' if ONDA_VERDE else 'no'} =====\n")
+    print(">>> Intersecciones <<<")
+    print(resumen_nodos(df_nodos).round(2).to_string(index=False))
+    print("\n>>> Viajes de punta a punta (por calle de entrada) <<<")
+    print(df_viajes.round(2).to_string(index=False))
+    print(f"\nSimulado en {duracion:.2f} s con {REGIONES} regiones")
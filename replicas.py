@@ -0,0 +1,109 @@
+import argparse
+import math
+import os
+from contextlib import chdir
+
+from main_prueba import (ESCENARIOS, REPETS, SEMILLA_BASE, PROCESOS, TIEMPO_SIMULACION, CONTROL_POR_EVENTOS, CONFIANZA,
+                         ejecutar_tareas, intervalos_metricas)
+
+# Semiancho relativo objetivo del intervalo de confianza (0.05 = ±5% de la media)
+PRECISION_RELATIVA = 0.05
+
+# Métricas clave que deben alcanzar la precisión (ver main_prueba.metricas_clave)
+METRICAS_PRECISION = ["TiempoEsperaVehiculos", "TiempoEsperaPeatones"]
+
+# Repeticiones mínimas y máximas por escenario
+REPETS_MINIMO = REPETS
+REPETS_MAXIMO = 200
+
+# Repeticiones que se agregan por ronda a cada escenario que aún no llegó a la precisión
+LOTE_REPETS = 10
+
+ARCHIVO_ADAPTATIVO = "resultados_adaptativos.csv"
+
+# Carpeta de los TXT, .sca y .vec del barrido adaptativo (los de la carpeta
+# principal son los del barrido de REPETS fijas que mantiene almacen.py)
+CARPETA_ADAPTATIVO = "reportes_adaptativos"
+
+
+# True si todas las métricas tienen semiancho relativo <= precision. Hacen
+# falta al menos 2 observaciones (repeticiones o pares): con una el semiancho es 0.
+def alcanzo_precision(intervalos, precision=PRECISION_RELATIVA, metricas=METRICAS_PRECISION):
+    return all(intervalos[m][2] >= 2 and intervalos[m][0] and intervalos[m][1] <= precision * abs(intervalos[m][0])
+               for m in metricas)
+
+
+# Barrido secuencial: cada escenario empieza con "minimo" repeticiones y recibe
+# "lote" más por ronda hasta que sus métricas clave alcanzan la precisión o
+# llega a "maximo". Las repeticiones de todos los escenarios pendientes de una
+# ronda se reparten juntas en el pool. Con antitetica las repeticiones van de a
+# pares (columna "Grupo") y los intervalos se calculan sobre los pares.
+# Devuelve (filas, {escenario: intervalos}).
+def barrido_adaptativo(escenarios=ESCENARIOS, precision=PRECISION_RELATIVA, metricas=METRICAS_PRECISION,
+                       minimo=REPETS_MINIMO, maximo=REPETS_MAXIMO, lote=LOTE_REPETS, semilla_base=SEMILLA_BASE,
+                       procesos=PROCESOS, tiempo=TIEMPO_SIMULACION, crn=False, antitetica=False, confianza=CONFIANZA):
+    def par(n):
+        return 2 * math.ceil(n / 2) if antitetica else n
+
+    filas = {escenario["nombre"]: [] for escenario in escenarios}
+    intervalos = {}
+    pendientes = list(escenarios)
+    while pendientes:
+        tareas = []
+        for escenario in pendientes:
+            hechas = len(filas[escenario["nombre"]])
+            objetivo = min(par(maximo), par(minimo if hechas == 0 else hechas + lote))
+            tareas.extend((escenario, rep, semilla_base, CONTROL_POR_EVENTOS, tiempo, None, crn, antitetica)
+                          for rep in range(hechas, objetivo))
+
+        for tarea, fila in zip(tareas, ejecutar_tareas(tareas, procesos)):
+            if antitetica:
+                fila["Grupo"] = tarea[1] // 2
+            filas[fila["Escenario"]].append(fila)
+
+        siguientes = []
+        for escenario in pendientes:
+            nombre = escenario["nombre"]
+            intervalos[nombre] = intervalos_metricas(filas[nombre], confianza)
+            if not alcanzo_precision(intervalos[nombre], precision, metricas) and len(filas[nombre]) < par(maximo):
+                siguientes.append(escenario)
+        pendientes = siguientes
+
+    return [fila for escenario in escenarios for fila in filas[escenario["nombre"]]], intervalos
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from main_prueba import generar_txt, generar_sca
+
+    parser = argparse.ArgumentParser(description="Repeticiones hasta alcanzar la precisión pedida")
+    parser.add_argument("--precision", type=float, default=PRECISION_RELATIVA, help="Semiancho relativo objetivo")
+    parser.add_argument("--minimo", type=int, default=REPETS_MINIMO)
+    parser.add_argument("--maximo", type=int, default=REPETS_MAXIMO)
+    parser.add_argument("--lote", type=int, default=LOTE_REPETS)
+    parser.add_argument("--tiempo", type=float, default=TIEMPO_SIMULACION)
+    parser.add_argument("--procesos", type=int, default=PROCESOS)
+    parser.add_argument("--crn", action="store_true", help="Números aleatorios comunes entre escenarios")
+    parser.add_argument("--antitetica", action="store_true", help="Pares de repeticiones con llegadas antitéticas")
+    args = parser.parse_args()
+
+    filas, intervalos = barrido_adaptativo(precision=args.precision, minimo=args.minimo, maximo=args.maximo,
+                                           lote=args.lote, procesos=args.procesos, tiempo=args.tiempo,
+                                           crn=args.crn, antitetica=args.antitetica)
+    df = pd.DataFrame(filas)
+    df.to_csv(ARCHIVO_ADAPTATIVO, index=False)
+    os.makedirs(CARPETA_ADAPTATIVO, exist_ok=True)
+    with chdir(CARPETA_ADAPTATIVO):
+        generar_txt(df)
+        generar_sca(df)
+
+    print(f"===== PRECISIÓN ALCANZADA (objetivo ±{args.precision:.0%}, IC {int(CONFIANZA * 100)}%) =====\n")
+    for nombre, intervalos_esc in intervalos.items():
+        repeticiones = int((df["Escenario"] == nombre).sum())
+        print(f"{nombre}: {repeticiones} repeticiones"
+              + (" (máximo alcanzado)" if not alcanzo_precision(intervalos_esc, args.precision) else ""))
+        for metrica in METRICAS_PRECISION:
+            media, semiancho, _ = intervalos_esc[metrica]
+            relativo = f"{semiancho / abs(media):.1%}" if media else "media 0"
+            print(f"  {metrica}: {media:.2f} ± {semiancho:.2f} ({relativo})")
+    print(f"\nResultados en {ARCHIVO_ADAPTATIVO} y {CARPETA_ADAPTATIVO}/ (Resultado_*.txt y Escenario_*.sca/.vec)")
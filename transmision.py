@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+
+import simpy
+
+from estadisticas import CUANTILES
+
+# Cada cuántos segundos simulados se emite un resumen (None = uno por ciclo de semáforos)
+INTERVALO_RESUMEN = None
+
+# Los percentiles de espera de cada resumen cubren los cruces de los últimos N resúmenes
+VENTANAS_PERCENTILES = 10
+
+# Servidor local: cada cliente tiene un búfer de resúmenes; si se llena porque
+# el cliente lee lento, se descarta el más viejo (la simulación nunca espera)
+HOST = "127.0.0.1"
+PUERTO = 8765
+BUFER_CLIENTE = 16
+
+# Segundos que el servidor espera al terminar a que los clientes reciban el
+# último resumen; después corta las conexiones que sigan pendientes
+ESPERA_CIERRE = 5.0
+
+ARCHIVO_TRANSMISION = "transmision.jsonl"
+
+
+# Arma los resúmenes de una intersección. Solo guarda una copia de los
+# histogramas de espera por cada una de las últimas "ventanas" emisiones, así
+# la memoria no crece con la duración de la corrida.
+class Monitor:
+    def __init__(self, interseccion, ventanas=VENTANAS_PERCENTILES):
+        self.interseccion = interseccion
+        self.numero = 0
+        self.ultimo = interseccion.env.now
+        self.historia = deque([self._copias()], maxlen=ventanas)
+        self.cruces = self._cruces()
+        self.areas = self._areas(self.ultimo)
+
+    def _esperas(self):
+        esperas = {calle: semaforo.espera for calle, semaforo in self.interseccion.semaforos.items()}
+        esperas["Peatones"] = self.interseccion.espera_peatones
+        return esperas
+
+    def _copias(self):
+        return {nombre: espera.histograma.copia() for nombre, espera in self._esperas().items()}
+
+    def _cruces(self):
+        return {nombre: espera.n for nombre, espera in self._esperas().items()}
+
+    def _areas(self, t):
+        areas = {calle: semaforo.tam_cola.acumulado(t) for calle, semaforo in self.interseccion.semaforos.items()}
+        areas["Peatones"] = self.interseccion.tam_cola_peatones.acumulado(t)
+        return areas
+
+    # Resumen del intervalo desde la emisión anterior: cruces y cola promedio del
+    # intervalo, cola actual y percentiles de espera de la ventana móvil
+    def resumen(self):
+        t = self.interseccion.env.now
+        duracion = t - self.ultimo
+        cruces, areas, copias = self._cruces(), self._areas(t), self._copias()
+        colas = {calle: len(semaforo.cola) for calle, semaforo in self.interseccion.semaforos.items()}
+        colas["Peatones"] = len(self.interseccion.cola_peatones)
+
+        carriles = {}
+        for nombre, copia in copias.items():
+            ventana = copia.desde(self.historia[0][nombre])
+            carriles[nombre] = {
+                "cruces": cruces[nombre] - self.cruces[nombre],
+                "cola": colas[nombre],
+                "cola_prom": round((areas[nombre] - self.areas[nombre]) / duracion, 3) if duracion > 0 else colas[nombre],
+                **{f"p{int(p * 100)}": round(ventana.cuantil(p), 2) for p in CUANTILES}
+            }
+
+        self.numero += 1
+        self.ultimo, self.cruces, self.areas = t, cruces, areas
+        self.historia.append(copias)
+        return {"n": self.numero, "t": round(t, 3), "intervalo": round(duracion, 3), "carriles": carriles}
+
+
+# Evento que se dispara al empezar el próximo ciclo (verde de la primera calle).
+# Se envuelve el hook al_iniciar_fase de la instancia, sin tocar la clase.
+def _avisos_de_ciclo(interseccion):
+    env = interseccion.env
+    aviso = [env.event()]
+    original = interseccion.al_iniciar_fase
+
+    def al_iniciar_fase(fase):
+        original(fase)
+        if fase == 0 and not aviso[0].triggered:
+            aviso[0].succeed()
+
+    interseccion.al_iniciar_fase = al_iniciar_fase
+
+    def proximo():
+        if aviso[0].triggered:
+            aviso[0] = env.event()
+        return aviso[0]
+    return proximo
+
+
+# Avanza la simulación hasta el próximo resumen y lo devuelve, sin ritmo
+def _avanzar(interseccion, cada, hasta, ventanas):
+    env = interseccion.env
+    monitor = Monitor(interseccion, ventanas)
+    proximo_ciclo = _avisos_de_ciclo(interseccion) if cada is None else None
+    fin = env.timeout(hasta - env.now) if cada is None and hasta is not None else None
+
+    while hasta is None or env.now < hasta:
+        if cada is not None:
+            env.run(until=env.now + cada if hasta is None else min(env.now + cada, hasta))
+        else:
+            # El primer ciclo empieza en el instante inicial: ahí no hay nada que resumir
+            while True:
+                aviso = proximo_ciclo()
+                env.run(until=aviso if fin is None else aviso | fin)
+                if env.now > monitor.ultimo or not aviso.triggered:
+                    break
+        yield monitor.resumen()
+
+
+# Iterador de resúmenes: la simulación solo avanza cuando el consumidor pide el
+# siguiente, así que un consumidor lento frena la simulación en vez de acumular
+# resúmenes en memoria. "cada" en segundos simulados (None = uno por ciclo),
+# "hasta" = fin de la simulación (None = sin fin), "ritmo" = k veces el tiempo
+# real (None = lo más rápido posible).
+def resumenes(interseccion, cada=INTERVALO_RESUMEN, hasta=None, ritmo=None, ventanas=VENTANAS_PERCENTILES):
+    inicio_real, inicio_sim = time.perf_counter(), interseccion.env.now
+    for resumen in _avanzar(interseccion, cada, hasta, ventanas):
+        if ritmo:
+            espera = inicio_real + (resumen["t"] - inicio_sim) / ritmo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+        yield resumen
+
+
+# Versión asíncrona de resumenes: entre un resumen y otro cede el control al
+# event loop (y espera sin bloquear en el modo con ritmo). Cada tramo de
+# simulación entre dos resúmenes corre de una vez dentro del loop.
+async def resumenes_async(interseccion, cada=INTERVALO_RESUMEN, hasta=None, ritmo=None,
+                          ventanas=VENTANAS_PERCENTILES):
+    inicio_real, inicio_sim = time.perf_counter(), interseccion.env.now
+    for resumen in _avanzar(interseccion, cada, hasta, ventanas):
+        espera = inicio_real + (resumen["t"] - inicio_sim) / ritmo - time.perf_counter() if ritmo else 0
+        await asyncio.sleep(max(0, espera))
+        yield resumen
+
+
+# Escribe los resúmenes en un archivo JSON Lines (para seguirlo con "tail -f")
+def escribir_archivo(interseccion, ruta=ARCHIVO_TRANSMISION, **opciones):
+    with open(ruta, "w", encoding="utf-8") as f:
+        for resumen in resumenes(interseccion, **opciones):
+            f.write(json.dumps(resumen, ensure_ascii=False) + "\n")
+            f.flush()
+
+
+# Sirve los resúmenes como JSON Lines por un socket TCP local a todos los
+# clientes conectados. La simulación no espera a ningún cliente: cada uno tiene
+# un búfer de BUFER_CLIENTE resúmenes y, si se llena, pierde los más viejos.
+async def servir_socket(interseccion, host=HOST, puerto=PUERTO, bufer=BUFER_CLIENTE, espera_cierre=ESPERA_CIERRE,
+                        **opciones):
+    clientes = {}  # Búfer de cada cliente -> su escritor
+
+    async def atender(lector, escritor):
+        cola = asyncio.Queue(maxsize=bufer)
+        clientes[cola] = escritor
+        try:
+            while (resumen := await cola.get()) is not None:
+                escritor.write((json.dumps(resumen, ensure_ascii=False) + "\n").encode("utf-8"))
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            clientes.pop(cola, None)
+            escritor.close()
+
+    def publicar(mensaje):
+        for cola in clientes:
+            if cola.full():
+                cola.get_nowait()
+            cola.put_nowait(mensaje)
+
+    servidor = await asyncio.start_server(atender, host, puerto)
+    async with servidor:
+        async for resumen in resumenes_async(interseccion, **opciones):
+            publicar(resumen)
+        publicar(None)
+        # Dar tiempo a que los clientes reciban el último resumen; a los que no
+        # leen se les corta la conexión (su drain() falla y el cliente termina)
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + espera_cierre
+        while clientes and loop.time() < limite:
+            await asyncio.sleep(0.05)
+        for escritor in list(clientes.values()):
+            escritor.transport.abort()
+
+
+# Crea la intersección del modelo indicado ("prueba" o "eventos")
+def crear_interseccion(modelo="prueba", escenario=None, rep=0):
+    env = simpy.Environment()
+    if modelo == "eventos":
+        import main_eventos
+        random.seed(rep)
+        return main_eventos.Interseccion(env)
+
+    import main_prueba
+    escenario = escenario or main_prueba.ESCENARIOS[0]
+    rng = random.Random(main_prueba.semilla_replica(escenario["nombre"], rep))
+    return main_prueba.Interseccion(env, escenario, rng)
+
+
+# Una línea por resumen para la consola
+def formatear(resumen):
+    partes = [f"t={resumen['t']:>9.1f}"]
+    for nombre, carril in resumen["carriles"].items():
+        partes.append(f"{nombre}: {carril['cruces']:>3d} cruces, cola {carril['cola']:>3d}, p95 {carril['p95']:>7.1f}")
+    return " | ".join(partes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resúmenes en vivo de una simulación larga")
+    parser.add_argument("--modelo", choices=["prueba", "eventos"], default="prueba")
+    parser.add_argument("--escenario", help="Nombre del escenario (modelo prueba)")
+    parser.add_argument("--cada", type=float, default=INTERVALO_RESUMEN,
+                        help="Segundos simulados entre resúmenes (por defecto uno por ciclo)")
+    parser.add_argument("--hasta", type=float, default=86400, help="Segundos a simular (0 = sin fin)")
+    parser.add_argument("--ritmo", type=float, help="Correr a k veces el tiempo real")
+    destino = parser.add_mutually_exclusive_group()
+    destino.add_argument("--socket", type=int, nargs="?", const=PUERTO, metavar="PUERTO",
+                         help=f"Servir por TCP en {HOST} (JSON Lines)")
+    destino.add_argument("--archivo", nargs="?", const=ARCHIVO_TRANSMISION, help="Escribir JSON Lines en un archivo")
+    args = parser.parse_args()
+
+    escenario = None
+    if args.escenario:
+        from main_prueba import ESCENARIOS
+        escenario = next((e for e in ESCENARIOS if e["nombre"] == args.escenario), None)
+        if escenario is None:
+            sys.exit(f"Escenario desconocido: {args.escenario}")
+    interseccion = crear_interseccion(args.modelo, escenario)
+    opciones = {"cada": args.cada, "hasta": args.hasta or None, "ritmo": args.ritmo}
+
+    if args.socket:
+        print(f"Sirviendo resúmenes en {HOST}:{args.socket}")
+        asyncio.run(servir_socket(interseccion, puerto=args.socket, **opciones))
+    elif args.archivo:
+        print(f"Escribiendo resúmenes en {args.archivo}")
+        escribir_archivo(interseccion, args.archivo, **opciones)
+    else:
+        for resumen in resumenes(interseccion, **opciones):
+            print(formatear(resumen), flush=True)
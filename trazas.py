@@ -0,0 +1,205 @@
+import array
+import queue
+import struct
+import sys
+import threading
+
+# Niveles de traza (por defecto la traza está apagada)
+NIVEL_APAGADO = 0
+NIVEL_FASES = 1    # Cambios de fase y resúmenes de cada fase
+NIVEL_EVENTOS = 2  # Además cada llegada y cada cruce
+
+# Tipos de evento registrados
+LLEGADA_CARRO = 0
+CRUCE_CARRO = 1
+VERDE = 2
+ROJO = 3
+LLEGADA_PEATON = 4
+PASO_PEATONAL = 5
+FIN_PASO_PEATONAL = 6
+
+# Valor de la columna "calle" en eventos que no pertenecen a una calle
+SIN_CALLE = 255
+
+# Encabezado del archivo binario
+MAGIA = b"SEMTRZ1\n"
+
+# Columnas de cada bloque: (nombre, código de tipo de array)
+# tiempo: instante del evento, cola: tamaño de la cola tras el evento,
+# llegada: llegada del carro que cruza, valor: dato extra (tiempo de cruce o cantidad)
+COLUMNAS = (("tiempo", "d"), ("tipo", "B"), ("calle", "B"), ("cola", "I"), ("llegada", "d"), ("valor", "d"))
+
+# Registros acumulados en memoria antes de escribir un bloque
+TAM_BLOQUE = 65536
+
+
+# Convierte un array a bytes en little-endian
+def _a_bytes(columna):
+    if sys.byteorder == "big":
+        columna = array.array(columna.typecode, columna)
+        columna.byteswap()
+    return columna.tobytes()
+
+
+# Traza binaria por columnas. Los eventos se acumulan en memoria y se escriben
+# en bloques grandes, opcionalmente desde un hilo escritor en segundo plano.
+class Traza:
+    def __init__(self, ruta, nivel=NIVEL_EVENTOS, calles=(), tam_bloque=TAM_BLOQUE, hilo=False):
+        self.nivel = nivel
+        self.calles = list(calles)
+        self.indice_calle = {calle: i for i, calle in enumerate(self.calles)}
+        self.tam_bloque = tam_bloque
+        self.archivo = open(ruta, "wb")
+        self._nuevas_columnas()
+
+        # Encabezado: magia + nombres de las calles
+        nombres = "\n".join(self.calles).encode("utf-8")
+        self.archivo.write(MAGIA + struct.pack("<I", len(nombres)) + nombres)
+
+        self.cola_bloques = None
+        self.escritor = None
+        self.error_escritor = None  # Excepción de una escritura fallida del hilo escritor
+        if hilo:
+            self.cola_bloques = queue.Queue(maxsize=8)
+            self.escritor = threading.Thread(target=self._escribir_en_hilo, daemon=True)
+            self.escritor.start()
+
+    def _nuevas_columnas(self):
+        (self.tiempo, self.tipo, self.calle, self.cola,
+         self.llegada, self.valor) = (array.array(codigo) for _, codigo in COLUMNAS)
+
+    # Agrega un evento al bloque actual
+    def registrar(self, tiempo, tipo, calle=None, cola=0, llegada=0.0, valor=0.0):
+        self.tiempo.append(tiempo)
+        self.tipo.append(tipo)
+        self.calle.append(SIN_CALLE if calle is None else self.indice_calle[calle])
+        self.cola.append(cola)
+        self.llegada.append(llegada)
+        self.valor.append(valor)
+        if len(self.tiempo) >= self.tam_bloque:
+            self.volcar()
+
+    # Serializa el bloque actual y lo escribe (o lo entrega al hilo escritor)
+    def volcar(self):
+        self._revisar_escritor()
+        n = len(self.tiempo)
+        if n == 0:
+            return
+        partes = [struct.pack("<I", n)]
+        partes.extend(_a_bytes(c) for c in (self.tiempo, self.tipo, self.calle, self.cola, self.llegada, self.valor))
+        bloque = b"".join(partes)
+        self._nuevas_columnas()
+
+        if self.cola_bloques is not None:
+            self.cola_bloques.put(bloque)
+        else:
+            self.archivo.write(bloque)
+
+    # Si una escritura falla, el hilo guarda la excepción (volcar y cerrar la
+    # relanzan) y sigue vaciando la cola sin escribir, para que volcar no quede
+    # bloqueado con la cola llena
+    def _escribir_en_hilo(self):
+        while True:
+            bloque = self.cola_bloques.get()
+            if bloque is None:
+                return
+            if self.error_escritor is None:
+                try:
+                    self.archivo.write(bloque)
+                except Exception as e:
+                    self.error_escritor = e
+
+    def _revisar_escritor(self):
+        if self.error_escritor is not None:
+            raise self.error_escritor
+
+    def cerrar(self):
+        if self.archivo.closed:
+            return
+        try:
+            self.volcar()
+        finally:
+            if self.escritor is not None:
+                self.cola_bloques.put(None)
+                self.escritor.join()
+            self.archivo.close()
+        self._revisar_escritor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# Lee una traza binaria y devuelve (calles, bloques), donde cada bloque es un
+# diccionario {columna: array}
+def leer(ruta):
+    with open(ruta, "rb") as f:
+        if f.read(len(MAGIA)) != MAGIA:
+            raise ValueError(f"{ruta} no es una traza binaria de semáforos")
+        (largo,) = struct.unpack("<I", f.read(4))
+        nombres = f.read(largo).decode("utf-8")
+        calles = nombres.split("\n") if nombres else []
+
+        bloques = []
+        while True:
+            cabecera = f.read(4)
+            if not cabecera:
+                break
+            (n,) = struct.unpack("<I", cabecera)
+            bloque = {}
+            for nombre, codigo in COLUMNAS:
+                columna = array.array(codigo)
+                columna.frombytes(f.read(n * columna.itemsize))
+                if sys.byteorder == "big":
+                    columna.byteswap()
+                bloque[nombre] = columna
+            bloques.append(bloque)
+    return calles, bloques
+
+
+# Los tiempos enteros se muestran sin decimales, como los imprime SimPy
+def _tiempo(t):
+    return int(t) if t.is_integer() else t
+
+
+# Genera las líneas de texto legibles (mismo formato que el antiguo log_event)
+def lineas_texto(ruta):
+    calles, bloques = leer(ruta)
+    for bloque in bloques:
+        for t, tipo, i, cola, llegada, valor in zip(*(bloque[nombre] for nombre, _ in COLUMNAS)):
+            calle = calles[i] if i != SIN_CALLE else ""
+            ahora = _tiempo(t)
+            if tipo == LLEGADA_CARRO:
+                yield f"{ahora}: Llega un vehiculo a {calle} - Vehiculos en cola: {cola}"
+            elif tipo == CRUCE_CARRO:
+                yield (f"{ahora}: Vehiculo en {calle} - Llego en: {llegada} - Tiempo de cruce: {round(valor,2)} segundos"
+                       f" - Termina en: {round(t,2)} - Vehiculos restantes en cola: {cola}")
+            elif tipo == VERDE:
+                yield f"\n{ahora}: Semaforo VERDE en {calle}"
+            elif tipo == ROJO:
+                yield f"{ahora}: Semaforo ROJO en {calle}"
+                yield f"Resumen {calle} -> Carros que pasaron: {int(valor)}, Carros en cola: {cola}"
+            elif tipo == LLEGADA_PEATON:
+                yield f"{ahora}: Llega un peaton - Peatones esperando: {cola}"
+            elif tipo == PASO_PEATONAL:
+                yield f"\n{ahora}: Paso peatonal activado - Todos en ROJO"
+            elif tipo == FIN_PASO_PEATONAL:
+                yield f"{ahora}: Peatones que pasaron: {int(valor)}, Peatones que quedaron: {cola}"
+
+
+# Convierte una traza binaria al texto legible; "pie" son líneas extra al final
+def a_texto(ruta_binaria, ruta_texto, pie=()):
+    with open(ruta_texto, "w") as f:
+        for linea in lineas_texto(ruta_binaria):
+            f.write(linea + "\n")
+        for linea in pie:
+            f.write(linea + "\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: python trazas.py <traza.trz> <salida.txt>")
+        sys.exit(1)
+    a_texto(sys.argv[1], sys.argv[2])
@@ -0,0 +1,409 @@
+import argparse
+import glob
+import math
+import mmap
+import os
+import random
+
+import numpy as np
+
+from estadisticas import EstadisticaEspera, PromedioTemporal
+
+# Archivos de resultados al estilo OMNeT++:
+#   .sca  escalares:  "scalar <módulo> <nombre> <valor>"
+#   .vec  vectores:   "vector <id> <módulo> <nombre> TV" y una línea "<id> <t> <valor>" por dato
+#   .vci  índice del .vec: por cada bloque de líneas seguidas de un mismo vector,
+#         su posición en el archivo, rango de tiempos y estadísticas
+# Los datos de cada vector se escriben en bloques contiguos, así leer un vector
+# o una ventana de tiempo solo toca los bloques que le corresponden.
+
+# Carpeta de los archivos por repetición
+RUTA_VECTORES = "vectores"
+
+# Líneas por bloque de un vector (lo que se guarda en memoria antes de escribir)
+LINEAS_BLOQUE = 4096
+
+PEATONES = "Peatones"
+
+
+# Estadísticas de un bloque de datos (como en el .vci de OMNeT++)
+def _estadisticas_bloque(tiempos, valores):
+    return {"t_primero": float(tiempos[0]), "t_ultimo": float(tiempos[-1]), "n": len(valores),
+            "minimo": float(np.min(valores)), "maximo": float(np.max(valores)),
+            "suma": float(np.sum(valores)), "suma2": float(np.dot(valores, valores))}
+
+
+# Escritor en streaming de un .vec: cada vector acumula hasta LINEAS_BLOQUE
+# datos y se escribe como un bloque contiguo; al cerrar se escribe el .vci
+class EscritorVec:
+    def __init__(self, ruta, lineas_bloque=LINEAS_BLOQUE):
+        self.ruta = ruta
+        self.lineas_bloque = lineas_bloque
+        self.archivo = open(ruta, "wb")
+        self.posicion = 0
+        self.vectores = []   # (id, módulo, nombre)
+        self.tiempos = []    # Datos pendientes de cada vector
+        self.valores = []
+        self.bloques = []    # (id, posición, largo, estadísticas)
+
+    def _escribir(self, datos):
+        self.archivo.write(datos)
+        self.posicion += len(datos)
+
+    # Declara un vector y devuelve su id
+    def registrar(self, modulo, nombre):
+        identificador = len(self.vectores)
+        self.vectores.append((identificador, modulo, nombre))
+        self.tiempos.append([])
+        self.valores.append([])
+        self._escribir(f"vector {identificador} {modulo} {nombre} TV\n".encode("utf-8"))
+        return identificador
+
+    def agregar(self, identificador, t, valor):
+        self.tiempos[identificador].append(t)
+        self.valores[identificador].append(valor)
+        if len(self.valores[identificador]) >= self.lineas_bloque:
+            self._volcar(identificador)
+
+    def _volcar(self, identificador):
+        tiempos, valores = self.tiempos[identificador], self.valores[identificador]
+        if not valores:
+            return
+        texto = "".join(f"{identificador}\t{t!r}\t{v!r}\n" for t, v in zip(tiempos, valores)).encode("utf-8")
+        self.bloques.append((identificador, self.posicion, len(texto),
+                             _estadisticas_bloque(np.array(tiempos), np.array(valores, dtype=float))))
+        self._escribir(texto)
+        self.tiempos[identificador], self.valores[identificador] = [], []
+
+    def cerrar(self):
+        for identificador, _, _ in self.vectores:
+            self._volcar(identificador)
+        self.archivo.close()
+        guardar_indice(self.ruta, self.vectores, self.bloques)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+def ruta_indice(ruta_vec):
+    return os.path.splitext(ruta_vec)[0] + ".vci"
+
+
+# Escribe el .vci: tamaño del .vec (para saber si quedó viejo), vectores y bloques
+def guardar_indice(ruta_vec, vectores, bloques):
+    with open(ruta_indice(ruta_vec), "w", encoding="utf-8") as f:
+        f.write(f"file {os.path.getsize(ruta_vec)}\n")
+        for identificador, modulo, nombre in vectores:
+            f.write(f"vector {identificador} {modulo} {nombre} TV\n")
+        for identificador, posicion, largo, e in bloques:
+            f.write(f"{identificador} {posicion} {largo} {e['t_primero']!r} {e['t_ultimo']!r} {e['n']} "
+                    f"{e['minimo']!r} {e['maximo']!r} {e['suma']!r} {e['suma2']!r}\n")
+
+
+# Lee el .vci si corresponde al .vec actual; None si no existe o quedó viejo
+def leer_indice(ruta_vec):
+    ruta = ruta_indice(ruta_vec)
+    if not os.path.exists(ruta):
+        return None
+    vectores, bloques = [], []
+    with open(ruta, encoding="utf-8") as f:
+        cabecera = f.readline().split()
+        if cabecera[:1] != ["file"] or int(cabecera[1]) != os.path.getsize(ruta_vec):
+            return None
+        for linea in f:
+            partes = linea.split()
+            if partes[0] == "vector":
+                vectores.append((int(partes[1]), partes[2], partes[3]))
+            else:
+                t_primero, t_ultimo = float(partes[3]), float(partes[4])
+                bloques.append((int(partes[0]), int(partes[1]), int(partes[2]), {
+                    "t_primero": t_primero, "t_ultimo": t_ultimo, "n": int(partes[5]), "minimo": float(partes[6]),
+                    "maximo": float(partes[7]), "suma": float(partes[8]), "suma2": float(partes[9])}))
+    return vectores, bloques
+
+
+# Construye el índice recorriendo el .vec una vez (para archivos sin .vci).
+# Las líneas seguidas de un mismo vector forman un bloque de hasta lineas_bloque.
+def indexar(ruta_vec, lineas_bloque=LINEAS_BLOQUE):
+    vectores, bloques = [], []
+    with open(ruta_vec, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        actual, inicio, tiempos, valores = None, 0, [], []
+
+        def cerrar_bloque(fin):
+            if valores:
+                bloques.append((actual, inicio, fin - inicio, _estadisticas_bloque(np.array(tiempos), np.array(valores))))
+
+        posicion = 0
+        for linea in iter(datos.readline, b""):
+            partes = linea.split()
+            if not partes or not partes[0].isdigit():
+                if partes[:1] == [b"vector"]:
+                    if not partes[1].isdigit():
+                        raise ValueError(f"{ruta_vec}: vector sin id (formato anterior): {linea.decode('utf-8').strip()}")
+                    vectores.append((int(partes[1]), partes[2].decode("utf-8"), partes[3].decode("utf-8")))
+                cerrar_bloque(posicion)
+                actual, tiempos, valores = None, [], []
+            else:
+                identificador = int(partes[0])
+                if identificador != actual or len(valores) >= lineas_bloque:
+                    cerrar_bloque(posicion)
+                    actual, inicio, tiempos, valores = identificador, posicion, [], []
+                tiempos.append(float(partes[1]))
+                valores.append(float(partes[2]))
+            posicion += len(linea)
+        cerrar_bloque(posicion)
+    guardar_indice(ruta_vec, vectores, bloques)
+    return vectores, bloques
+
+
+# Lector de un .vec por su índice: cada consulta lee con mmap solo los bloques
+# del vector que caen en la ventana pedida
+class LectorVec:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        indice = leer_indice(ruta) or indexar(ruta)
+        self.vectores = {identificador: (modulo, nombre) for identificador, modulo, nombre in indice[0]}
+        self.bloques = {}
+        for identificador, posicion, largo, estadisticas in indice[1]:
+            self.bloques.setdefault(identificador, []).append((posicion, largo, estadisticas))
+        self._archivo = open(ruta, "rb")
+        self._datos = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ) if self.bloques else b""
+
+    def cerrar(self):
+        if self.bloques:
+            self._datos.close()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def buscar(self, modulo, nombre):
+        for identificador, (m, n) in self.vectores.items():
+            if m == modulo and n == nombre:
+                return identificador
+        raise KeyError(f"No hay un vector {modulo} {nombre} en {self.ruta}")
+
+    def _parsear(self, posicion, largo):
+        datos = np.fromstring(self._datos[posicion:posicion + largo].decode("ascii"), sep=" ")
+        return datos.reshape(-1, 3)
+
+    # Tiempos y valores del vector dentro de [desde, hasta]
+    def leer(self, identificador, desde=-math.inf, hasta=math.inf):
+        partes = [self._parsear(posicion, largo) for posicion, largo, e in self.bloques.get(identificador, [])
+                  if e["t_ultimo"] >= desde and e["t_primero"] <= hasta]
+        if not partes:
+            return np.empty(0), np.empty(0)
+        datos = np.concatenate(partes)
+        datos = datos[(datos[:, 1] >= desde) & (datos[:, 1] <= hasta)]
+        return datos[:, 1], datos[:, 2]
+
+    # n, suma, suma de cuadrados, mínimo y máximo de los valores en [desde, hasta].
+    # Los bloques que caen enteros en la ventana se resuelven con el índice, sin leerlos.
+    def agregado(self, identificador, desde=-math.inf, hasta=math.inf):
+        total = {"n": 0, "suma": 0.0, "suma2": 0.0, "minimo": math.inf, "maximo": -math.inf}
+        for posicion, largo, e in self.bloques.get(identificador, []):
+            if e["t_ultimo"] < desde or e["t_primero"] > hasta:
+                continue
+            if desde <= e["t_primero"] and e["t_ultimo"] <= hasta:
+                parcial = e
+            else:
+                datos = self._parsear(posicion, largo)
+                valores = datos[(datos[:, 1] >= desde) & (datos[:, 1] <= hasta), 2]
+                if not len(valores):
+                    continue
+                parcial = {"n": len(valores), "suma": valores.sum(), "suma2": np.dot(valores, valores),
+                           "minimo": valores.min(), "maximo": valores.max()}
+            total["n"] += parcial["n"]
+            total["suma"] += parcial["suma"]
+            total["suma2"] += parcial["suma2"]
+            total["minimo"] = min(total["minimo"], parcial["minimo"])
+            total["maximo"] = max(total["maximo"], parcial["maximo"])
+        return total
+
+    # Promedio en el tiempo de un vector escalonado (p. ej. el tamaño de la cola)
+    # entre desde y hasta: el valor vigente al empezar la ventana sale del último
+    # dato anterior a "desde"
+    def promedio_temporal(self, identificador, desde, hasta):
+        anteriores = [(p, l, e) for p, l, e in self.bloques.get(identificador, []) if e["t_primero"] < desde]
+        valor_inicial = 0.0
+        if anteriores:
+            datos = self._parsear(*anteriores[-1][:2])
+            datos = datos[datos[:, 1] < desde]
+            valor_inicial = datos[-1, 2] if len(datos) else valor_inicial
+        tiempos, valores = self.leer(identificador, desde, hasta)
+        cambios = np.concatenate(([desde], tiempos, [hasta]))
+        escalones = np.concatenate(([valor_inicial], valores))
+        return float(np.dot(np.diff(cambios), escalones) / (hasta - desde))
+
+
+# Media, desviación, mínimo, máximo y cantidad a partir de un agregado
+def resumen_agregado(total):
+    n = total["n"]
+    if n == 0:
+        return {"n": 0, "media": math.nan, "desviacion": math.nan, "minimo": math.nan, "maximo": math.nan}
+    media = total["suma"] / n
+    varianza = max(0.0, (total["suma2"] - n * media * media) / (n - 1)) if n > 1 else 0.0
+    return {"n": n, "media": media, "desviacion": math.sqrt(varianza), "minimo": total["minimo"], "maximo": total["maximo"]}
+
+
+# Agregado de un vector (por módulo y nombre) sobre varios .vec (p. ej. todas
+# las repeticiones de un escenario)
+def agregado_archivos(rutas, modulo, nombre, desde=-math.inf, hasta=math.inf):
+    total = {"n": 0, "suma": 0.0, "suma2": 0.0, "minimo": math.inf, "maximo": -math.inf}
+    for ruta in rutas:
+        with LectorVec(ruta) as lector:
+            try:
+                parcial = lector.agregado(lector.buscar(modulo, nombre), desde, hasta)
+            except KeyError:
+                continue
+        for clave in ("n", "suma", "suma2"):
+            total[clave] += parcial[clave]
+        total["minimo"] = min(total["minimo"], parcial["minimo"])
+        total["maximo"] = max(total["maximo"], parcial["maximo"])
+    return resumen_agregado(total)
+
+
+# Estadística de espera que además escribe cada espera en un vector (en el
+# instante en que se registra, al terminar el cruce)
+class EsperaRegistrada(EstadisticaEspera):
+    __slots__ = ("env", "escritor", "vector")
+
+    def __init__(self, env, escritor, vector):
+        super().__init__()
+        self.env, self.escritor, self.vector = env, escritor, vector
+
+    def agregar(self, espera):
+        super().agregar(espera)
+        self.escritor.agregar(self.vector, self.env.now, espera)
+
+
+# Tamaño de cola en el tiempo que además escribe cada cambio en un vector
+class PromedioRegistrado(PromedioTemporal):
+    __slots__ = ("escritor", "vector")
+
+    def __init__(self, inicio, valor, escritor, vector):
+        super().__init__(inicio, valor)
+        self.escritor, self.vector = escritor, vector
+        escritor.agregar(vector, inicio, valor)
+
+    def actualizar(self, t, valor):
+        super().actualizar(t, valor)
+        self.escritor.agregar(self.vector, t, valor)
+
+
+# Conecta las estadísticas de una intersección recién creada a un escritor:
+# vectores "espera" y "cola" por calle y de peatones, con módulo "<prefijo>.<calle>"
+def instrumentar(interseccion, escritor, prefijo):
+    env = interseccion.env
+    for calle, semaforo in interseccion.semaforos.items():
+        semaforo.espera = EsperaRegistrada(env, escritor, escritor.registrar(f"{prefijo}.{calle}", "espera"))
+        semaforo.tam_cola = PromedioRegistrado(env.now, len(semaforo.cola), escritor,
+                                               escritor.registrar(f"{prefijo}.{calle}", "cola"))
+    interseccion.espera_peatones = EsperaRegistrada(env, escritor, escritor.registrar(f"{prefijo}.{PEATONES}", "espera"))
+    interseccion.tam_cola_peatones = PromedioRegistrado(env.now, len(interseccion.cola_peatones), escritor,
+                                                        escritor.registrar(f"{prefijo}.{PEATONES}", "cola"))
+
+
+def ruta_repeticion(nombre, rep, carpeta=RUTA_VECTORES):
+    return os.path.join(carpeta, f"{nombre}-#{rep}")
+
+
+# Escribe el .sca de una repetición: atributos del escenario y cada métrica de la fila
+def escribir_sca_repeticion(ruta, escenario, rep, semilla, fila):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(f"run {escenario['nombre']}-{rep}-{semilla}\n")
+        for clave, valor in escenario.items():
+            if clave != "nombre":
+                f.write(f"attr {clave} {valor}\n")
+        for clave, valor in fila.items():
+            if isinstance(valor, (int, float)):
+                f.write(f"scalar {escenario['nombre']} {clave} {valor!r}\n")
+
+
+# Simula una repetición escribiendo sus vectores completos (.vec + .vci) y sus
+# escalares (.sca) en "carpeta"; devuelve la misma fila que simular_replica.
+# El modelo se importa acá para que main_prueba pueda usar el escritor sin ciclos.
+def simular_replica_vectores(escenario, rep, semilla_base=None, por_eventos=None, tiempo=None, carpeta=RUTA_VECTORES):
+    import simpy
+    import main_prueba
+    semilla_base = main_prueba.SEMILLA_BASE if semilla_base is None else semilla_base
+    por_eventos = main_prueba.CONTROL_POR_EVENTOS if por_eventos is None else por_eventos
+    tiempo = tiempo or main_prueba.TIEMPO_SIMULACION
+
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = ruta_repeticion(escenario["nombre"], rep, carpeta)
+    semilla = main_prueba.semilla_replica(escenario["nombre"], rep, semilla_base)
+
+    env = simpy.Environment()
+    interseccion = main_prueba.Interseccion(env, escenario, random.Random(semilla), por_eventos)
+    with EscritorVec(ruta + ".vec") as escritor:
+        instrumentar(interseccion, escritor, escenario["nombre"])
+        env.run(until=tiempo)
+
+    fila = {"Escenario": escenario["nombre"], "Repeticion": rep + 1}
+    fila.update(main_prueba.resumen_interseccion(interseccion, env.now))
+    escribir_sca_repeticion(ruta + ".sca", escenario, rep, semilla, fila)
+    return fila
+
+
+def _simular_tarea(tarea):
+    return simular_replica_vectores(*tarea)
+
+
+# Barrido que deja los .sca/.vec/.vci de cada repetición en "carpeta"
+def exportar_barrido(escenarios=None, repets=None, semilla_base=None, procesos=None, tiempo=None,
+                     carpeta=RUTA_VECTORES):
+    import main_prueba
+    tareas = [(escenario, rep, semilla_base, None, tiempo, carpeta)
+              for escenario in escenarios or main_prueba.ESCENARIOS for rep in range(repets or main_prueba.REPETS)]
+    procesos = procesos or main_prueba.PROCESOS or os.cpu_count() or 1
+    if procesos == 1:
+        return [_simular_tarea(tarea) for tarea in tareas]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(_simular_tarea, tareas, chunksize=max(1, len(tareas) // (procesos * 4))))
+
+
+if __name__ == "__main__":
+    from main_prueba import REPETS, PROCESOS, TIEMPO_SIMULACION
+
+    parser = argparse.ArgumentParser(description="Vectores .vec/.sca de las repeticiones y consultas por ventana")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("exportar", help="Simula el barrido escribiendo los vectores de cada repetición")
+    p.add_argument("--repets", type=int, default=REPETS)
+    p.add_argument("--tiempo", type=float, default=TIEMPO_SIMULACION)
+    p.add_argument("--procesos", type=int, default=PROCESOS)
+    p.add_argument("--carpeta", default=RUTA_VECTORES)
+
+    p = sub.add_parser("lista", help="Vectores de un .vec")
+    p.add_argument("archivo")
+
+    p = sub.add_parser("consulta", help="Agregado de un vector en una ventana de tiempo (uno o varios .vec)")
+    p.add_argument("archivos", nargs="+", help="Archivos .vec o patrones (p. ej. 'vectores/Escenario_1-#*.vec')")
+    p.add_argument("--modulo", required=True, help="p. ej. Escenario_1.Este-L3")
+    p.add_argument("--nombre", default="espera", help="espera o cola")
+    p.add_argument("--desde", type=float, default=-math.inf)
+    p.add_argument("--hasta", type=float, default=math.inf)
+    args = parser.parse_args()
+
+    if args.comando == "exportar":
+        filas = exportar_barrido(repets=args.repets, procesos=args.procesos, tiempo=args.tiempo, carpeta=args.carpeta)
+        print(f"{len(filas)} repeticiones exportadas en {args.carpeta}/")
+    elif args.comando == "lista":
+        with LectorVec(args.archivo) as lector:
+            for identificador, (modulo, nombre) in lector.vectores.items():
+                total = resumen_agregado(lector.agregado(identificador))
+                print(f"{identificador:4d} {modulo:28s} {nombre:8s} n={total['n']:<8d} media={total['media']:.3f}")
+    else:
+        rutas = sorted(ruta for patron in args.archivos for ruta in (glob.glob(patron) or [patron]))
+        resultado = agregado_archivos(rutas, args.modulo, args.nombre, args.desde, args.hasta)
+        print(f"{args.modulo} {args.nombre} en [{args.desde}, {args.hasta}] ({len(rutas)} archivos): "
+              f"n={resultado['n']} media={resultado['media']:.3f} desv={resultado['desviacion']:.3f} "
+              f"min={resultado['minimo']:.3f} max={resultado['maximo']:.3f}")